@@ -1,3 +1,4 @@
+import { useEffect, useRef } from 'react';
 import { useTranslation } from 'react-i18next';
 import { useAppStore } from '@/stores/appStore';
 import { useWebSocket } from '@/hooks/useWebSocket';
@@ -24,10 +25,28 @@ function App() {
     inputMethod,
     setInputMethod,
     isLoading,
+    selectedModels,
+    wsConnected,
   } = useAppStore();
 
   // Initialize WebSocket connection
-  useWebSocket();
+  const { prepareModel } = useWebSocket();
+
+  // Start loading HuggingFace tokenizers as soon as they are selected
+  const preparedModels = useRef(new Set<string>());
+  useEffect(() => {
+    if (!wsConnected) {
+      preparedModels.current.clear();
+      return;
+    }
+    if (modelType !== 'huggingface') return;
+    for (const model of selectedModels) {
+      if (!preparedModels.current.has(model)) {
+        preparedModels.current.add(model);
+        prepareModel(model);
+      }
+    }
+  }, [modelType, selectedModels, wsConnected, prepareModel]);
 
   // Initialize model store
   useModelStore();
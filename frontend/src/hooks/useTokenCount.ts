@@ -1,8 +1,46 @@
 import { useCallback } from 'react';
 import { useAppStore } from '@/stores/appStore';
-import type { TokenCountRequest, TokenCountResponse, ErrorResponse } from '@/types';
+import type {
+  BatchTokenCountRequest,
+  BatchTokenCountResponse,
+  CountJobResponse,
+  TokenCountRequest,
+  TokenCountResponse,
+  ErrorResponse,
+} from '@/types';
 
 const API_BASE = '/tokenizer/api';
+const JOB_POLL_INTERVAL = 1000;
+// A job can briefly be unknown to a worker that did not start it
+const JOB_NOT_FOUND_RETRIES = 3;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Poll a background count job until the tokenizer has loaded and counted
+async function waitForCountJob(jobId: string): Promise<TokenCountResponse> {
+  let notFound = 0;
+  for (;;) {
+    await sleep(JOB_POLL_INTERVAL);
+    const response = await fetch(`${API_BASE}/count-jobs/${jobId}`);
+    if (response.status === 404 && notFound < JOB_NOT_FOUND_RETRIES) {
+      notFound += 1;
+      continue;
+    }
+    if (!response.ok) {
+      const errorData: ErrorResponse = await response.json();
+      throw new Error(errorData.error || `HTTP error ${response.status}`);
+    }
+
+    notFound = 0;
+    const job: CountJobResponse = await response.json();
+    if (job.status === 'done' && job.result) {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || `HTTP error ${job.status_code}`);
+    }
+  }
+}
 
 export function useTokenCount() {
   const {
@@ -17,6 +55,39 @@ export function useTokenCount() {
     addHistoryEntry,
   } = useAppStore();
 
+  const countTokensForModels = async (
+    models: string[],
+    text: string
+  ): Promise<TokenCountResponse[]> => {
+    const request: BatchTokenCountRequest = {
+      text,
+      models,
+      model_type: modelType,
+    };
+
+    const response = await fetch(`${API_BASE}/count-tokens/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    });
+
+    if (!response.ok) {
+      const errorData: ErrorResponse = await response.json();
+      throw new Error(errorData.error || `HTTP error ${response.status}`);
+    }
+
+    const data: BatchTokenCountResponse = await response.json();
+    const failed = data.results.find((item) => item.result === null);
+    if (failed) {
+      throw new Error(failed.error || `HTTP error ${failed.status_code}`);
+    }
+
+    return data.results.map((item) => item.result as TokenCountResponse);
+  };
+
+  // Single-model count; cold HuggingFace tokenizers answer 202 with a job
   const countTokensForModel = async (
     model: string,
     text: string
@@ -40,6 +111,11 @@ export function useTokenCount() {
       throw new Error(errorData.error || `HTTP error ${response.status}`);
     }
 
+    if (response.status === 202) {
+      const job: CountJobResponse = await response.json();
+      return waitForCountJob(job.job_id);
+    }
+
     return response.json();
   };
 
@@ -80,11 +156,11 @@ export function useTokenCount() {
     setError(null);
 
     try {
-      const promises = selectedModels.map((model) =>
-        countTokensForModel(model, textInput)
-      );
-
-      const results = await Promise.all(promises);
+      // HuggingFace models go one by one so a cold tokenizer can load in the background
+      const results =
+        modelType === 'huggingface'
+          ? await Promise.all(selectedModels.map((model) => countTokensForModel(model, textInput)))
+          : await countTokensForModels(selectedModels, textInput);
       setResults(results);
 
       // Add to history (summarized entry)
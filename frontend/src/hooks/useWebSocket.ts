@@ -103,6 +103,13 @@ export function useWebSocket() {
     });
   }, [sendMessage]);
 
+  const prepareModel = useCallback((name: string) => {
+    sendMessage({
+      type: 'prepare_model',
+      name,
+    });
+  }, [sendMessage]);
+
   useEffect(() => {
     connect();
 
@@ -115,6 +122,7 @@ export function useWebSocket() {
     isConnected: wsRef.current?.readyState === WebSocket.OPEN,
     sendMessage,
     addModel,
+    prepareModel,
     reconnect: connect,
   };
 }
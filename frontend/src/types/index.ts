@@ -16,6 +16,42 @@ export interface TokenCountResponse {
   model: string;
 }
 
+export interface BatchTokenCountRequest {
+  text: string;
+  models: string[];
+  model_type: ModelType;
+}
+
+export interface BatchTokenCountItem {
+  model: string;
+  result: TokenCountResponse | null;
+  error: string | null;
+  status_code: number;
+}
+
+export interface BatchTokenCountResponse {
+  results: BatchTokenCountItem[];
+}
+
+export type CountJobStatus = 'pending' | 'loading' | 'counting' | 'done' | 'failed';
+
+export interface CountJobProgress {
+  phase?: 'loading' | 'downloading' | 'initializing' | 'ready';
+  downloaded_bytes?: number;
+  total_bytes?: number | null;
+}
+
+// Returned with 202 by /count-tokens while a HuggingFace tokenizer loads
+export interface CountJobResponse {
+  job_id: string;
+  model: string;
+  status: CountJobStatus;
+  progress: CountJobProgress;
+  result: TokenCountResponse | null;
+  error: string | null;
+  status_code: number | null;
+}
+
 export interface ModelListResponse {
   official: string[];
   custom: string[];
@@ -32,6 +68,7 @@ export interface PricingInfoResponse {
   input_price: number | null;
   context_window: number | null;
   context_window_formatted: string | null;
+  pricing_version: string | null;
 }
 
 export interface ErrorResponse {
@@ -40,7 +77,15 @@ export interface ErrorResponse {
 }
 
 // WebSocket message types
-export type WebSocketMessageType = 'init' | 'model_added' | 'add_model' | 'error';
+export type WebSocketMessageType =
+  | 'init'
+  | 'model_added'
+  | 'add_model'
+  | 'watch_job'
+  | 'count_job'
+  | 'prepare_model'
+  | 'model_prepare'
+  | 'error';
 
 export interface WebSocketMessage {
   type: WebSocketMessageType;
@@ -52,6 +97,8 @@ export interface WebSocketMessage {
   error?: string;
   name?: string;
   category?: 'official' | 'custom';
+  job_id?: string;
+  status?: string;
 }
 
 // History entry type
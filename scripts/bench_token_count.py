@@ -0,0 +1,80 @@
+"""
+Benchmark: count-only HuggingFace path vs tokenizer(text) BatchEncoding
+
+Reports latency and peak Python heap allocation (tracemalloc) per input size.
+
+Usage:
+    python scripts/bench_token_count.py --model gpt2 --sizes-kb 100 1024 5120
+    python scripts/bench_token_count.py --tokenizer-json path/to/tokenizer.json
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.token_counter import count_tokens  # noqa: E402
+
+SAMPLE = (
+    "The quick brown fox jumps over the lazy dog. "
+    "토큰 카운터 벤치마크용 문장입니다. 1234567890\n"
+)
+
+
+def make_text(size_kb: int) -> str:
+    target = size_kb * 1024
+    return (SAMPLE * (target // len(SAMPLE.encode("utf-8")) + 1))[:target]
+
+
+def measure(fn, repeat: int) -> tuple[int, float, int]:
+    """Return (result, best seconds, peak traced bytes)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def load(args):
+    if args.tokenizer_json:
+        from tokenizers import Tokenizer
+        from transformers import PreTrainedTokenizerFast
+        backend = Tokenizer.from_file(args.tokenizer_json)
+        return PreTrainedTokenizerFast(tokenizer_object=backend)
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(args.model, use_fast=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt2", help="HuggingFace model id")
+    parser.add_argument("--tokenizer-json", help="Local tokenizer.json (no network)")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[100, 1024, 5120])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tokenizer = load(args)
+
+    print(f"{'size':>8} {'path':<12} {'tokens':>10} {'ms':>10} {'peak MB':>10}")
+    for size_kb in args.sizes_kb:
+        text = make_text(size_kb)
+        paths = {
+            "batch_enc": lambda: len(tokenizer(text)["input_ids"]),
+            "count_only": lambda: count_tokens(tokenizer, text, add_special_tokens=True),
+        }
+        for name, fn in paths.items():
+            tokens, seconds, peak = measure(fn, args.repeat)
+            print(f"{size_kb:>6}KB {name:<12} {tokens:>10} {seconds * 1000:>10.1f} {peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Snapshot tokenizers into the offline bundle directory
+
+Saves the tiktoken BPE files and the tokenizer files (no weights) for the
+HuggingFace models in models.json. The loaders read from the bundle first,
+so restarts need no network calls.
+
+Usage:
+    python scripts/bundle_tokenizers.py
+    python scripts/bundle_tokenizers.py --dir /srv/tokenizer-bundle --models gpt2 Qwen/Qwen3-8B
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.bundle import create_bundle  # noqa: E402
+from core.tiktoken_resolver import resolve_encoding_name  # noqa: E402
+from utils.config import SETTINGS  # noqa: E402
+from utils.model_store import get_custom_models, get_official_models  # noqa: E402
+
+DEFAULT_ENCODINGS = ["o200k_base", "cl100k_base"]
+
+
+def default_encodings() -> list[str]:
+    """Encodings used by the GPT/o-series models in models.json"""
+    encodings = list(DEFAULT_ENCODINGS)
+    for name in get_official_models():
+        if "gpt" in name or name.startswith("o1") or name.startswith("o3"):
+            encodings.append(resolve_encoding_name(name))
+    return list(dict.fromkeys(encodings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default=SETTINGS.tokenizer_bundle_dir,
+                        help="Bundle directory (default: TOKENIZER_BUNDLE_DIR)")
+    parser.add_argument("--models", nargs="*", default=None,
+                        help="HuggingFace model ids (default: custom models in models.json)")
+    parser.add_argument("--encodings", nargs="*", default=None,
+                        help="tiktoken encodings (default: those used by models.json)")
+    args = parser.parse_args()
+
+    model_ids = args.models if args.models is not None else get_custom_models()
+    encodings = args.encodings if args.encodings is not None else default_encodings()
+    token = SETTINGS.huggingface_hub_token or os.environ.get("HUGGINGFACE_HUB_TOKEN") or None
+
+    root = Path(os.path.expanduser(args.dir))
+    manifest = create_bundle(root, model_ids, encodings, token=token)
+    print(json.dumps({"path": str(root), **manifest}, indent=2, ensure_ascii=False))
+    if manifest["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Run the shared tokenizer daemon
+
+Holds one copy of each tokenizer and serves count/encode requests from all
+API workers over a Unix domain socket. Start it before the API and point the
+workers at the same socket with TOKENIZER_DAEMON_SOCKET.
+
+Usage:
+    TOKENIZER_DAEMON_SOCKET=/run/llm_token_counter/tokenizer.sock python scripts/tokenizer_daemon.py
+    python scripts/tokenizer_daemon.py --socket /tmp/tokenizer.sock --preload gpt2 Qwen/Qwen3-8B
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.tokenizer_daemon import main  # noqa: E402
+
+
+if __name__ == "__main__":
+    main()
@@ -15,5 +15,14 @@ pip show transformers tiktoken | grep -E "^(Name|Version)" >> $LOG_FILE
 
 sudo systemctl restart tokenizer >> $LOG_FILE 2>&1
 
+# Wait for the background tokenizer warm-up to finish (up to 5 minutes)
+for i in $(seq 1 60); do
+    if curl -sf http://localhost:7860/api/health/ready > /dev/null; then
+        echo "Service ready: $(date)" >> $LOG_FILE
+        break
+    fi
+    sleep 5
+done
+
 echo "Update completed: $(date)" >> $LOG_FILE
 echo "========================================" >> $LOG_FILE
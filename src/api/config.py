@@ -29,6 +29,54 @@ class Settings(BaseSettings):
     google_api_key: str = ""
     huggingface_hub_token: str = ""
 
+    # Tokenization executor settings
+    tokenizer_executor: str = "thread"  # "thread" or "process"
+    tokenizer_workers: int = 4
+    tokenizer_queue_size: int = 64
+
+    # Number of most-used HuggingFace models kept pinned in the tokenizer cache
+    tokenizer_cache_pinned: int = 5
+
+    # Startup warm-up of the most-used tokenizers (0 models disables HF warm-up)
+    warmup_top_n: int = 5
+    warmup_tiktoken: bool = True
+    warmup_concurrency: int = 2
+
+    # Token count result cache (0 disables)
+    result_cache_max_mb: int = 16
+
+    # Persistent cache for billed upstream count_tokens calls (empty path disables)
+    upstream_cache_path: str = ""
+    upstream_cache_ttl_seconds: int = 7 * 24 * 3600
+    upstream_cache_max_entries: int = 100_000
+
+    # Upstream API client settings (base URLs override the provider endpoints)
+    anthropic_base_url: str = ""
+    google_base_url: str = ""
+    upstream_timeout_seconds: float = 30.0
+    upstream_max_connections: int = 20
+    upstream_keepalive_seconds: float = 60.0
+    upstream_max_concurrency: int = 8
+
+    # Cold HuggingFace tokenizers: return 202 + job id instead of blocking the request
+    async_cold_loads: bool = True
+    count_job_ttl_seconds: int = 600
+    count_job_max_jobs: int = 1000
+    # Job states shared by all workers so any worker can answer polls and watches (empty keeps jobs per worker)
+    count_job_db_path: str = ""
+    count_job_poll_seconds: float = 0.5
+
+    # Shared tokenizer daemon (scripts/tokenizer_daemon.py); empty loads tokenizers in each worker
+    tokenizer_daemon_socket: str = ""
+    tokenizer_daemon_timeout_seconds: float = 300.0
+
+    # Write-behind model usage counts: flush every N seconds or once M uses are pending (0 seconds writes each use)
+    model_usage_flush_seconds: float = 5.0
+    model_usage_flush_threshold: int = 200
+
+    # SQLite model store shared by all workers (empty keeps models.json; imported from it on first use)
+    model_store_db_path: str = ""
+
     # Default models (for initial setup)
     default_models: list[str] = ["gpt2", "facebook/opt-1.3b", "EleutherAI/gpt-j-6B"]
 
@@ -1,7 +1,9 @@
 """
 FastAPI application entry point for LLM Token Counter
 """
+import asyncio
 import os
+import tempfile
 from pathlib import Path
 from contextlib import asynccontextmanager
 
@@ -11,7 +13,14 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 
 from api.config import SETTINGS
-from api.routes import tokens, models, websocket
+from api.routes import tokens, models, websocket, stats
+from api.services.executor import set_worker_initializer, shutdown_executor
+from api.services.upstream_clients import close_upstream_clients
+from api.services.model_store import get_custom_models, start_usage_flusher, stop_usage_flusher
+from api.services.tokenizer_client import tokenizer_daemon
+from api.services.token_counter import load_tokenizer_for_counting
+from api.services.warmup import warmup_state, run_warmup, TIKTOKEN_ENCODINGS
+from core.tokenizer_loader import set_pinned_models
 
 
 @asynccontextmanager
@@ -19,9 +28,33 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     # Startup
     print(f"Starting LLM Token Counter API on {SETTINGS.host}:{SETTINGS.port}")
+    # Keep the most-used HuggingFace tokenizers resident under memory pressure,
+    # here and in process pool workers (which hold their own tokenizers)
+    pinned = get_custom_models(SETTINGS.tokenizer_cache_pinned)
+    set_pinned_models(pinned)
+    set_worker_initializer(set_pinned_models, pinned)
+    # Warm popular tokenizers in the background; traffic is accepted meanwhile.
+    # With a tokenizer daemon the tokenizers live there (see its --preload);
+    # HuggingFace tokenizers are loaded where counts run.
+    local_tokenizers = not tokenizer_daemon.enabled
+    warmup_task = asyncio.create_task(run_warmup(
+        model_ids=get_custom_models(SETTINGS.warmup_top_n) if local_tokenizers else [],
+        encodings=TIKTOKEN_ENCODINGS if SETTINGS.warmup_tiktoken and local_tokenizers else (),
+        concurrency=SETTINGS.warmup_concurrency,
+        load_model=load_tokenizer_for_counting,
+    ))
+    # Batch usage count writes to models.json off the request path
+    if SETTINGS.model_usage_flush_seconds > 0:
+        start_usage_flusher(SETTINGS.model_usage_flush_seconds, SETTINGS.model_usage_flush_threshold)
     yield
     # Shutdown
     print("Shutting down LLM Token Counter API")
+    warmup_task.cancel()
+    shutdown_executor()
+    await close_upstream_clients()
+    await tokenizer_daemon.close()
+    # Write the usage counts still pending
+    await stop_usage_flusher()
 
 
 # Create FastAPI app
@@ -48,13 +81,25 @@ app.add_middleware(
 app.include_router(tokens.router)
 app.include_router(models.router)
 app.include_router(websocket.router)
+app.include_router(stats.router)
 
 
 # Health check endpoint
 @app.get("/api/health", tags=["health"])
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "version": "2.0.0"}
+    """Health check endpoint (includes startup warm-up progress)"""
+    return {"status": "healthy", "version": "2.0.0", "warmup": warmup_state.to_dict()}
+
+
+@app.get("/api/health/ready", tags=["health"])
+async def readiness_check():
+    """Readiness check - returns 503 until the startup warm-up has finished"""
+    if not warmup_state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming", "warmup": warmup_state.to_dict()}
+        )
+    return {"status": "ready", "warmup": warmup_state.to_dict()}
 
 
 # Serve React frontend static files
@@ -102,6 +147,12 @@ if FRONTEND_DIR.exists():
 def main():
     """Run the server"""
     import uvicorn
+    # Both workers must answer for each other's count jobs; without a configured
+    # table, give this run its own (workers read it from the environment)
+    if not SETTINGS.count_job_db_path:
+        os.environ["COUNT_JOB_DB_PATH"] = os.path.join(
+            tempfile.mkdtemp(prefix="llm_token_counter-"), "count_jobs.sqlite3"
+        )
     uvicorn.run(
         "api.main:app",
         host=SETTINGS.host,
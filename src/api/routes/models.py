@@ -1,19 +1,74 @@
 """
 Model management API endpoints
 """
-from fastapi import APIRouter, HTTPException
-
-from api.schemas import ModelListResponse, AddModelRequest, PricingInfoResponse, ErrorResponse
+import gzip
+import json
+from functools import lru_cache
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from api.schemas import (
+    ModelListResponse,
+    AddModelRequest,
+    PricingInfoResponse,
+    PricingCatalogResponse,
+    ErrorResponse,
+)
 from api.services.model_store import (
     get_all_models,
     add_official_model_async,
     add_custom_model_async,
 )
-from utils.pricing import get_model_info, format_context_window
+from utils.pricing import PricingSnapshot, format_context_window, get_pricing_snapshot
 
 router = APIRouter(prefix="/api", tags=["models"])
 
 
+def _matches_etag(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already covers the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" name the same representation here
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def _accepts_gzip(request: Request) -> bool:
+    """True if the client lists gzip in Accept-Encoding (and did not refuse it with q=0)"""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+@lru_cache(maxsize=2)
+def _catalog_payload(snapshot: PricingSnapshot) -> tuple[bytes, bytes]:
+    """
+    Serialize a pricing snapshot once as (JSON, gzip-compressed JSON)
+
+    Snapshots are immutable, so the bytes are reused by every request until
+    the catalog file changes and a new snapshot replaces this one.
+    """
+    catalog = {
+        "version": snapshot.version,
+        "models": {
+            key: {
+                "input_price": info["input_price"],
+                "context_window": info["context_window"],
+                "context_window_formatted": format_context_window(info["context_window"]),
+            }
+            for key, info in sorted(snapshot.models.items())
+        },
+    }
+    body = json.dumps(catalog, separators=(",", ":")).encode("utf-8")
+    # mtime=0 keeps the compressed bytes identical across processes
+    return body, gzip.compress(body, compresslevel=9, mtime=0)
+
+
 @router.get(
     "/models",
     response_model=ModelListResponse,
@@ -59,28 +114,69 @@ async def add_model(request: AddModelRequest) -> ModelListResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get(
+    "/pricing",
+    response_model=PricingCatalogResponse,
+    responses={304: {"description": "Pricing catalog unchanged since the ETag sent in If-None-Match"}},
+    summary="Get the whole pricing catalog"
+)
+async def get_pricing_catalog(request: Request) -> Response:
+    """
+    Get prices and context windows for every model in the pricing catalog.
+
+    Clients can cache the catalog and compute costs locally: look up the
+    longest key that is a prefix of the model name. The payload is serialized
+    and gzip-compressed once per catalog version. Send the ETag back in
+    If-None-Match to get 304 until the catalog changes.
+    """
+    snapshot = get_pricing_snapshot()
+    body, compressed = _catalog_payload(snapshot)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _accepts_gzip(request):
+        # Each encoding is a separate representation with its own strong ETag
+        headers["ETag"] = snapshot.etag[:-1] + '-gzip"'
+        headers["Content-Encoding"] = "gzip"
+        body = compressed
+    else:
+        headers["ETag"] = snapshot.etag
+
+    if _matches_etag(request, headers["ETag"]):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get(
     "/pricing/{model_name:path}",
     response_model=PricingInfoResponse,
+    responses={304: {"description": "Pricing catalog unchanged since the ETag sent in If-None-Match"}},
     summary="Get pricing info for a model"
 )
-async def get_pricing(model_name: str) -> PricingInfoResponse:
+async def get_pricing(model_name: str, request: Request, response: Response) -> PricingInfoResponse:
     """
     Get pricing and context window information for a model.
 
     - **model_name**: Model name (supports partial matching)
 
     Returns pricing info or null values if model not found in pricing database.
+    The ETag identifies the pricing catalog version; send it back in
+    If-None-Match to get 304 until the catalog changes.
     """
+    snapshot = get_pricing_snapshot()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if _matches_etag(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
     normalized = model_name.lower().strip()
-    info = get_model_info(normalized)
+    info = snapshot.get(normalized)
 
-    response = PricingInfoResponse(model=normalized)
+    result = PricingInfoResponse(model=normalized, pricing_version=snapshot.version)
 
     if info:
-        response.input_price = info.get("input_price")
-        response.context_window = info.get("context_window")
-        if response.context_window:
-            response.context_window_formatted = format_context_window(response.context_window)
+        result.input_price = info.get("input_price")
+        result.context_window = info.get("context_window")
+        if result.context_window:
+            result.context_window_formatted = format_context_window(result.context_window)
 
-    return response
+    return result
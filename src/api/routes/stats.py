@@ -0,0 +1,93 @@
+"""
+Operational statistics API endpoints
+"""
+from fastapi import APIRouter, HTTPException
+
+from api.services.count_jobs import count_jobs
+from api.services.executor import get_executor_stats
+from api.services.model_store import get_usage_flush_stats
+from api.services.prepare import model_preparer
+from api.services.tokenizer_client import get_tokenizer_daemon_stats, tokenizer_daemon
+from core.bundle import get_bundle_info
+from core.chunking import get_chunking_stats
+from core.tokenizer_loader import (
+    get_failed_load_stats,
+    get_tokenizer_alias_stats,
+    get_tokenizer_cache_stats,
+    get_tokenizer_load_stats,
+)
+from api.services.token_counter import result_cache, count_flight
+from api.services.upstream_cache import get_upstream_cache_stats
+from api.services.upstream_clients import get_upstream_client_stats
+from utils.pricing import get_pricing_stats
+
+router = APIRouter(prefix="/api", tags=["stats"])
+
+
+@router.get(
+    "/stats",
+    summary="Get runtime statistics"
+)
+async def get_stats() -> dict:
+    """
+    Get runtime statistics for operators.
+
+    - **executor**: Tokenization pool size, queue depth and utilization
+    - **result_cache**: Token count cache size and hit/miss counts
+    - **upstream_cache**: Persistent Claude/Gemini count cache (null if disabled)
+    - **upstream_clients**: Pooled provider clients and their concurrency
+    - **coalescing**: Identical in-flight count requests that shared one computation
+    - **tokenizer_cache**: Resident HuggingFace tokenizers, memory use and evictions
+    - **tokenizer_loads**: In-progress loads and time spent waiting on load locks
+    - **tokenizer_failures**: Recently failed tokenizer loads that fail fast until they expire
+    - **chunked_counting**: Large texts counted in parallel chunks and verification results
+    - **count_jobs**: Background counts waiting on cold HuggingFace tokenizers
+    - **prepares**: Tokenizer preloads requested by the UI on model selection
+    - **tokenizer_daemon**: Shared tokenizer daemon client and daemon stats (null if not configured)
+    - **bundle**: Offline tokenizer bundle contents (null if no bundle)
+    - **pricing**: Loaded pricing catalog version, ETag and last reload error
+    - **model_usage**: Model usage counts waiting to be written to the model store
+    """
+    return {
+        "executor": get_executor_stats(),
+        "result_cache": result_cache.stats(),
+        "upstream_cache": get_upstream_cache_stats(),
+        "upstream_clients": get_upstream_client_stats(),
+        "coalescing": count_flight.stats(),
+        "tokenizer_cache": get_tokenizer_cache_stats(),
+        "tokenizer_loads": get_tokenizer_load_stats(),
+        "tokenizer_failures": get_failed_load_stats(),
+        "chunked_counting": get_chunking_stats(),
+        "count_jobs": count_jobs.stats(),
+        "prepares": model_preparer.stats(),
+        "tokenizer_daemon": await get_tokenizer_daemon_stats(),
+        "bundle": get_bundle_info(),
+        "pricing": get_pricing_stats(),
+        "model_usage": get_usage_flush_stats(),
+    }
+
+
+@router.get(
+    "/stats/tokenizer-aliases",
+    summary="Get models sharing one tokenizer instance"
+)
+async def get_tokenizer_aliases() -> dict:
+    """
+    Get HuggingFace models that share one loaded tokenizer.
+
+    Repos with identical tokenizer files (every size of a model family,
+    fine-tunes of a base model) are loaded once and share the instance.
+
+    - **groups**: Model ids per shared tokenizer, its size and the bytes saved
+    - **saved_bytes**: Total memory saved by sharing
+    - **shared_by_file_hash**: Loads that reused an instance without parsing tokenizer.json
+    - **shared_by_fingerprint**: Loads that were parsed, then matched an existing instance
+
+    With a tokenizer daemon the groups come from the daemon.
+    """
+    if tokenizer_daemon.enabled:
+        try:
+            return (await tokenizer_daemon.daemon_stats())["tokenizer_aliases"]
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Tokenizer daemon unavailable: {e}")
+    return get_tokenizer_alias_stats()
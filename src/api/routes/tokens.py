@@ -2,13 +2,29 @@
 Token counting API endpoints
 """
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import JSONResponse
 from typing import Optional
 
-from api.schemas import TokenCountRequest, TokenCountResponse, ErrorResponse
+from api.schemas import (
+    TokenCountRequest,
+    TokenCountResponse,
+    BatchTokenCountRequest,
+    BatchTokenCountItem,
+    BatchTokenCountResponse,
+    CountJobResponse,
+    ErrorResponse,
+)
+from api.config import SETTINGS
 from api.schemas.models import ModelType
+from api.services.count_jobs import count_jobs, CountJobsFullError
+from api.services.executor import ExecutorBusyError
+from api.services.tokenizer_client import tokenizer_daemon
 from api.services.token_counter import (
-    count_tokens_for_model,
+    count_tokens_for_model_async,
+    count_tokens_for_models,
+    is_tokenizer_ready,
     APIKeyMissingError,
+    TokenizerNotLoadedError,
     UnsupportedModelError,
 )
 from api.services.file_parser import (
@@ -24,27 +40,63 @@ from api.services.model_store import (
 router = APIRouter(prefix="/api", tags=["tokens"])
 
 
+def _error_status_code(error: Exception) -> int:
+    """Map a counting error to the HTTP status code used by the endpoints"""
+    if isinstance(error, APIKeyMissingError):
+        return 401
+    if isinstance(error, UnsupportedModelError):
+        return 400
+    if isinstance(error, TokenizerNotLoadedError):
+        return 409
+    if isinstance(error, ExecutorBusyError):
+        return 503
+    return 500
+
+
 @router.post(
     "/count-tokens",
     response_model=TokenCountResponse,
     responses={
+        202: {"model": CountJobResponse, "description": "Tokenizer is loading; count delivered via job"},
         400: {"model": ErrorResponse, "description": "Invalid request"},
         401: {"model": ErrorResponse, "description": "API key missing"},
         422: {"model": ErrorResponse, "description": "Validation error"},
+        503: {"model": ErrorResponse, "description": "Tokenization queue or count job store full"},
     }
 )
-async def count_tokens(request: TokenCountRequest) -> TokenCountResponse:
+async def count_tokens(request: TokenCountRequest):
     """
     Count tokens for the given text using the specified model.
 
+    If a HuggingFace tokenizer is not loaded yet, the load starts in the
+    background and the response is 202 with a job. Follow it with
+    GET /api/count-jobs/{job_id} or a `watch_job` message on /api/ws.
+
     - **text**: The text to count tokens for
     - **model**: Model name (e.g., gpt-4o, claude-3-5-sonnet, meta-llama/llama-4)
     - **model_type**: Either "commercial" or "huggingface"
     """
     try:
         is_commercial = request.model_type == ModelType.COMMERCIAL
+        normalized_name = request.model.lower().strip()
+
+        if (
+            not is_commercial
+            and SETTINGS.async_cold_loads
+            and not tokenizer_daemon.enabled
+            and not is_tokenizer_ready(normalized_name)
+        ):
+            job = await count_jobs.start(
+                normalized_name, request.text,
+                on_success=add_custom_model_async,
+                status_code_for=_error_status_code,
+            )
+            return JSONResponse(
+                status_code=202,
+                content=CountJobResponse(**job.to_dict()).model_dump()
+            )
 
-        result = count_tokens_for_model(
+        result = await count_tokens_for_model_async(
             model_name=request.model,
             text=request.text,
             is_commercial=is_commercial
@@ -62,10 +114,85 @@ async def count_tokens(request: TokenCountRequest) -> TokenCountResponse:
         raise HTTPException(status_code=401, detail=str(e))
     except UnsupportedModelError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except (ExecutorBusyError, CountJobsFullError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get(
+    "/count-jobs/{job_id}",
+    response_model=CountJobResponse,
+    responses={
+        404: {"model": ErrorResponse, "description": "Unknown or expired job"},
+    }
+)
+async def get_count_job(job_id: str) -> CountJobResponse:
+    """
+    Get the state of a background count started by /api/count-tokens.
+
+    Any worker can answer while the shared job table is enabled
+    (count_job_db_path). Finished jobs are kept for a limited time
+    (count_job_ttl_seconds).
+    """
+    job = await count_jobs.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return CountJobResponse(**job)
+
+
+@router.post(
+    "/count-tokens/batch",
+    response_model=BatchTokenCountResponse,
+    responses={
+        422: {"model": ErrorResponse, "description": "Validation error"},
+    }
+)
+async def count_tokens_batch(request: BatchTokenCountRequest) -> BatchTokenCountResponse:
+    """
+    Count tokens for one text against several models in a single request.
+
+    Models are counted concurrently on the server. A failure for one model
+    does not fail the whole request; it is reported in that model's entry.
+
+    HuggingFace tokenizers are not loaded here: a model whose tokenizer is
+    not loaded yet is reported with status 409. Count it once with
+    POST /api/count-tokens (which loads it behind a 202 job) and retry.
+
+    - **text**: The text to count tokens for
+    - **models**: Model names (duplicates are counted once)
+    - **model_type**: Either "commercial" or "huggingface"
+    """
+    is_commercial = request.model_type == ModelType.COMMERCIAL
+
+    outcomes = await count_tokens_for_models(
+        model_names=request.models,
+        text=request.text,
+        is_commercial=is_commercial,
+        require_loaded=SETTINGS.async_cold_loads and not tokenizer_daemon.enabled
+    )
+
+    items = []
+    for name, result, error in outcomes:
+        if error is not None:
+            items.append(BatchTokenCountItem(
+                model=name,
+                error=str(error),
+                status_code=_error_status_code(error)
+            ))
+            continue
+
+        # Add model to store if successful
+        if is_commercial:
+            await add_official_model_async(name)
+        else:
+            await add_custom_model_async(name)
+
+        items.append(BatchTokenCountItem(model=name, result=TokenCountResponse(**result)))
+
+    return BatchTokenCountResponse(results=items)
+
+
 @router.post(
     "/count-tokens/file",
     response_model=TokenCountResponse,
@@ -74,6 +201,7 @@ async def count_tokens(request: TokenCountRequest) -> TokenCountResponse:
         401: {"model": ErrorResponse, "description": "API key missing"},
         413: {"model": ErrorResponse, "description": "File too large"},
         415: {"model": ErrorResponse, "description": "Unsupported file type"},
+        503: {"model": ErrorResponse, "description": "Tokenization queue full"},
     }
 )
 async def count_tokens_file(
@@ -106,7 +234,7 @@ async def count_tokens_file(
         text = await parse_uploaded_file(file.file, file.filename)
 
         # Count tokens
-        result = count_tokens_for_model(
+        result = await count_tokens_for_model_async(
             model_name=model,
             text=text,
             is_commercial=is_commercial
@@ -128,6 +256,8 @@ async def count_tokens_file(
         raise HTTPException(status_code=401, detail=str(e))
     except UnsupportedModelError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
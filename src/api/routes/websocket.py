@@ -1,11 +1,14 @@
 """
-WebSocket hub for real-time model list synchronization
+WebSocket hub for real-time model list synchronization, count job progress
+and tokenizer preloading
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Set
 import asyncio
 import json
 
+from api.services.count_jobs import count_jobs
+from api.services.prepare import model_preparer
 from api.services.model_store import (
     get_all_models,
     add_official_model_async,
@@ -22,6 +25,7 @@ class ConnectionManager:
 
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
+        self.job_watchers: dict[str, Set[WebSocket]] = {}
         self._lock = asyncio.Lock()
 
     async def connect(self, websocket: WebSocket):
@@ -41,6 +45,37 @@ class ConnectionManager:
         """Remove a connection"""
         async with self._lock:
             self.active_connections.discard(websocket)
+            for job_id in list(self.job_watchers):
+                self.job_watchers[job_id].discard(websocket)
+                if not self.job_watchers[job_id]:
+                    del self.job_watchers[job_id]
+
+    async def watch_job(self, websocket: WebSocket, job_id: str) -> bool:
+        """Send a job's current state and subscribe the client to its updates"""
+        job = await count_jobs.lookup(job_id)
+        if job is None:
+            return False
+        if job["status"] not in ("done", "failed"):
+            async with self._lock:
+                self.job_watchers.setdefault(job_id, set()).add(websocket)
+            # Jobs running in another worker are relayed from the shared table
+            count_jobs.follow(job_id)
+        await self._send_message(websocket, {"type": "count_job", "data": job})
+        return True
+
+    async def handle_job_update(self, job: dict):
+        """Handle count job updates - send to the clients watching that job"""
+        async with self._lock:
+            if job["status"] in ("done", "failed"):
+                watchers = self.job_watchers.pop(job["job_id"], set())
+            else:
+                watchers = set(self.job_watchers.get(job["job_id"], ()))
+
+        for connection in watchers:
+            try:
+                await self._send_message(connection, {"type": "count_job", "data": job})
+            except Exception:
+                await self.disconnect(connection)
 
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
@@ -81,6 +116,8 @@ manager = ConnectionManager()
 
 # Subscribe to model store changes
 subscribe_async(manager.handle_model_update)
+# Subscribe to count job progress
+count_jobs.subscribe(manager.handle_job_update)
 
 
 @router.websocket("/api/ws")
@@ -92,13 +129,23 @@ async def websocket_endpoint(websocket: WebSocket):
     - Server sends 'init' message on connection with current model list
     - Server sends 'model_added' message when model list changes
     - Client can send 'add_model' message to add a new model
+    - Client can send 'watch_job' with a job_id returned by a 202 from
+      /api/count-tokens; server sends 'count_job' with the current state and
+      again on every progress update until the job is done or failed
+    - Client can send 'prepare_model' when a HuggingFace model is selected;
+      the server starts loading its tokenizer in the background and replies
+      'model_prepare' with a status (started, in_progress, already_loaded,
+      recently_failed, no_headroom)
 
     Message format:
     {
-        "type": "init" | "model_added" | "add_model" | "error",
-        "data": { "official": [...], "custom": [...], "version": int },
-        "name": "model-name",  // for add_model
+        "type": "init" | "model_added" | "add_model" | "watch_job" | "count_job"
+              | "prepare_model" | "model_prepare" | "error",
+        "data": { "official": [...], "custom": [...], "version": int },  // or job state for count_job
+        "name": "model-name",  // for add_model and prepare_model
+        "status": "started",  // for model_prepare
         "category": "official" | "custom",  // for add_model
+        "job_id": "job handle",  // for watch_job
         "error": "error message"  // for error type
     }
     """
@@ -134,6 +181,28 @@ async def websocket_endpoint(websocket: WebSocket):
                         "error": str(e)
                     })
 
+            elif message_type == "watch_job":
+                if not await manager.watch_job(websocket, str(data.get("job_id", ""))):
+                    await websocket.send_json({
+                        "type": "error",
+                        "error": "Unknown or expired job"
+                    })
+
+            elif message_type == "prepare_model":
+                name = str(data.get("name", "")).lower().strip()
+                if not name or len(name) < 2:
+                    await websocket.send_json({
+                        "type": "error",
+                        "error": "Invalid model name"
+                    })
+                    continue
+
+                await websocket.send_json({
+                    "type": "model_prepare",
+                    "name": name,
+                    "status": model_preparer.prepare(name)
+                })
+
     except WebSocketDisconnect:
         await manager.disconnect(websocket)
     except Exception:
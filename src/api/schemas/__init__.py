@@ -2,9 +2,15 @@
 from .models import (
     TokenCountRequest,
     TokenCountResponse,
+    BatchTokenCountRequest,
+    BatchTokenCountItem,
+    BatchTokenCountResponse,
+    CountJobResponse,
     ModelListResponse,
     AddModelRequest,
     PricingInfoResponse,
+    PricingCatalogEntry,
+    PricingCatalogResponse,
     ErrorResponse,
     WebSocketMessage,
 )
@@ -6,6 +6,10 @@ from typing import Literal, Optional
 from enum import Enum
 
 
+# Maximum number of models in a single batch count request
+MAX_BATCH_MODELS = 20
+
+
 class ModelType(str, Enum):
     COMMERCIAL = "commercial"
     HUGGINGFACE = "huggingface"
@@ -27,6 +31,42 @@ class TokenCountResponse(BaseModel):
     model: str = Field(..., description="Model name used for counting")
 
 
+class BatchTokenCountRequest(BaseModel):
+    """Request schema for counting one text against several models"""
+    text: str = Field(..., min_length=1, description="Text to count tokens for")
+    models: list[str] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_MODELS, description="Model names"
+    )
+    model_type: ModelType = Field(..., description="Type of models (commercial or huggingface)")
+
+
+class BatchTokenCountItem(BaseModel):
+    """Per-model entry of a batch token count"""
+    model: str = Field(..., description="Normalized model name")
+    result: Optional[TokenCountResponse] = Field(None, description="Count result if successful")
+    error: Optional[str] = Field(None, description="Error message if counting failed")
+    status_code: int = Field(200, description="HTTP status the single-model endpoint would return")
+
+
+class BatchTokenCountResponse(BaseModel):
+    """Response schema for batch token counting"""
+    results: list[BatchTokenCountItem] = Field(default_factory=list, description="Results in request order")
+
+
+class CountJobResponse(BaseModel):
+    """State of a background count started for a cold HuggingFace tokenizer"""
+    job_id: str = Field(..., description="Job handle for polling or WebSocket watch_job")
+    model: str = Field(..., description="Normalized model name")
+    status: Literal["pending", "loading", "counting", "done", "failed"] = Field(..., description="Job status")
+    progress: dict = Field(
+        default_factory=dict,
+        description="Load progress: phase (loading/downloading/initializing/ready), downloaded_bytes, total_bytes"
+    )
+    result: Optional[TokenCountResponse] = Field(None, description="Count result when done")
+    error: Optional[str] = Field(None, description="Error message when failed")
+    status_code: Optional[int] = Field(None, description="HTTP status the synchronous request would have returned")
+
+
 class ModelListResponse(BaseModel):
     """Response schema for model list"""
     official: list[str] = Field(default_factory=list, description="Commercial model list")
@@ -46,6 +86,22 @@ class PricingInfoResponse(BaseModel):
     input_price: Optional[float] = Field(None, description="Price per 1M input tokens in USD")
     context_window: Optional[int] = Field(None, description="Context window size")
     context_window_formatted: Optional[str] = Field(None, description="Formatted context window (e.g., '128K')")
+    pricing_version: Optional[str] = Field(None, description="Version of the pricing catalog the values came from")
+
+
+class PricingCatalogEntry(BaseModel):
+    """One model in the pricing catalog"""
+    input_price: float = Field(..., description="Price per 1M input tokens in USD")
+    context_window: int = Field(..., description="Context window size")
+    context_window_formatted: str = Field(..., description="Formatted context window (e.g., '128K')")
+
+
+class PricingCatalogResponse(BaseModel):
+    """Response schema for the whole pricing catalog"""
+    version: str = Field(..., description="Pricing catalog version (its \"version\" field, or a content hash)")
+    models: dict[str, PricingCatalogEntry] = Field(
+        ..., description="Catalog keys; a model uses the longest key that prefixes its name"
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -58,6 +114,10 @@ class WebSocketMessageType(str, Enum):
     INIT = "init"
     MODEL_ADDED = "model_added"
     ADD_MODEL = "add_model"
+    WATCH_JOB = "watch_job"
+    COUNT_JOB = "count_job"
+    PREPARE_MODEL = "prepare_model"
+    MODEL_PREPARE = "model_prepare"
     ERROR = "error"
 
 
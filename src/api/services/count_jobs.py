@@ -0,0 +1,311 @@
+"""
+Background count jobs for HuggingFace models whose tokenizer is not loaded yet
+
+A cold tokenizer can take minutes to download. Instead of holding the HTTP
+request open, /api/count-tokens starts a job and returns its id. Progress and
+the final count are pushed to WebSocket watchers and can also be polled.
+
+With count_job_db_path set, every state change is also written to a SQLite
+table shared by all workers, so a poll or watch that lands on a worker other
+than the one running the job still finds it.
+"""
+import asyncio
+import secrets
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Optional
+
+from api.config import SETTINGS
+from api.services.count_jobs_sqlite import SqliteCountJobTable
+from api.services.token_counter import count_tokens_for_model_async, load_tokenizer_for_counting
+from core.tokenizer_loader import watch_load_progress
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Prune expired rows from the shared table once every this many new jobs
+SHARED_PRUNE_INTERVAL = 100
+
+# Type alias for async job update callback
+JobCallback = Callable[[dict], Coroutine[Any, Any, None]]
+
+
+class CountJobsFullError(Exception):
+    """Raised when every job slot is taken by a job that is still running"""
+    pass
+
+
+class CountJob:
+    """State of one background count"""
+
+    def __init__(self, job_id: str, model: str):
+        self.job_id = job_id
+        self.model = model
+        self.status = "pending"  # pending → loading → counting → done | failed
+        self.progress: dict = {}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # Bumped on every change; orders the states written to the shared table
+        self.seq = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "model": self.model,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+class CountJobStore:
+    """Registry of count jobs with subscriber notification"""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_jobs: int,
+        shared: Optional[SqliteCountJobTable] = None,
+        poll_seconds: float = 0.5,
+    ):
+        """
+        Args:
+            ttl_seconds: How long finished jobs stay available
+            max_jobs: Maximum number of jobs kept in this process; only finished
+                jobs are evicted to make room
+            shared: Table shared with the other workers (None keeps jobs in this process only)
+            poll_seconds: How often a job running in another worker is re-read for watchers
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self.shared = shared
+        self.poll_seconds = poll_seconds
+        self._jobs: OrderedDict[str, CountJob] = OrderedDict()
+        self._subscribers: list[JobCallback] = []
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._followers: dict[str, asyncio.Task] = {}
+        self._created = 0
+
+    def subscribe(self, callback: JobCallback) -> None:
+        """Subscribe to job updates (async callback receiving job dicts)"""
+        self._subscribers.append(callback)
+
+    def get(self, job_id: str) -> Optional[CountJob]:
+        """Get a job running in this process by id, or None if unknown or expired"""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def lookup(self, job_id: str) -> Optional[dict]:
+        """Get a job's state from this process or, failing that, the shared table"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        found = await self._read_shared(job_id)
+        return found[1] if found is not None else None
+
+    def follow(self, job_id: str) -> None:
+        """
+        Relay updates of a job running in another worker to this process's subscribers
+
+        The shared table is re-read every poll_seconds until the job finishes
+        or disappears. Jobs running in this process notify subscribers directly.
+        """
+        if self.shared is None or job_id in self._jobs or job_id in self._followers:
+            return
+        task = asyncio.create_task(self._follow(job_id))
+        self._followers[job_id] = task
+        task.add_done_callback(lambda _: self._followers.pop(job_id, None))
+
+    async def _follow(self, job_id: str) -> None:
+        last_seq = None
+        while True:
+            found = await self._read_shared(job_id)
+            if found is None:
+                return
+            seq, payload = found
+            if seq != last_seq:
+                last_seq = seq
+                await self._notify(payload)
+            if payload["status"] in ("done", "failed"):
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _read_shared(self, job_id: str) -> Optional[tuple[int, dict]]:
+        if self.shared is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.shared.get, job_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared count job table error: {e}")
+            return None
+
+    async def _write_shared(self, job: CountJob) -> None:
+        if self.shared is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self.shared.put, job.to_dict(), job.seq, job.finished, job.updated_at
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared count job table error: {e}")
+
+    def create(self, model: str) -> CountJob:
+        """
+        Register a new pending job
+
+        Raises:
+            CountJobsFullError: If max_jobs jobs are still running
+        """
+        self._prune(reserve=1)
+        if len(self._jobs) >= self.max_jobs:
+            raise CountJobsFullError(f"Too many tokenizer loads in progress ({len(self._jobs)}); retry shortly")
+        job = CountJob(secrets.token_urlsafe(16), model)
+        self._jobs[job.job_id] = job
+        return job
+
+    def _prune(self, reserve: int = 0) -> None:
+        """
+        Drop finished jobs past their TTL, then the oldest finished jobs over the cap
+
+        Running jobs are never dropped, so their clients can always follow them.
+        A running job without an update for a whole TTL is cancelled instead;
+        it then fails with 504 and expires like any finished job.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.updated_at >= cutoff:
+                continue
+            if job.finished:
+                del self._jobs[job_id]
+                continue
+            task = self._tasks.get(job_id)
+            if task is not None and not task.done():
+                task.cancel()
+
+        excess = len(self._jobs) + reserve - self.max_jobs
+        if excess > 0:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+                del self._jobs[job_id]
+
+    async def update(self, job: CountJob, **changes) -> None:
+        """Apply changes to a job, notify subscribers and publish it to the other workers"""
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        job.seq += 1
+        await self._notify(job.to_dict())
+        await self._write_shared(job)
+
+    async def _notify(self, payload: dict) -> None:
+        for callback in self._subscribers:
+            try:
+                await callback(payload)
+            except Exception:
+                pass
+
+    async def start(
+        self,
+        model: str,
+        text: str,
+        on_success: Callable[[str], Coroutine[Any, Any, Any]],
+        status_code_for: Callable[[Exception], int],
+    ) -> CountJob:
+        """
+        Start counting text with a HuggingFace model in the background
+
+        Args:
+            model: Normalized model name
+            text: Text to count tokens for
+            on_success: Awaited with the model name after a successful count
+            status_code_for: Maps a counting error to an HTTP status code
+
+        Returns:
+            The new job, already visible to the other workers
+        """
+        job = self.create(model)
+        await self._write_shared(job)
+        self._created += 1
+        if self.shared is not None and self._created % SHARED_PRUNE_INTERVAL == 0:
+            try:
+                await asyncio.to_thread(self.shared.prune, self.ttl_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared count job table error: {e}")
+        task = asyncio.create_task(self._run(job, text, on_success, status_code_for))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    async def _run(
+        self,
+        job: CountJob,
+        text: str,
+        on_success: Callable[[str], Coroutine[Any, Any, Any]],
+        status_code_for: Callable[[Exception], int],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+
+        def on_progress(phase: str, info: dict) -> None:
+            # Called from the loading thread; hop back onto the event loop
+            loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self.update(job, progress={"phase": phase, **info}))
+            )
+
+        try:
+            await self.update(job, status="loading", progress={"phase": "loading"})
+            with watch_load_progress(job.model, on_progress):
+                await load_tokenizer_for_counting(job.model)
+            await self.update(job, status="counting")
+            result = await count_tokens_for_model_async(job.model, text, is_commercial=False)
+            await on_success(job.model)
+            await self.update(job, status="done", result=result, status_code=200)
+        except asyncio.CancelledError:
+            # Cancelled by _prune after a TTL without progress; the load thread may still finish
+            await self.update(job, status="failed", error="Timed out waiting for the tokenizer", status_code=504)
+            raise
+        except Exception as e:
+            await self.update(job, status="failed", error=str(e), status_code=status_code_for(e))
+
+    def stats(self) -> dict:
+        """Get job counts by status"""
+        self._prune()
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "jobs": len(self._jobs),
+            "by_status": counts,
+            "ttl_seconds": self.ttl_seconds,
+            "shared_path": self.shared.path if self.shared is not None else None,
+            "following": len(self._followers),
+        }
+
+
+def _open_shared_table() -> Optional[SqliteCountJobTable]:
+    """Open the shared job table, or None if disabled or unavailable"""
+    if not SETTINGS.count_job_db_path:
+        return None
+    try:
+        return SqliteCountJobTable(SETTINGS.count_job_db_path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Shared count job table disabled, jobs stay in this worker: {e}")
+        return None
+
+
+# Global job store
+count_jobs = CountJobStore(
+    ttl_seconds=SETTINGS.count_job_ttl_seconds,
+    max_jobs=SETTINGS.count_job_max_jobs,
+    shared=_open_shared_table(),
+    poll_seconds=SETTINGS.count_job_poll_seconds,
+)
@@ -0,0 +1,78 @@
+"""
+SQLite table of count job states, shared by all uvicorn workers
+
+A job runs in the worker that accepted the 202, but the follow-up poll or
+WebSocket watch can land on any worker. Every state change is written here
+so the other workers can answer for it. Each job carries a sequence number
+and a row is only replaced by a newer state, so out-of-order writes from
+concurrent progress updates never roll a job back.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS count_jobs (
+    job_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    finished INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    payload TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_count_jobs_updated_at ON count_jobs (updated_at);
+"""
+
+
+class SqliteCountJobTable:
+    """Latest state of each count job, keyed by job id"""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def put(self, payload: dict, seq: int, finished: bool, updated_at: float) -> None:
+        """Store a job state unless a newer one (higher seq) is already stored"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO count_jobs (job_id, seq, finished, updated_at, payload) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET seq = excluded.seq, finished = excluded.finished, "
+                "updated_at = excluded.updated_at, payload = excluded.payload "
+                "WHERE excluded.seq > count_jobs.seq",
+                (payload["job_id"], seq, int(finished), updated_at, json.dumps(payload))
+            )
+
+    def get(self, job_id: str) -> Optional[tuple[int, dict]]:
+        """Get (seq, job dict) for a job, or None if unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, payload FROM count_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def prune(self, ttl_seconds: float) -> int:
+        """
+        Delete jobs not updated within ttl_seconds
+
+        Running jobs report progress as they go, so an unfinished row this old
+        belongs to a worker that exited mid-load.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM count_jobs WHERE updated_at < ?", (time.time() - ttl_seconds,)
+            ).rowcount
+
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,196 @@
+"""
+Bounded executor for CPU-bound and blocking tokenization work
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from api.config import SETTINGS
+
+EXECUTOR_KINDS = ("thread", "process")
+
+# Most models remembered as loaded by a process worker
+LOADED_MODELS_LIMIT = 1024
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the tokenization queue is full"""
+    pass
+
+
+class TokenizationExecutor:
+    """
+    Runs tokenization off the event loop with a bounded queue.
+
+    Thread pools suit the Rust tokenizers and tiktoken, which release the GIL.
+    Process pools suit pure-Python tokenizers; functions and arguments must be
+    picklable in that mode. Process workers keep their own tokenizer caches,
+    so the models they have loaded are recorded here (mark_loaded).
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 64,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        """
+        Args:
+            kind: "thread" or "process"
+            max_workers: Pool size
+            max_queue: Tasks allowed to wait for a worker
+            initializer: Called with initargs in each process worker as it starts
+                (thread workers share this process's state and skip it)
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}. Must be one of {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._executor: Executor
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=initializer, initargs=initargs
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="tokenizer"
+            )
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._loaded_models: OrderedDict[str, None] = OrderedDict()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on the pool and await its result
+
+        Raises:
+            ExecutorBusyError: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorBusyError("Tokenization queue is full, try again later")
+            self._pending += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor, func, *args)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def mark_loaded(self, model: str) -> None:
+        """Record that a process worker has loaded a HuggingFace tokenizer"""
+        if self.kind != "process":
+            return
+        with self._lock:
+            self._loaded_models[model] = None
+            self._loaded_models.move_to_end(model)
+            if len(self._loaded_models) > LOADED_MODELS_LIMIT:
+                self._loaded_models.popitem(last=False)
+
+    def has_loaded(self, model: str) -> bool:
+        """
+        True if a process worker has loaded the tokenizer
+
+        The tokenizer files are then on local disk, so a worker that does not
+        hold it yet loads it without downloading.
+        """
+        with self._lock:
+            return model in self._loaded_models
+
+    def stats(self) -> dict:
+        """Get pool size, queue depth and utilization"""
+        with self._lock:
+            pending = self._pending
+            active = min(pending, self.max_workers)
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "active": active,
+                "queued": pending - active,
+                "queue_size": self.max_queue,
+                "utilization": round(active / self.max_workers, 4),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "loaded_models": len(self._loaded_models),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the underlying pool"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[TokenizationExecutor] = None
+_executor_lock = threading.Lock()
+_worker_initializer: tuple[Optional[Callable[..., None]], tuple] = (None, ())
+
+
+def set_worker_initializer(func: Callable[..., None], *args: Any) -> None:
+    """Run func(*args) in every process worker as it starts; call before the pool is created"""
+    global _worker_initializer
+    _worker_initializer = (func, args)
+
+
+def get_executor() -> TokenizationExecutor:
+    """Get the process-wide tokenization executor (created on first use)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                initializer, initargs = _worker_initializer
+                _executor = TokenizationExecutor(
+                    kind=SETTINGS.tokenizer_executor,
+                    max_workers=SETTINGS.tokenizer_workers,
+                    max_queue=SETTINGS.tokenizer_queue_size,
+                    initializer=initializer,
+                    initargs=initargs,
+                )
+    return _executor
+
+
+def get_executor_stats() -> dict:
+    """Get executor stats without creating the pool"""
+    if _executor is None:
+        return {
+            "kind": SETTINGS.tokenizer_executor,
+            "workers": SETTINGS.tokenizer_workers,
+            "active": 0,
+            "queued": 0,
+            "queue_size": SETTINGS.tokenizer_queue_size,
+            "utilization": 0.0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "loaded_models": 0,
+        }
+    return _executor.stats()
+
+
+def shutdown_executor() -> None:
+    """Shut down the tokenization executor (on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
@@ -1,11 +1,25 @@
 """
 Model store service with subscriber pattern for real-time updates
+
+Usage counts of models that are already in the store are not written on every
+request: the async add functions accumulate them in memory and a background
+flusher merges them into models.json on an interval, or sooner once enough
+increments are pending. New models are still written and broadcast at once.
+
+Set MODEL_STORE_DB_PATH to keep the store in SQLite instead of models.json so
+that several uvicorn workers share one set of counts and one version number
+(see model_store_sqlite).
 """
+import asyncio
 import json
 import os
+import time
 from threading import Lock
 from typing import Callable, Optional, Coroutine, Any, TypedDict
 
+from api.config import SETTINGS
+from api.services.model_store_sqlite import SqliteModelStore
+
 # Path to model store JSON file
 MODEL_STORE_PATH = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
@@ -17,6 +31,10 @@ _cache: Optional[dict] = None
 _cache_mtime: Optional[float] = None
 _version: int = 0
 
+# SQLite backend (None while the store lives in models.json)
+_db: Optional[SqliteModelStore] = None
+_db_lock = Lock()
+
 # Type alias for async callback
 AsyncCallback = Callable[[dict, int], Coroutine[Any, Any, None]]
 
@@ -27,6 +45,15 @@ _async_subscribers: list[AsyncCallback] = []
 # Default limit for custom models
 DEFAULT_CUSTOM_MODEL_LIMIT = 20
 
+# Usage increments not yet written to the file: (category, name) -> count.
+# Guarded by its own lock so counting a use never waits for a flush holding _lock
+_pending_usage: dict[tuple[str, str], int] = {}
+_pending_lock = Lock()
+_flusher_task: Optional[asyncio.Task] = None
+_flush_wakeup: Optional[asyncio.Event] = None
+_flush_threshold: int = 0
+_flush_stats = {"flushes": 0, "flushed_increments": 0, "errors": 0, "last_flush_at": None, "last_error": None}
+
 
 class ModelEntry(TypedDict):
     name: str
@@ -64,6 +91,41 @@ def _is_cache_valid() -> bool:
         return False
 
 
+def _default_store() -> dict:
+    """Models offered before anything has been counted"""
+    return {
+        "official": [
+            {"name": "claude-3-7-sonnet", "usage_count": 0},
+            {"name": "gemini-2.0-flash", "usage_count": 0},
+            {"name": "gpt-4o", "usage_count": 0}
+        ],
+        "custom": [
+            {"name": "meta-llama/llama-4-maverick-17b-128e-instruct", "usage_count": 0},
+            {"name": "microsoft/phi-4", "usage_count": 0},
+            {"name": "qwen/qwen2.5-7b-instruct", "usage_count": 0},
+            {"name": "qwen/qwen3-8b", "usage_count": 0}
+        ]
+    }
+
+
+def _seed_from_file() -> dict:
+    """Initial contents of a new SQLite store: models.json if present, else the defaults"""
+    if not os.path.exists(MODEL_STORE_PATH):
+        return _default_store()
+    with open(MODEL_STORE_PATH, 'r', encoding='utf-8') as f:
+        return _migrate_store_format(json.load(f))[0]
+
+
+def _get_db() -> Optional[SqliteModelStore]:
+    """Get the SQLite backend, or None if the store uses models.json"""
+    global _db
+    if _db is None and SETTINGS.model_store_db_path:
+        with _db_lock:
+            if _db is None:
+                _db = SqliteModelStore(SETTINGS.model_store_db_path, seed=_seed_from_file)
+    return _db
+
+
 def _load_store() -> dict:
     """Load store from cache or file"""
     global _cache, _cache_mtime, _version
@@ -72,19 +134,7 @@ def _load_store() -> dict:
         return _cache
 
     if not os.path.exists(MODEL_STORE_PATH):
-        store = {
-            "official": [
-                {"name": "claude-3-7-sonnet", "usage_count": 0},
-                {"name": "gemini-2.0-flash", "usage_count": 0},
-                {"name": "gpt-4o", "usage_count": 0}
-            ],
-            "custom": [
-                {"name": "meta-llama/llama-4-maverick-17b-128e-instruct", "usage_count": 0},
-                {"name": "microsoft/phi-4", "usage_count": 0},
-                {"name": "qwen/qwen2.5-7b-instruct", "usage_count": 0},
-                {"name": "qwen/qwen3-8b", "usage_count": 0}
-            ]
-        }
+        store = _default_store()
         _save_store(store)
         return store
 
@@ -122,6 +172,8 @@ def _save_store(store: dict) -> None:
     os.makedirs(os.path.dirname(MODEL_STORE_PATH), exist_ok=True)
     with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(store, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
     os.replace(tmp_path, MODEL_STORE_PATH)
 
     _cache = store
@@ -167,11 +219,17 @@ def unsubscribe(callback: Callable) -> None:
 
 def get_version() -> int:
     """Get current version number"""
+    db = _get_db()
+    if db is not None:
+        return db.read()["version"]
     return _version
 
 
 def get_official_models() -> list[str]:
     """Get list of commercial models (names only)"""
+    db = _get_db()
+    if db is not None:
+        return list(db.read()["official"])
     store = _load_store()
     models = store.get("official", [])
     return [m['name'] if isinstance(m, dict) else m for m in models]
@@ -179,6 +237,9 @@ def get_official_models() -> list[str]:
 
 def get_custom_models(limit: int = DEFAULT_CUSTOM_MODEL_LIMIT) -> list[str]:
     """Get list of HuggingFace models (names only), sorted by usage_count, limited"""
+    db = _get_db()
+    if db is not None:
+        return db.read()["custom"][:limit]
     store = _load_store()
     models = store.get("custom", [])
     # Already sorted by usage_count descending in _save_store
@@ -188,6 +249,15 @@ def get_custom_models(limit: int = DEFAULT_CUSTOM_MODEL_LIMIT) -> list[str]:
 
 def get_all_models() -> dict:
     """Get all models with version (returns names only, custom limited to top 20)"""
+    db = _get_db()
+    if db is not None:
+        # One read so the lists and the version belong together
+        data = db.read()
+        return {
+            "official": list(data["official"]),
+            "custom": data["custom"][:DEFAULT_CUSTOM_MODEL_LIMIT],
+            "version": data["version"]
+        }
     return {
         "official": get_official_models(),
         "custom": get_custom_models(DEFAULT_CUSTOM_MODEL_LIMIT),
@@ -207,6 +277,11 @@ def _find_model_entry(models: list, name: str) -> tuple[int, Optional[dict]]:
 def add_official_model(model_name: str) -> bool:
     """Add a commercial model or increment usage. Returns True if model was new."""
     name = model_name.lower().strip()
+    db = _get_db()
+    if db is not None:
+        is_new = db.record_use("official", name)
+        _notify_subscribers(get_all_models(), get_version())
+        return is_new
     with _lock:
         store = _load_store()
         models = store.get("official", [])
@@ -233,6 +308,11 @@ def add_official_model(model_name: str) -> bool:
 def add_custom_model(model_name: str) -> bool:
     """Add a HuggingFace model or increment usage. Returns True if model was new."""
     name = model_name.lower().strip()
+    db = _get_db()
+    if db is not None:
+        is_new = db.record_use("custom", name)
+        _notify_subscribers(get_all_models(), get_version())
+        return is_new
     with _lock:
         store = _load_store()
         models = store.get("custom", [])
@@ -256,14 +336,54 @@ def add_custom_model(model_name: str) -> bool:
             return True
 
 
-async def add_official_model_async(model_name: str) -> bool:
-    """Add a commercial model or increment usage (async version). Returns True if model was new."""
-    name = model_name.lower().strip()
-    is_new = False
+def _is_known_model(db: Optional[SqliteModelStore], category: str, name: str) -> bool:
+    """True if the in-memory model lists already hold the model (no file or database access)"""
+    if db is not None:
+        lists = db.cached()
+        return lists is not None and name in lists[category]
+    store = _cache
+    return store is not None and _find_model_entry(store.get(category, []), name)[0] >= 0
+
+
+def _defer_use(category: str, name: str) -> None:
+    """Queue one usage increment for the background flusher"""
+    key = (category, name)
+    with _pending_lock:
+        _pending_usage[key] = _pending_usage.get(key, 0) + 1
+
+
+def _record_use(category: str, name: str) -> tuple[bool, bool]:
+    """
+    Count one use of a model
+
+    Uses of known models are queued without taking _lock, so a flush writing
+    the store in a worker thread does not hold up the event loop.
+
+    Returns:
+        (is_new, deferred): deferred is True if the increment was queued for
+        the background flusher instead of being written now
+    """
+    db = _get_db()
+    flushing = _flusher_task is not None and not _flusher_task.done()
+    if flushing and _is_known_model(db, category, name):
+        _defer_use(category, name)
+        return False, True
+
     with _lock:
-        store = _load_store()
-        models = store.get("official", [])
-        idx, entry = _find_model_entry(models, name)
+        if db is not None:
+            exists = db.contains(category, name)
+        else:
+            store = _load_store()
+            models = store.get(category, [])
+            idx, entry = _find_model_entry(models, name)
+            exists = idx >= 0
+
+        if exists and flushing:
+            _defer_use(category, name)
+            return False, True
+
+        if db is not None:
+            return db.record_use(category, name), False
 
         if idx >= 0:
             # Existing model - increment usage_count
@@ -273,41 +393,150 @@ async def add_official_model_async(model_name: str) -> bool:
                 # Migrate string entry to dict
                 models[idx] = {"name": name, "usage_count": 1}
             _save_store(store)
-        else:
-            # New model
-            store["official"].append({"name": name, "usage_count": 1})
-            _save_store(store)
-            is_new = True
+            return False, False
+
+        # New model
+        store[category].append({"name": name, "usage_count": 1})
+        _save_store(store)
+        return True, False
+
+
+async def _add_model_async(category: str, model_name: str) -> bool:
+    name = model_name.lower().strip()
+    is_new, deferred = _record_use(category, name)
+    if deferred:
+        with _pending_lock:
+            pending = sum(_pending_usage.values())
+        if _flush_wakeup is not None and pending >= _flush_threshold:
+            _flush_wakeup.set()
+        return False
 
-    await _notify_async_subscribers(get_all_models(), _version)
+    await _notify_async_subscribers(get_all_models(), get_version())
     return is_new
 
 
+async def add_official_model_async(model_name: str) -> bool:
+    """Add a commercial model or increment usage (async version). Returns True if model was new."""
+    return await _add_model_async("official", model_name)
+
+
 async def add_custom_model_async(model_name: str) -> bool:
     """Add a HuggingFace model or increment usage (async version). Returns True if model was new."""
-    name = model_name.lower().strip()
-    is_new = False
-    with _lock:
-        store = _load_store()
-        models = store.get("custom", [])
-        idx, entry = _find_model_entry(models, name)
+    return await _add_model_async("custom", model_name)
 
-        if idx >= 0:
-            # Existing model - increment usage_count
-            if isinstance(entry, dict):
-                entry['usage_count'] = entry.get('usage_count', 0) + 1
+
+def flush_usage() -> bool:
+    """
+    Merge pending usage increments into the store
+
+    The file is re-read first, so changes written by other processes are kept.
+    With the SQLite backend the counts are added in one transaction. The
+    pending increments are swapped out under _pending_lock; the write itself
+    holds only _lock, which queuing a use does not take.
+
+    Returns:
+        True if the visible model lists changed (e.g. the custom order)
+    """
+    db = _get_db()
+    with _pending_lock:
+        if not _pending_usage:
+            return False
+        pending = dict(_pending_usage)
+        _pending_usage.clear()
+    with _lock:
+        try:
+            before = get_all_models()
+            if db is not None:
+                db.add_usage(pending)
             else:
-                # Migrate string entry to dict
-                models[idx] = {"name": name, "usage_count": 1}
-            _save_store(store)
-        else:
-            # New model
-            store["custom"].append({"name": name, "usage_count": 1})
-            _save_store(store)
-            is_new = True
+                store = _load_store()
+                for (category, name), count in pending.items():
+                    models = store.setdefault(category, [])
+                    idx, entry = _find_model_entry(models, name)
+                    if idx < 0:
+                        # Removed from the file since the use was counted
+                        models.append({"name": name, "usage_count": count})
+                    elif isinstance(entry, dict):
+                        entry['usage_count'] = entry.get('usage_count', 0) + count
+                    else:
+                        models[idx] = {"name": name, "usage_count": count}
+                _save_store(store)
+        except Exception as e:
+            # Keep the increments for the next attempt
+            with _pending_lock:
+                for key, count in pending.items():
+                    _pending_usage[key] = _pending_usage.get(key, 0) + count
+            invalidate_cache()
+            _flush_stats["errors"] += 1
+            _flush_stats["last_error"] = f"{type(e).__name__}: {e}"
+            raise
+        after = get_all_models()
+
+    _flush_stats["flushes"] += 1
+    _flush_stats["flushed_increments"] += sum(pending.values())
+    _flush_stats["last_flush_at"] = time.time()
+    _flush_stats["last_error"] = None
+    return (before["official"], before["custom"]) != (after["official"], after["custom"])
+
+
+async def _run_usage_flusher(interval_seconds: float) -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_flush_wakeup.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _flush_wakeup.clear()
+        try:
+            if await asyncio.to_thread(flush_usage):
+                await _notify_async_subscribers(get_all_models(), get_version())
+        except Exception:
+            # Recorded in the flush stats; retried on the next tick
+            pass
 
-    await _notify_async_subscribers(get_all_models(), _version)
-    return is_new
+
+def start_usage_flusher(interval_seconds: float, threshold: int) -> None:
+    """
+    Start batching usage increments (call from the running event loop)
+
+    Args:
+        interval_seconds: Longest time an increment waits before being written
+        threshold: Flush early once this many increments are pending
+    """
+    global _flusher_task, _flush_wakeup, _flush_threshold
+    if _flusher_task is not None and not _flusher_task.done():
+        return
+    _flush_wakeup = asyncio.Event()
+    _flush_threshold = max(1, threshold)
+    _flusher_task = asyncio.create_task(_run_usage_flusher(interval_seconds))
+
+
+async def stop_usage_flusher() -> None:
+    """Stop the background flusher and write any pending increments"""
+    global _flusher_task, _flush_wakeup
+    task, _flusher_task = _flusher_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _flush_wakeup = None
+    flush_usage()
+
+
+def get_usage_flush_stats() -> dict:
+    """Get write-behind counters and the increments waiting to be written"""
+    with _pending_lock:
+        pending_models = len(_pending_usage)
+        pending_increments = sum(_pending_usage.values())
+    return {
+        "backend": "sqlite" if _db is not None else "json",
+        "database": _db.stats() if _db is not None else None,
+        "enabled": _flusher_task is not None and not _flusher_task.done(),
+        "pending_models": pending_models,
+        "pending_increments": pending_increments,
+        **_flush_stats,
+    }
 
 
 def invalidate_cache() -> None:
@@ -315,3 +544,5 @@ def invalidate_cache() -> None:
     global _cache, _cache_mtime
     _cache = None
     _cache_mtime = None
+    if _db is not None:
+        _db.invalidate_cache()
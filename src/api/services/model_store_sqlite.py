@@ -0,0 +1,204 @@
+"""
+SQLite backend for the model store, shared by all uvicorn workers
+
+With models.json every worker keeps its own copy of the lists and its own
+version counter, so concurrent workers overwrite each other's increments and
+report different versions. Here all workers use one database in WAL mode:
+usage counts are incremented in SQL, and every change bumps a single version
+row in the same transaction. Each process caches the model lists and
+revalidates them with PRAGMA data_version, which only changes when another
+connection commits.
+"""
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+CATEGORIES = ("official", "custom")
+
+# Official models alphabetically, custom models by usage_count (descending), then name
+_ORDER_BY = {
+    "official": "name",
+    "custom": "usage_count DESC, name",
+}
+
+
+class SqliteModelStore:
+    """Model lists and usage counts in SQLite with a global version number"""
+
+    def __init__(self, path: str, seed: Callable[[], dict]):
+        """
+        Args:
+            path: Database file path
+            seed: Returns the initial store ({"official": [...], "custom": [...]}
+                with {name, usage_count} entries); called once when the database is new
+        """
+        self.path = os.path.expanduser(path)
+        # One connection per process: data_version is tracked per connection,
+        # so a single connection keeps the read cache check meaningful
+        self._lock = threading.Lock()
+        self._cache: Optional[dict] = None
+        self._cache_data_version: Optional[int] = None
+        self._stats = {"reads": 0, "cache_hits": 0, "writes": 0}
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._seed(seed)
+
+    def _seed(self, seed: Callable[[], dict]) -> None:
+        """Import the initial models unless another worker already did"""
+        with self._lock, self._write() as conn:
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = 'version'").fetchone():
+                return
+            store = seed()
+            conn.executemany(
+                "INSERT OR IGNORE INTO models (category, name, usage_count) VALUES (?, ?, ?)",
+                [
+                    (category, entry["name"], entry.get("usage_count", 0))
+                    for category in CATEGORIES
+                    for entry in store.get(category, [])
+                ]
+            )
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('version', 1)")
+
+    def _write(self) -> "_Transaction":
+        """Write transaction that takes the database write lock up front"""
+        return _Transaction(self._conn)
+
+    def _bump_version(self, conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+    def read(self) -> dict:
+        """
+        Get {"official": [names], "custom": [names], "version": int}
+
+        The cached lists are reused until another connection commits.
+        """
+        with self._lock:
+            self._stats["reads"] += 1
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._cache is not None and self._cache_data_version == data_version:
+                self._stats["cache_hits"] += 1
+                return self._cache
+
+            # One read transaction so the lists and the version match
+            self._conn.execute("BEGIN")
+            try:
+                lists = {
+                    category: [
+                        row[0] for row in self._conn.execute(
+                            f"SELECT name FROM models WHERE category = ? ORDER BY {_ORDER_BY[category]}",
+                            (category,)
+                        )
+                    ]
+                    for category in CATEGORIES
+                }
+                version = self._conn.execute(
+                    "SELECT value FROM store_meta WHERE key = 'version'"
+                ).fetchone()[0]
+            finally:
+                self._conn.execute("COMMIT")
+
+            self._cache = {**lists, "version": version}
+            self._cache_data_version = data_version
+            return self._cache
+
+    def cached(self) -> Optional[dict]:
+        """
+        Get the last lists read by this process without touching the database, or None
+
+        Does not wait for a write in progress. The lists may miss models added
+        since; models are never removed, so a name found here is in the store.
+        """
+        return self._cache
+
+    def contains(self, category: str, name: str) -> bool:
+        """True if the model is in the category (from the read cache)"""
+        return name in self.read()[category]
+
+    def record_use(self, category: str, name: str) -> bool:
+        """
+        Increment a model's usage count, adding it with count 1 if missing
+
+        Returns:
+            True if the model was new
+        """
+        with self._lock, self._write() as conn:
+            updated = conn.execute(
+                "UPDATE models SET usage_count = usage_count + 1 WHERE category = ? AND name = ?",
+                (category, name)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO models (category, name, usage_count) VALUES (?, ?, 1)",
+                    (category, name)
+                )
+            self._bump_version(conn)
+            self._after_write()
+            return not updated
+
+    def add_usage(self, counts: dict[tuple[str, str], int]) -> None:
+        """Add batched usage increments ({(category, name): count}) in one transaction"""
+        if not counts:
+            return
+        with self._lock, self._write() as conn:
+            conn.executemany(
+                "INSERT INTO models (category, name, usage_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (category, name) DO UPDATE SET usage_count = usage_count + excluded.usage_count",
+                [(category, name, count) for (category, name), count in counts.items()]
+            )
+            self._bump_version(conn)
+            self._after_write()
+
+    def _after_write(self) -> None:
+        # Our own commits do not change data_version on this connection
+        self._cache = None
+        self._stats["writes"] += 1
+
+    def invalidate_cache(self) -> None:
+        """Drop the read cache"""
+        with self._lock:
+            self._cache = None
+
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        """Get read cache and write counters (this process)"""
+        with self._lock:
+            return {"path": self.path, **self._stats}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
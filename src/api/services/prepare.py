@@ -0,0 +1,105 @@
+"""
+Speculative tokenizer preloading for models selected in the UI
+
+The frontend sends 'prepare_model' over the WebSocket when a HuggingFace model
+is selected, so the tokenizer is usually loaded by the time the user presses
+Count. Prepares are best-effort: they never evict other tokenizers from the
+cache and never retry models that failed recently. A tokenizer's size is only
+known once it is loaded, so a prepared tokenizer that does not fit the
+remaining budget is dropped instead of cached. With a tokenizer daemon the
+load happens in the daemon, and with a process executor in a pool worker;
+both apply the same cache budget.
+"""
+import asyncio
+
+from api.services.executor import get_executor
+from api.services.tokenizer_client import tokenizer_daemon
+from api.services.token_counter import is_tokenizer_ready
+from core.tokenizer_loader import (
+    has_cache_headroom,
+    has_failed_recently,
+    preload_tokenizer,
+)
+
+
+class ModelPreparer:
+    """Deduplicated background tokenizer loads"""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._counts = {
+            "requested": 0,
+            "started": 0,
+            "loaded": 0,
+            # Started, but the tokenizer was loaded by then (daemon, count request)
+            "found_loaded": 0,
+            "failed": 0,
+            "already_loaded": 0,
+            "in_progress": 0,
+            "recently_failed": 0,
+            "no_headroom": 0,
+        }
+
+    def prepare(self, model: str) -> str:
+        """
+        Start loading a HuggingFace tokenizer in the background
+
+        Args:
+            model: Normalized model name
+
+        Returns:
+            Status: "started", "in_progress" (a prepare for the model is already
+            running), "already_loaded", "recently_failed" or "no_headroom"
+            (loading would push another tokenizer out of the cache budget)
+        """
+        self._counts["requested"] += 1
+        if model in self._inflight:
+            status = "in_progress"
+        elif tokenizer_daemon.enabled:
+            status = self._start(model)
+        elif is_tokenizer_ready(model):
+            status = "already_loaded"
+        elif has_failed_recently(model):
+            status = "recently_failed"
+        elif not has_cache_headroom():
+            status = "no_headroom"
+        else:
+            status = self._start(model)
+        self._counts[status] += 1
+        return status
+
+    def _start(self, model: str) -> str:
+        task = asyncio.create_task(self._load(model))
+        self._inflight[model] = task
+        task.add_done_callback(lambda _task: self._inflight.pop(model, None))
+        return "started"
+
+    async def _load(self, model: str) -> None:
+        try:
+            executor = None if tokenizer_daemon.enabled else get_executor()
+            if executor is None:
+                status = await tokenizer_daemon.load(model, if_headroom=True)
+            elif executor.kind == "process":
+                status = await executor.run(preload_tokenizer, model)
+                if status != "no_headroom":
+                    executor.mark_loaded(model)
+            else:
+                status = await asyncio.to_thread(preload_tokenizer, model)
+            if status == "no_headroom":
+                self._counts["no_headroom"] += 1
+            elif status == "already_loaded":
+                self._counts["found_loaded"] += 1
+            else:
+                self._counts["loaded"] += 1
+        except Exception:
+            # Failures are recorded by the loader's negative cache;
+            # the count request reports the error to the user
+            self._counts["failed"] += 1
+
+    def stats(self) -> dict:
+        """Get prepare counters and the models currently loading"""
+        return {**self._counts, "inflight": sorted(self._inflight)}
+
+
+# Global preparer
+model_preparer = ModelPreparer()
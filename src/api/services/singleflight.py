@@ -0,0 +1,48 @@
+"""
+Request coalescing: concurrent calls with the same key share one computation
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight async calls
+
+    The first caller for a key starts the computation as its own task; later
+    callers with the same key await that task instead of starting another.
+    A caller that is cancelled (e.g. the client disconnected) does not cancel
+    the shared computation for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._executions = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key among concurrent callers"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self._executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Get execution and coalescing counts"""
+        return {
+            "in_flight": len(self._calls),
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+        }
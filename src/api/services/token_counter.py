@@ -1,14 +1,27 @@
 """
 Token counting service - handles all token counting logic
 """
-import anthropic
-from google import genai
-import tiktoken
-from typing import Optional
+import asyncio
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
 
 from api.config import SETTINGS
-from core.tokenizer_loader import load_tokenizer
-from core.token_counter import count_tokens
+from api.services.executor import get_executor
+from api.services.singleflight import SingleFlight
+from api.services.tokenizer_client import tokenizer_daemon
+from api.services.upstream_cache import cached_upstream_count
+from api.services.upstream_clients import (
+    anthropic_pool,
+    build_sync_anthropic_client,
+    build_sync_genai_client,
+    google_pool,
+)
+from core.tiktoken_resolver import encoder_for_model, resolve_encoding_name
+from core.tokenizer_loader import is_tokenizer_loaded, load_tokenizer_entry
+from core.token_counter import count_tokens, count_tokens_tiktoken
 from utils.pricing import calculate_cost, get_context_usage
 
 
@@ -22,6 +35,123 @@ class UnsupportedModelError(Exception):
     pass
 
 
+class TokenizerNotLoadedError(Exception):
+    """Raised when a batch count would have to load a HuggingFace tokenizer inline"""
+    pass
+
+
+class TokenCountCache:
+    """
+    In-process LRU cache of token counts with byte-based eviction
+
+    Keys are (tokenizer fingerprint, text digest), so models that share a
+    tokenizer share entries and the text itself is never retained.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, bytes], tuple[int, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def text_digest(text: str) -> bytes:
+        """Hash text for use as a cache key"""
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    @staticmethod
+    def _entry_size(key: tuple[str, bytes], value: int) -> int:
+        """Approximate memory held by one entry"""
+        fingerprint, digest = key
+        return (
+            sys.getsizeof(key) + sys.getsizeof(fingerprint)
+            + sys.getsizeof(digest) + sys.getsizeof(value)
+        )
+
+    def get(self, fingerprint: str, digest: bytes) -> Optional[int]:
+        """Get a cached count, or None on miss"""
+        key = (fingerprint, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, fingerprint: str, digest: bytes, count: int) -> None:
+        """Store a count, evicting least recently used entries over budget"""
+        if self.max_bytes <= 0:
+            return
+        key = (fingerprint, digest)
+        size = self._entry_size(key, count)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (count, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset stats"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss and size statistics"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# Global result cache shared by all local tokenizer paths
+result_cache = TokenCountCache(max_bytes=SETTINGS.result_cache_max_mb * 1024 * 1024)
+
+
+# Coalesces concurrent identical (model, text) count requests
+count_flight = SingleFlight()
+
+
+def cached_count(fingerprint: str, text: str, count_fn: Callable[[], int]) -> int:
+    """
+    Return the cached count for (fingerprint, text), computing it on a miss
+
+    Args:
+        fingerprint: Tokenizer identity
+        text: Text being counted
+        count_fn: Computes the count when it is not cached
+
+    Returns:
+        Token count
+    """
+    digest = TokenCountCache.text_digest(text)
+    count = result_cache.get(fingerprint, digest)
+    if count is None:
+        count = count_fn()
+        result_cache.put(fingerprint, digest, count)
+    return count
+
+
 def validate_api_key_for_model(model_name: str) -> None:
     """
     Validate that required API key exists for the model
@@ -40,9 +170,9 @@ def validate_api_key_for_model(model_name: str) -> None:
             raise APIKeyMissingError("Google API key not configured")
 
 
-def count_tokens_claude(model_name: str, text: str) -> int:
+async def count_tokens_claude(model_name: str, text: str) -> int:
     """
-    Count tokens using Anthropic API
+    Count tokens using Anthropic API (pooled async client)
 
     Args:
         model_name: Claude model name
@@ -51,19 +181,20 @@ def count_tokens_claude(model_name: str, text: str) -> int:
     Returns:
         Token count
     """
-    client = anthropic.Anthropic(api_key=SETTINGS.anthropic_api_key)
-    response = client.messages.count_tokens(
-        model=model_name.replace('.', '-'),
-        system="",
-        messages=[{"role": "user", "content": text}],
+    response = await anthropic_pool.call(
+        lambda client: client.messages.count_tokens(
+            model=model_name.replace('.', '-'),
+            system="",
+            messages=[{"role": "user", "content": text}],
+        )
     )
     # Remove template cost (7 tokens)
     return response.input_tokens - 7
 
 
-def count_tokens_gemini(model_name: str, text: str) -> int:
+async def count_tokens_gemini(model_name: str, text: str) -> int:
     """
-    Count tokens using Google Gemini API
+    Count tokens using Google Gemini API (pooled async client)
 
     Args:
         model_name: Gemini model name
@@ -72,18 +203,61 @@ def count_tokens_gemini(model_name: str, text: str) -> int:
     Returns:
         Token count
     """
-    client = genai.Client(api_key=SETTINGS.google_api_key)
-    response = client.models.count_tokens(
-        model=model_name,
-        contents=text
+    response = await google_pool.call(
+        lambda client: client.aio.models.count_tokens(
+            model=model_name,
+            contents=text
+        )
     )
     return response.total_tokens
 
 
+def count_tokens_claude_sync(model_name: str, text: str) -> int:
+    """
+    Count tokens using Anthropic API (blocking, for count_tokens_for_model)
+
+    Args:
+        model_name: Claude model name
+        text: Text to count tokens for
+
+    Returns:
+        Token count
+    """
+    with build_sync_anthropic_client() as client:
+        response = client.messages.count_tokens(
+            model=model_name.replace('.', '-'),
+            system="",
+            messages=[{"role": "user", "content": text}],
+        )
+    # Remove template cost (7 tokens)
+    return response.input_tokens - 7
+
+
+def count_tokens_gemini_sync(model_name: str, text: str) -> int:
+    """
+    Count tokens using Google Gemini API (blocking, for count_tokens_for_model)
+
+    Args:
+        model_name: Gemini model name
+        text: Text to count tokens for
+
+    Returns:
+        Token count
+    """
+    with build_sync_genai_client() as client:
+        response = client.models.count_tokens(
+            model=model_name,
+            contents=text
+        )
+    return response.total_tokens
+
+
 def count_tokens_gpt(model_name: str, text: str) -> int:
     """
     Count tokens using tiktoken
 
+    Unknown models (gpt-5, etc.) resolve to the gpt-4o encoding.
+
     Args:
         model_name: GPT model name
         text: Text to count tokens for
@@ -91,12 +265,8 @@ def count_tokens_gpt(model_name: str, text: str) -> int:
     Returns:
         Token count
     """
-    try:
-        encoder = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # New models (gpt-5, etc.) use gpt-4o tokenizer
-        encoder = tiktoken.encoding_for_model("gpt-4o")
-    return len(encoder.encode(text))
+    encoder = encoder_for_model(model_name)
+    return cached_count(f"tiktoken:{encoder.name}", text, lambda: count_tokens_tiktoken(encoder, text))
 
 
 def is_commercial_model(model_name: str) -> bool:
@@ -109,10 +279,44 @@ def is_commercial_model(model_name: str) -> bool:
     )
 
 
+def is_tiktoken_model(model_name: str) -> bool:
+    """Check if model is counted locally with tiktoken (GPT, o-series)"""
+    return "gpt" in model_name or model_name.startswith("o1") or model_name.startswith("o3")
+
+
+def is_upstream_model(model_name: str) -> bool:
+    """Check if model is counted by a provider API (Claude, Gemini)"""
+    return "claude" in model_name or "gemini" in model_name
+
+
+async def count_tokens_upstream(model_name: str, text: str) -> int:
+    """
+    Count tokens for Claude/Gemini models via the provider API
+
+    Args:
+        model_name: Normalized model name
+        text: Text to count tokens for
+
+    Returns:
+        Token count
+
+    Raises:
+        APIKeyMissingError: If API key is missing
+        Exception: API errors
+    """
+    validate_api_key_for_model(model_name)
+    if "claude" in model_name:
+        return await cached_upstream_count(model_name, text, count_tokens_claude)
+    return await cached_upstream_count(model_name, text, count_tokens_gemini)
+
+
 def count_tokens_commercial(model_name: str, text: str) -> int:
     """
     Count tokens for commercial models
 
+    GPT models use tiktoken locally. Claude and Gemini call the provider API
+    with a blocking client; the async API path uses count_tokens_upstream.
+
     Args:
         model_name: Normalized model name
         text: Text to count tokens for
@@ -123,18 +327,17 @@ def count_tokens_commercial(model_name: str, text: str) -> int:
     Raises:
         APIKeyMissingError: If API key is missing
         UnsupportedModelError: If model is not supported
-        Exception: API errors
     """
-    if "claude" in model_name:
+    if is_tiktoken_model(model_name):
+        return count_tokens_gpt(model_name, text)
+
+    elif "claude" in model_name:
         validate_api_key_for_model(model_name)
-        return count_tokens_claude(model_name, text)
+        return count_tokens_claude_sync(model_name, text)
 
     elif "gemini" in model_name:
         validate_api_key_for_model(model_name)
-        return count_tokens_gemini(model_name, text)
-
-    elif "gpt" in model_name or model_name.startswith("o1") or model_name.startswith("o3"):
-        return count_tokens_gpt(model_name, text)
+        return count_tokens_gemini_sync(model_name, text)
 
     else:
         raise UnsupportedModelError(f"Unsupported commercial model: {model_name}")
@@ -151,8 +354,89 @@ def count_tokens_huggingface(model_name: str, text: str) -> int:
     Returns:
         Token count
     """
-    tokenizer = load_tokenizer(model_name)
-    return count_tokens(tokenizer, text)
+    entry = load_tokenizer_entry(model_name)
+    return cached_count(
+        entry.fingerprint,
+        text,
+        lambda: count_tokens(
+            entry.tokenizer, text, add_special_tokens=True, allow_chunking=entry.chunk_safe
+        )
+    )
+
+
+def _load_tokenizer_in_worker(model_name: str) -> None:
+    """Load a HuggingFace tokenizer into the calling pool worker's cache"""
+    load_tokenizer_entry(model_name)
+
+
+def is_tokenizer_ready(model_name: str) -> bool:
+    """
+    Check if a HuggingFace model can be counted without waiting for a download
+
+    Thread executors count with this process's tokenizer cache. Process
+    executors count in their workers, so a model counts as ready once any
+    worker has loaded it.
+    """
+    executor = get_executor()
+    if executor.kind == "process":
+        return executor.has_loaded(model_name)
+    return is_tokenizer_loaded(model_name)
+
+
+async def load_tokenizer_for_counting(model_name: str) -> None:
+    """
+    Load a HuggingFace tokenizer where counts run
+
+    Thread executors load into this process in a worker thread (load progress
+    listeners are notified). Process executors load in a pool worker, which
+    takes one of the pool's slots while it downloads.
+
+    Raises:
+        ExecutorBusyError: If the process pool's queue is full
+    """
+    executor = get_executor()
+    if executor.kind == "process":
+        await executor.run(_load_tokenizer_in_worker, model_name)
+        executor.mark_loaded(model_name)
+    else:
+        await asyncio.to_thread(load_tokenizer_entry, model_name)
+
+
+async def count_tokens_via_daemon(model_name: str, text: str, is_commercial: bool) -> int:
+    """
+    Count tokens with the shared tokenizer daemon instead of in-process tokenizers
+
+    Results are still cached per worker, keyed by the fingerprint the daemon
+    last reported for the model.
+
+    Args:
+        model_name: Normalized model name
+        text: Text to count tokens for
+        is_commercial: Whether it's a commercial (tiktoken) model
+
+    Returns:
+        Token count
+
+    Raises:
+        UnsupportedModelError: If model is not supported
+        TokenizerDaemonError: If the daemon failed to count
+    """
+    if is_commercial and not is_tiktoken_model(model_name):
+        raise UnsupportedModelError(f"Unsupported commercial model: {model_name}")
+
+    if is_commercial:
+        fingerprint = f"tiktoken:{resolve_encoding_name(model_name)}"
+    else:
+        fingerprint = tokenizer_daemon.fingerprint(model_name)
+    digest = TokenCountCache.text_digest(text)
+    if fingerprint is not None:
+        count = result_cache.get(fingerprint, digest)
+        if count is not None:
+            return count
+
+    count, fingerprint = await tokenizer_daemon.count(model_name, text, tiktoken=is_commercial)
+    result_cache.put(fingerprint, digest, count)
+    return count
 
 
 def count_tokens_for_model(
@@ -161,7 +445,10 @@ def count_tokens_for_model(
     is_commercial: bool
 ) -> dict:
     """
-    Main function to count tokens for any model
+    Count tokens synchronously (tiktoken, HuggingFace or provider API)
+
+    count_tokens_for_model_async runs local counts on the tokenization
+    executor and awaits Claude/Gemini through the pooled async clients.
 
     Args:
         model_name: Model name
@@ -178,6 +465,20 @@ def count_tokens_for_model(
     else:
         token_count = count_tokens_huggingface(normalized_name, text)
 
+    return build_count_result(normalized_name, token_count)
+
+
+def build_count_result(normalized_name: str, token_count: int) -> dict:
+    """
+    Build the response dict with cost and context usage for a token count
+
+    Args:
+        normalized_name: Normalized model name
+        token_count: Token count
+
+    Returns:
+        Dict with token_count, cost_usd, context_window, context_usage_percent
+    """
     # Calculate cost and context usage
     cost = calculate_cost(normalized_name, token_count)
     context_result = get_context_usage(normalized_name, token_count)
@@ -196,3 +497,86 @@ def count_tokens_for_model(
         result["context_usage_percent"] = round(usage_percent, 4)
 
     return result
+
+
+async def count_tokens_for_model_async(
+    model_name: str,
+    text: str,
+    is_commercial: bool
+) -> dict:
+    """
+    Main function to count tokens for any model
+
+    Claude/Gemini are awaited on pooled async clients. Local tokenizers run
+    on the tokenization executor to keep CPU-bound encoding off the event loop,
+    or in the shared tokenizer daemon if one is configured.
+    Concurrent identical requests share one computation.
+
+    Raises:
+        APIKeyMissingError: If API key is missing
+        UnsupportedModelError: If model is not supported
+        ExecutorBusyError: If the tokenization queue is full
+    """
+    normalized_name = model_name.lower().strip()
+
+    async def compute() -> dict:
+        if is_commercial and is_upstream_model(normalized_name):
+            token_count = await count_tokens_upstream(normalized_name, text)
+            return build_count_result(normalized_name, token_count)
+        if tokenizer_daemon.enabled:
+            token_count = await count_tokens_via_daemon(normalized_name, text, is_commercial)
+            return build_count_result(normalized_name, token_count)
+        executor = get_executor()
+        result = await executor.run(count_tokens_for_model, normalized_name, text, is_commercial)
+        if not is_commercial:
+            executor.mark_loaded(normalized_name)
+        return result
+
+    key = (normalized_name, is_commercial, TokenCountCache.text_digest(text))
+    return await count_flight.do(key, compute)
+
+
+async def count_tokens_for_models(
+    model_names: list[str],
+    text: str,
+    is_commercial: bool,
+    require_loaded: bool = False
+) -> list[tuple[str, Optional[dict], Optional[Exception]]]:
+    """
+    Count tokens for one text against several models concurrently
+
+    Duplicate names (after normalization) are counted once.
+
+    Args:
+        model_names: Model names
+        text: Text to count tokens for
+        is_commercial: Whether the models are commercial models
+        require_loaded: Fail HuggingFace models whose tokenizer is not loaded
+            with TokenizerNotLoadedError instead of loading it inline
+
+    Returns:
+        List of (normalized_name, result, error) in request order.
+        Exactly one of result and error is set.
+    """
+    normalized_names = list(dict.fromkeys(name.lower().strip() for name in model_names))
+
+    async def count(name: str) -> dict:
+        if require_loaded and not is_commercial and not is_tokenizer_ready(name):
+            raise TokenizerNotLoadedError(
+                f"Tokenizer for {name} is not loaded yet; "
+                "POST /api/count-tokens loads it in the background and returns a job"
+            )
+        return await count_tokens_for_model_async(name, text, is_commercial)
+
+    outcomes = await asyncio.gather(
+        *(count(name) for name in normalized_names),
+        return_exceptions=True
+    )
+
+    results = []
+    for name, outcome in zip(normalized_names, outcomes):
+        if isinstance(outcome, Exception):
+            results.append((name, None, outcome))
+        else:
+            results.append((name, outcome, None))
+    return results
@@ -0,0 +1,210 @@
+"""
+Client for the shared tokenizer daemon (core.tokenizer_daemon)
+
+Each API worker keeps one Unix socket connection to the daemon and pipelines
+requests over it: a request is written as soon as it is made and a reader task
+matches responses to waiting callers by request id.
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+from api.config import SETTINGS
+from core.tokenizer_daemon import (
+    FLAG_IF_HEADROOM,
+    FLAG_SPECIAL_TOKENS,
+    FLAG_TIKTOKEN,
+    OP_COUNT,
+    OP_ENCODE,
+    OP_LOAD,
+    OP_STATS,
+    STATUS_OK,
+    decode_count,
+    decode_ids,
+    decode_response,
+    encode_request,
+    read_frame,
+)
+
+
+class TokenizerDaemonError(Exception):
+    """Error raised by the daemon while handling a request"""
+
+    def __init__(self, error_class: str, message: str):
+        super().__init__(message)
+        self.error_class = error_class
+
+
+class _Connection:
+    """One socket connection with its in-flight requests"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.pending: dict[int, asyncio.Future] = {}
+        self.write_lock = asyncio.Lock()
+        self.closed = False
+        self.task = asyncio.create_task(self._read_responses(reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader) -> None:
+        error: Exception = ConnectionError("Tokenizer daemon closed the connection")
+        try:
+            while True:
+                body = await read_frame(reader)
+                if body is None:
+                    break
+                request_id, status, payload = decode_response(body)
+                future = self.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(payload)
+                else:
+                    details = json.loads(payload)
+                    future.set_exception(TokenizerDaemonError(details["error_class"], details["message"]))
+        except Exception as e:
+            error = ConnectionError(f"Tokenizer daemon connection failed: {e}")
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+            self.writer.close()
+
+    async def send(self, frame: bytes) -> None:
+        async with self.write_lock:
+            self.writer.write(frame)
+            await self.writer.drain()
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+
+class TokenizerDaemonClient:
+    """Pipelined client for the tokenizer daemon, one connection per event loop"""
+
+    def __init__(self, socket_path: str, timeout_seconds: float):
+        self.socket_path = socket_path
+        self.timeout_seconds = timeout_seconds
+        self._connection: Optional[_Connection] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._next_id = 0
+        # Last tokenizer fingerprint the daemon reported per HuggingFace model
+        self._fingerprints: dict[str, str] = {}
+        self._stats = {"requests": 0, "errors": 0, "connects": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """True if a daemon socket is configured"""
+        return bool(self.socket_path)
+
+    async def _connect(self) -> _Connection:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams belong to the loop that opened them
+            self._loop = loop
+            self._connection = None
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._connection is None or self._connection.closed:
+                reader, writer = await asyncio.open_unix_connection(os.path.expanduser(self.socket_path))
+                self._connection = _Connection(reader, writer)
+                self._stats["connects"] += 1
+            return self._connection
+
+    async def _request(self, op: int, flags: int, model: str, text: str = "") -> bytes:
+        connection = await self._connect()
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        connection.pending[request_id] = future
+        self._stats["requests"] += 1
+        try:
+            await connection.send(encode_request(request_id, op, flags, model, text))
+            return await asyncio.wait_for(future, self.timeout_seconds)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            connection.pending.pop(request_id, None)
+
+    async def count(self, model: str, text: str, tiktoken: bool = False, add_special_tokens: bool = True) -> tuple[int, str]:
+        """
+        Count tokens in the daemon
+
+        Args:
+            model: Normalized model name (HuggingFace id, or a GPT/o-series name if tiktoken)
+            text: Text to count tokens for
+            tiktoken: Count with the model's tiktoken encoding
+            add_special_tokens: Include BOS/EOS tokens (HuggingFace only)
+
+        Returns:
+            (token count, tokenizer fingerprint)
+        """
+        flags = (FLAG_TIKTOKEN if tiktoken else 0) | (FLAG_SPECIAL_TOKENS if add_special_tokens else 0)
+        count, fingerprint = decode_count(await self._request(OP_COUNT, flags, model, text))
+        if not tiktoken:
+            self._fingerprints[model] = fingerprint
+        return count, fingerprint
+
+    async def encode(self, model: str, text: str, tiktoken: bool = False, add_special_tokens: bool = True) -> list[int]:
+        """Encode text in the daemon and return the token ids"""
+        flags = (FLAG_TIKTOKEN if tiktoken else 0) | (FLAG_SPECIAL_TOKENS if add_special_tokens else 0)
+        return decode_ids(await self._request(OP_ENCODE, flags, model, text))
+
+    async def load(self, model: str, if_headroom: bool = False) -> str:
+        """
+        Load a HuggingFace tokenizer in the daemon
+
+        Returns:
+            "loaded", "already_loaded", or "no_headroom" if if_headroom is set
+            and the daemon's tokenizer cache is full
+        """
+        payload = await self._request(OP_LOAD, FLAG_IF_HEADROOM if if_headroom else 0, model)
+        return payload.decode("utf-8")
+
+    async def daemon_stats(self) -> dict:
+        """Get the daemon's request, batching and tokenizer cache statistics"""
+        return json.loads(await self._request(OP_STATS, 0, ""))
+
+    def fingerprint(self, model: str) -> Optional[str]:
+        """Last fingerprint the daemon reported for a HuggingFace model"""
+        return self._fingerprints.get(model)
+
+    async def close(self) -> None:
+        """Close the connection of the current event loop"""
+        if self._connection is not None and self._loop is asyncio.get_running_loop():
+            self._connection.close()
+        self._connection = None
+
+    def stats(self) -> dict:
+        """Get client-side counters"""
+        return {
+            "enabled": self.enabled,
+            "socket": self.socket_path or None,
+            "connected": self._connection is not None and not self._connection.closed,
+            "in_flight": len(self._connection.pending) if self._connection is not None else 0,
+            **self._stats,
+        }
+
+
+async def get_tokenizer_daemon_stats() -> Optional[dict]:
+    """Client counters plus the daemon's own stats (None if no daemon is configured)"""
+    if not tokenizer_daemon.enabled:
+        return None
+    stats = tokenizer_daemon.stats()
+    try:
+        stats["daemon"] = await tokenizer_daemon.daemon_stats()
+    except Exception as e:
+        stats["daemon"] = {"error": f"{type(e).__name__}: {e}"}
+    return stats
+
+
+# Global daemon client (disabled unless TOKENIZER_DAEMON_SOCKET is set)
+tokenizer_daemon = TokenizerDaemonClient(
+    socket_path=SETTINGS.tokenizer_daemon_socket,
+    timeout_seconds=SETTINGS.tokenizer_daemon_timeout_seconds,
+)
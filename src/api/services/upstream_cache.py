@@ -0,0 +1,232 @@
+"""
+Persistent cache for paid upstream count_tokens calls (Claude, Gemini)
+
+Backed by a local SQLite database in WAL mode so every uvicorn worker
+shares the same entries.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+from api.config import SETTINGS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Prune expired/excess rows once every this many inserts
+PRUNE_INTERVAL = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upstream_counts (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    token_count INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_upstream_counts_last_hit ON upstream_counts (last_hit_at);
+"""
+
+
+class UpstreamCountCache:
+    """SQLite-backed (model, text hash) → token count cache with TTL and size cap"""
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = os.path.expanduser(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._inserts = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Hash text for use as a cache key"""
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def get(self, model: str, text_hash: str) -> Optional[int]:
+        """Get a fresh cached count, or None on miss"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT token_count FROM upstream_counts "
+            "WHERE model = ? AND text_hash = ? AND created_at > ?",
+            (model, text_hash, now - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        conn.execute(
+            "UPDATE upstream_counts SET hits = hits + 1, last_hit_at = ? "
+            "WHERE model = ? AND text_hash = ?",
+            (now, model, text_hash)
+        )
+        with self._lock:
+            self._hits += 1
+        return row[0]
+
+    def put(self, model: str, text_hash: str, token_count: int, latency_ms: float) -> None:
+        """Store a count with the upstream latency it took to obtain"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO upstream_counts "
+            "(model, text_hash, token_count, latency_ms, created_at, last_hit_at, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (model, text_hash, token_count, latency_ms, now, now)
+        )
+        with self._lock:
+            self._inserts += 1
+            should_prune = self._inserts % PRUNE_INTERVAL == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired rows and the least recently used rows over the size cap"""
+        conn = self._connect()
+        deleted = conn.execute(
+            "DELETE FROM upstream_counts WHERE created_at <= ?",
+            (time.time() - self.ttl_seconds,)
+        ).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM upstream_counts").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            deleted += conn.execute(
+                "DELETE FROM upstream_counts WHERE (model, text_hash) IN ("
+                "SELECT model, text_hash FROM upstream_counts ORDER BY last_hit_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+        return deleted
+
+    def _safe_get(self, model: str, text_hash: str) -> Optional[int]:
+        try:
+            return self.get(model, text_hash)
+        except sqlite3.Error as e:
+            self._record_error(e)
+            return None
+
+    def _safe_put(self, model: str, text_hash: str, token_count: int, latency_ms: float) -> None:
+        try:
+            self.put(model, text_hash, token_count, latency_ms)
+        except sqlite3.Error as e:
+            self._record_error(e)
+
+    async def get_or_count(
+        self,
+        model: str,
+        text: str,
+        count_fn: Callable[[str, str], Awaitable[int]]
+    ) -> int:
+        """
+        Return the cached upstream count, awaiting count_fn(model, text) on a miss
+
+        Database access runs in a worker thread. Cache failures never fail
+        counting; they fall through to the upstream call.
+        """
+        text_hash = self.text_hash(text)
+        cached = await asyncio.to_thread(self._safe_get, model, text_hash)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        token_count = await count_fn(model, text)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        await asyncio.to_thread(self._safe_put, model, text_hash, token_count, latency_ms)
+        return token_count
+
+    def _record_error(self, error: Exception) -> None:
+        with self._lock:
+            self._errors += 1
+        logger.warning(f"Upstream count cache error: {error}")
+
+    def stats(self) -> dict:
+        """Get hit/miss counts (this process) and entry/latency totals (all workers)"""
+        conn = self._connect()
+        entries, total_hits, saved_ms = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * latency_ms), 0) "
+            "FROM upstream_counts"
+        ).fetchone()
+        with self._lock:
+            return {
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "total_hits": total_hits,
+                "saved_latency_ms": round(saved_ms, 1),
+            }
+
+
+_cache: Optional[UpstreamCountCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_upstream_cache() -> Optional[UpstreamCountCache]:
+    """Get the process-wide upstream cache, or None if disabled or unavailable"""
+    global _cache
+    if _cache is None and SETTINGS.upstream_cache_path:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = UpstreamCountCache(
+                        path=SETTINGS.upstream_cache_path,
+                        ttl_seconds=SETTINGS.upstream_cache_ttl_seconds,
+                        max_entries=SETTINGS.upstream_cache_max_entries,
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Upstream count cache disabled: {e}")
+                    return None
+    return _cache
+
+
+async def cached_upstream_count(
+    model: str,
+    text: str,
+    count_fn: Callable[[str, str], Awaitable[int]]
+) -> int:
+    """Count through the persistent cache when it is enabled"""
+    cache = get_upstream_cache()
+    if cache is None:
+        return await count_fn(model, text)
+    return await cache.get_or_count(model, text, count_fn)
+
+
+def get_upstream_cache_stats() -> Optional[dict]:
+    """Get upstream cache stats, or None if disabled"""
+    cache = get_upstream_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.stats()
+    except sqlite3.Error as e:
+        return {"path": cache.path, "error": str(e)}
@@ -0,0 +1,175 @@
+"""
+Long-lived async clients for the Anthropic and Gemini count_tokens APIs
+
+Each provider keeps one keep-alive connection pool per process and a
+concurrency limit, so counting reuses TLS connections instead of
+handshaking on every request. The synchronous count_tokens_for_model path
+builds a one-off blocking client with the same key, base URL and timeout.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+import anthropic
+import httpx
+from google import genai
+from google.genai import types as genai_types
+
+from api.config import SETTINGS
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SETTINGS.upstream_max_connections,
+        max_keepalive_connections=SETTINGS.upstream_max_connections,
+        keepalive_expiry=SETTINGS.upstream_keepalive_seconds,
+    )
+
+
+def _build_anthropic_client() -> anthropic.AsyncAnthropic:
+    kwargs: dict[str, Any] = {
+        "api_key": SETTINGS.anthropic_api_key,
+        "timeout": SETTINGS.upstream_timeout_seconds,
+        "http_client": anthropic.DefaultAsyncHttpxClient(
+            limits=_http_limits(),
+            timeout=SETTINGS.upstream_timeout_seconds,
+        ),
+    }
+    if SETTINGS.anthropic_base_url:
+        kwargs["base_url"] = SETTINGS.anthropic_base_url
+    return anthropic.AsyncAnthropic(**kwargs)
+
+
+def _build_genai_client() -> genai.Client:
+    http_options = genai_types.HttpOptions(
+        timeout=int(SETTINGS.upstream_timeout_seconds * 1000),
+        httpx_async_client=httpx.AsyncClient(
+            limits=_http_limits(),
+            timeout=SETTINGS.upstream_timeout_seconds,
+        ),
+    )
+    if SETTINGS.google_base_url:
+        http_options.base_url = SETTINGS.google_base_url
+    return genai.Client(api_key=SETTINGS.google_api_key, http_options=http_options)
+
+
+def build_sync_anthropic_client() -> anthropic.Anthropic:
+    """Build a blocking Anthropic client for the synchronous counting path"""
+    kwargs: dict[str, Any] = {
+        "api_key": SETTINGS.anthropic_api_key,
+        "timeout": SETTINGS.upstream_timeout_seconds,
+    }
+    if SETTINGS.anthropic_base_url:
+        kwargs["base_url"] = SETTINGS.anthropic_base_url
+    return anthropic.Anthropic(**kwargs)
+
+
+def build_sync_genai_client() -> genai.Client:
+    """Build a blocking Gemini client for the synchronous counting path"""
+    http_options = genai_types.HttpOptions(timeout=int(SETTINGS.upstream_timeout_seconds * 1000))
+    if SETTINGS.google_base_url:
+        http_options.base_url = SETTINGS.google_base_url
+    return genai.Client(api_key=SETTINGS.google_api_key, http_options=http_options)
+
+
+class UpstreamPool:
+    """
+    One provider's async client plus a concurrency limit
+
+    Async clients and semaphores belong to the event loop they were created
+    on, so both are rebuilt if the pool is used from a different loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        closer: Callable[[Any], Awaitable[None]]
+    ):
+        self.name = name
+        self._factory = factory
+        self._closer = closer
+        self._client: Any = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = 0
+        self._errors = 0
+
+    def _ensure(self) -> tuple[Any, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._client is None or self._loop is not loop:
+                self._client = self._factory()
+                self._semaphore = asyncio.Semaphore(SETTINGS.upstream_max_concurrency)
+                self._loop = loop
+            return self._client, self._semaphore
+
+    async def call(self, func: Callable[[Any], Any]) -> Any:
+        """Await func(client) while holding one of the provider's concurrency slots"""
+        client, semaphore = self._ensure()
+        async with semaphore:
+            self._in_flight += 1
+            self._requests += 1
+            try:
+                return await func(client)
+            except Exception:
+                self._errors += 1
+                raise
+            finally:
+                self._in_flight -= 1
+
+    async def aclose(self) -> None:
+        """Close the pooled connections if they belong to the running loop"""
+        with self._lock:
+            client, loop = self._client, self._loop
+            self._client = None
+            self._semaphore = None
+            self._loop = None
+        if client is not None and loop is asyncio.get_running_loop():
+            await self._closer(client)
+
+    def reset(self) -> None:
+        """Drop the client so the next call builds a new one (e.g. after a key change)"""
+        with self._lock:
+            self._client = None
+            self._semaphore = None
+            self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._client is not None,
+            "in_flight": self._in_flight,
+            "max_concurrency": SETTINGS.upstream_max_concurrency,
+            "requests": self._requests,
+            "errors": self._errors,
+        }
+
+
+anthropic_pool = UpstreamPool(
+    "anthropic", _build_anthropic_client, lambda client: client.close()
+)
+google_pool = UpstreamPool(
+    "google", _build_genai_client, lambda client: client.aio.aclose()
+)
+
+
+async def close_upstream_clients() -> None:
+    """Close all pooled clients (on application shutdown)"""
+    await anthropic_pool.aclose()
+    await google_pool.aclose()
+
+
+def reset_upstream_clients() -> None:
+    """Drop all pooled clients"""
+    anthropic_pool.reset()
+    google_pool.reset()
+
+
+def get_upstream_client_stats() -> dict:
+    """Get per-provider connection and concurrency stats"""
+    return {
+        "anthropic": anthropic_pool.stats(),
+        "google": google_pool.stats(),
+    }
@@ -0,0 +1,103 @@
+"""
+Background warm-up of popular tokenizers after startup
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from core.tiktoken_resolver import get_encoder
+from core.tokenizer_loader import load_tokenizer
+
+# tiktoken encodings used by the GPT/o-series models
+TIKTOKEN_ENCODINGS = ("o200k_base", "cl100k_base")
+
+
+class WarmupState:
+    """Progress of the startup warm-up, reported by /api/health"""
+
+    def __init__(self):
+        self.status = "idle"  # idle → running → done
+        self.total = 0
+        self.completed = 0
+        self.failed: dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """True once warm-up has finished (or was never started)"""
+        return self.status != "running"
+
+    def to_dict(self) -> dict:
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": dict(self.failed),
+            "duration_seconds": duration,
+        }
+
+
+# Global warm-up state
+warmup_state = WarmupState()
+
+
+async def run_warmup(
+    model_ids: list[str],
+    encodings: tuple[str, ...] = TIKTOKEN_ENCODINGS,
+    concurrency: int = 2,
+    state: Optional[WarmupState] = None,
+    load_model: Optional[Callable[[str], Awaitable[object]]] = None,
+) -> WarmupState:
+    """
+    Load tiktoken encodings and HuggingFace tokenizers into the process caches
+
+    Loads run in worker threads, so the server keeps accepting traffic.
+    A failing item is recorded and does not stop the others.
+
+    Args:
+        model_ids: HuggingFace model ids to warm, most used first
+        encodings: tiktoken encoding names to warm
+        concurrency: Maximum number of loads at once
+        state: State object to update (defaults to the global one)
+        load_model: Awaitable HuggingFace loader, for tokenizers that live
+            elsewhere (e.g. process pool workers); defaults to this process
+    """
+    state = state or warmup_state
+    jobs: list[tuple[str, Callable[[], Awaitable[object]]]] = [
+        (f"tiktoken:{name}", lambda name=name: asyncio.to_thread(get_encoder, name))
+        for name in encodings
+    ] + [
+        (model_id, lambda model_id=model_id: (
+            load_model(model_id) if load_model else asyncio.to_thread(load_tokenizer, model_id)
+        ))
+        for model_id in model_ids
+    ]
+
+    state.status = "running"
+    state.total = len(jobs)
+    state.completed = 0
+    state.failed = {}
+    state.started_at = time.time()
+    state.finished_at = None
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def warm(name: str, load: Callable[[], Awaitable[object]]) -> None:
+        async with semaphore:
+            try:
+                await load()
+            except Exception as e:
+                state.failed[name] = f"{type(e).__name__}: {e}"
+            finally:
+                state.completed += 1
+
+    try:
+        await asyncio.gather(*(warm(name, load) for name, load in jobs))
+    finally:
+        state.status = "done"
+        state.finished_at = time.time()
+    return state
@@ -0,0 +1,188 @@
+"""
+오프라인 토크나이저 번들
+
+tiktoken BPE 파일과 HuggingFace 토크나이저 파일을 로컬 디렉터리에 모아 두고,
+로더가 네트워크 없이 먼저 이 디렉터리에서 읽도록 합니다.
+
+디렉터리 구조:
+    <bundle>/manifest.json
+    <bundle>/tiktoken/<sha1(BPE URL)>      (tiktoken 캐시 형식 그대로)
+    <bundle>/huggingface/<org>--<name>/tokenizer.json 등
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from huggingface_hub import snapshot_download
+from tokenizers import Tokenizer
+
+from core.token_counter import disable_length_limits
+from utils.config import SETTINGS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# 토크나이저 로드에 필요한 파일 (가중치는 받지 않음)
+HF_TOKENIZER_FILES = [
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "added_tokens.json",
+    "config.json",
+    "vocab.json",
+    "vocab.txt",
+    "merges.txt",
+    "*.model",
+    "*.tiktoken",
+]
+
+
+def bundle_root() -> Optional[Path]:
+    '''설정된 번들 디렉터리를 반환합니다. 설정이 없거나 디렉터리가 없으면 None.'''
+    if not SETTINGS.tokenizer_bundle_dir:
+        return None
+    root = Path(os.path.expanduser(SETTINGS.tokenizer_bundle_dir))
+    return root if root.is_dir() else None
+
+
+def _model_dir_name(model_id: str) -> str:
+    '''모델 ID를 디렉터리 이름으로 바꿉니다 (대소문자 구분 없음).'''
+    return model_id.lower().replace("/", "--")
+
+
+def hf_bundle_path(model_id: str, root: Optional[Path] = None) -> Optional[Path]:
+    '''번들에 들어 있는 모델 디렉터리를 반환합니다. 없으면 None.'''
+    root = root or bundle_root()
+    if root is None:
+        return None
+    path = root / "huggingface" / _model_dir_name(model_id)
+    return path if path.is_dir() else None
+
+
+def activate_tiktoken_bundle() -> bool:
+    '''
+    번들의 tiktoken 디렉터리를 tiktoken 캐시로 지정합니다.
+
+    tiktoken은 캐시 파일의 해시를 검증하므로 손상된 파일은 쓰이지 않습니다.
+    운영자가 TIKTOKEN_CACHE_DIR를 이미 지정했다면 그 값을 그대로 둡니다.
+    '''
+    root = bundle_root()
+    if root is None or not (root / "tiktoken").is_dir():
+        return False
+    if os.environ.get("TIKTOKEN_CACHE_DIR"):
+        logger.debug("TIKTOKEN_CACHE_DIR is already set; not using the tiktoken bundle")
+        return False
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(root / "tiktoken")
+    return True
+
+
+def load_from_bundle(model_id: str):
+    '''번들에서 토크나이저를 로드합니다. 번들에 없으면 None.'''
+    path = hf_bundle_path(model_id)
+    if path is None:
+        return None
+    if (path / "tokenizer.json").is_file():
+        return disable_length_limits(Tokenizer.from_file(str(path / "tokenizer.json")))
+    # tokenizer.json이 없는 저장소는 로컬 경로로 AutoTokenizer 사용 (Hub 요청 없음)
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(str(path), use_fast=True)
+
+
+def _bundle_tiktoken(root: Path, encodings: list[str]) -> list[str]:
+    '''tiktoken 캐시 디렉터리를 번들로 지정한 채 인코딩을 로드해 BPE 파일을 저장합니다.'''
+    import tiktoken
+    import tiktoken.registry
+
+    target = root / "tiktoken"
+    target.mkdir(parents=True, exist_ok=True)
+    previous = os.environ.get("TIKTOKEN_CACHE_DIR")
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(target)
+    try:
+        # 공개 API로 생성자 목록을 채운 뒤 조회 (tiktoken 내부 구조가 바뀌면 None)
+        tiktoken.list_encoding_names()
+        constructors = getattr(tiktoken.registry, "ENCODING_CONSTRUCTORS", None)
+        bundled = []
+        for name in encodings:
+            if isinstance(constructors, dict) and name in constructors:
+                # get_encoding은 프로세스 캐시를 쓰므로 생성자를 직접 호출해 파일을 받음
+                constructors[name]()
+            else:
+                tiktoken.get_encoding(name)
+            bundled.append(name)
+            logger.info(f"Bundled tiktoken encoding {name}")
+        return bundled
+    finally:
+        if previous is None:
+            os.environ.pop("TIKTOKEN_CACHE_DIR", None)
+        else:
+            os.environ["TIKTOKEN_CACHE_DIR"] = previous
+
+
+def _bundle_huggingface(root: Path, model_ids: list[str], token: Optional[str]) -> tuple[list[str], dict]:
+    '''모델별 토크나이저 파일을 번들 디렉터리에 저장합니다.'''
+    bundled, failed = [], {}
+    for model_id in model_ids:
+        target = root / "huggingface" / _model_dir_name(model_id)
+        staging = target.with_name(target.name + ".partial")
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            snapshot_download(
+                model_id,
+                allow_patterns=HF_TOKENIZER_FILES,
+                local_dir=str(staging),
+                token=token,
+            )
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            failed[model_id] = f"{type(e).__name__}: {e}"
+            logger.warning(f"Failed to bundle {model_id}: {e}")
+            continue
+        # 메타데이터 폴더는 번들에 필요 없음
+        shutil.rmtree(staging / ".cache", ignore_errors=True)
+        shutil.rmtree(target, ignore_errors=True)
+        staging.rename(target)
+        bundled.append(model_id)
+        logger.info(f"Bundled tokenizer files for {model_id}")
+    return bundled, failed
+
+
+def create_bundle(
+    root: Path,
+    model_ids: list[str],
+    encodings: list[str],
+    token: Optional[str] = None,
+) -> dict:
+    '''
+    tiktoken 인코딩과 HuggingFace 토크나이저 파일을 번들 디렉터리에 저장합니다.
+
+    Returns:
+        manifest.json에 기록한 내용 (실패한 모델 포함)
+    '''
+    root.mkdir(parents=True, exist_ok=True)
+    tiktoken_encodings = _bundle_tiktoken(root, encodings)
+    hf_models, failed = _bundle_huggingface(root, model_ids, token)
+
+    manifest_path = root / MANIFEST_NAME
+    previous = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.is_file() else {}
+    manifest = {
+        "created_at": time.time(),
+        "tiktoken": sorted(set(previous.get("tiktoken", [])) | set(tiktoken_encodings)),
+        "huggingface": sorted(set(previous.get("huggingface", [])) | {m.lower() for m in hf_models}),
+        "failed": failed,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def get_bundle_info() -> Optional[dict]:
+    '''번들 매니페스트를 반환합니다. 번들이 없으면 None.'''
+    root = bundle_root()
+    if root is None or not (root / MANIFEST_NAME).is_file():
+        return None
+    manifest = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+    return {"path": str(root), **manifest}
@@ -0,0 +1,197 @@
+"""
+큰 텍스트를 프리토크나이저가 절대 합치지 않는 경계에서 나눠 병렬로 토큰 수를 세는 모듈
+
+경계는 "공백이 아닌 문자 + 공백 한 칸 + 글자" 에서 공백 바로 앞입니다.
+GPT-2/cl100k/o200k 계열 정규식과 ByteLevel, Whitespace, Metaspace 프리토크나이저는
+모두 이 위치에서 조각을 끊으므로, 청크별 토큰 수의 합은 한 번에 센 값과 같습니다.
+줄바꿈 묶음(예: "\\n\\n")은 문자열 끝에서 다르게 쪼개질 수 있어 경계로 쓰지 않습니다.
+"""
+import os
+import re
+import threading
+from typing import Callable
+
+from tokenizers import Tokenizer
+
+from utils.config import SETTINGS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 공백이 아닌 문자 뒤, "공백 + 글자" 앞의 위치
+_SAFE_CUT = re.compile(r"(?<=\S)(?= [^\W\d_])")
+
+# 위 경계에서 조각이 끊기는 tiktoken 인코딩
+TIKTOKEN_CHUNK_SAFE_ENCODINGS = frozenset({
+    "gpt2", "r50k_base", "p50k_base", "p50k_edit",
+    "cl100k_base", "o200k_base", "o200k_harmony",
+})
+
+# 문자 단위로만 동작해 경계를 옮기지 않는 노멀라이저
+_SAFE_NORMALIZERS = frozenset({"NFC", "NFD", "NFKC", "NFKD", "Lowercase", "BertNormalizer"})
+# 시퀀스 안에서 허용하는 프리토크나이저
+_SAFE_PRE_TOKENIZERS = frozenset({
+    "ByteLevel", "Whitespace", "WhitespaceSplit", "BertPreTokenizer",
+    "Metaspace", "Split", "Digits", "Punctuation",
+})
+
+# 공백 앞에서 조각을 끊는 것으로 확인된 Split 정규식 (소유 수량자는 _plain_pattern으로 정규화한 형태)
+_SPACE_SPLITTING_PATTERNS = frozenset({
+    # GPT-2 (r50k/p50k)
+    r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+    r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+$|\s+(?!\S)|\s""",
+    # cl100k (Llama 3 등)
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+""",
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s+$|\s*[\r\n]|\s+(?!\S)|\s""",
+    # cl100k에서 숫자를 한 자리씩 나누는 변형 (Qwen2 등)
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+""",
+    # o200k
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?|[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n/]*|\s*[\r\n]+|\s+(?!\S)|\s+""",
+})
+_POSSESSIVE = re.compile(r"([+*?}])\+")
+
+_stats_lock = threading.Lock()
+_stats = {"chunked_counts": 0, "chunks": 0, "verified": 0, "mismatches": 0}
+
+
+def split_text(text: str, chunk_chars: int) -> list[str]:
+    '''텍스트를 약 chunk_chars 길이의 청크로 나눕니다. 안전한 경계가 없으면 나누지 않습니다.'''
+    if chunk_chars <= 0 or len(text) <= chunk_chars:
+        return [text]
+    chunks = []
+    start = 0
+    while len(text) - start > chunk_chars:
+        match = _SAFE_CUT.search(text, start + chunk_chars)
+        if match is None:
+            break
+        chunks.append(text[start:match.start()])
+        start = match.start()
+    chunks.append(text[start:])
+    return chunks
+
+
+def _plain_pattern(pattern: str) -> str:
+    '''소유 수량자(++, *+, ?+, {n}+)를 일반 수량자로 바꿉니다. 이 정규식들에서는 매칭 결과가 같습니다.'''
+    return _POSSESSIVE.sub(r"\1", pattern)
+
+
+def _split_cuts_before_spaces(pre_tokenizer: dict) -> bool:
+    '''Split이 알려진 GPT 계열 정규식으로 매칭 조각을 그대로 남기는지 확인합니다.'''
+    pattern = pre_tokenizer.get("pattern") or {}
+    return (
+        "Regex" in pattern
+        and _plain_pattern(pattern["Regex"]) in _SPACE_SPLITTING_PATTERNS
+        and pre_tokenizer.get("behavior") == "Isolated"
+        and not pre_tokenizer.get("invert", False)
+    )
+
+
+def _splits_on_spaces(pre_tokenizer: dict) -> bool:
+    '''프리토크나이저가 공백 앞에서 조각을 끊는지 확인합니다.'''
+    kind = pre_tokenizer.get("type")
+    if kind == "ByteLevel":
+        return pre_tokenizer.get("use_regex", True)
+    if kind == "Metaspace":
+        return pre_tokenizer.get("split", True)
+    if kind == "Split":
+        # 임의의 패턴(예: 숫자만 분리)은 공백에서 끊는다는 보장이 없음
+        return _split_cuts_before_spaces(pre_tokenizer)
+    return kind in {"Whitespace", "WhitespaceSplit", "BertPreTokenizer"}
+
+
+def is_hf_chunk_safe(spec: dict) -> bool:
+    '''tokenizer.json 정의를 보고 청크 분할 카운트가 단일 패스와 같은지 판단합니다.'''
+    normalizer = spec.get("normalizer")
+    if normalizer is not None:
+        parts = normalizer.get("normalizers", []) if normalizer.get("type") == "Sequence" else [normalizer]
+        if any(part.get("type") not in _SAFE_NORMALIZERS for part in parts):
+            return False
+
+    pre_tokenizer = spec.get("pre_tokenizer")
+    if pre_tokenizer is None:
+        return False
+    if pre_tokenizer.get("type") == "Sequence":
+        parts = pre_tokenizer.get("pretokenizers", [])
+        if any(part.get("type") not in _SAFE_PRE_TOKENIZERS for part in parts):
+            return False
+        if not any(_splits_on_spaces(part) for part in parts):
+            return False
+    elif not _splits_on_spaces(pre_tokenizer):
+        return False
+
+    # 공백이 들어간 추가 토큰은 경계를 가로질러 매칭될 수 있음
+    return not any(
+        any(ch.isspace() for ch in token.get("content", ""))
+        for token in spec.get("added_tokens", [])
+    )
+
+
+def _verify(chunked: int, single_pass: Callable[[], int], label: str) -> int:
+    '''검증 모드: 단일 패스 결과와 비교하고, 다르면 단일 패스 값을 반환합니다.'''
+    expected = single_pass()
+    with _stats_lock:
+        _stats["verified"] += 1
+        if expected != chunked:
+            _stats["mismatches"] += 1
+    if expected != chunked:
+        logger.warning(f"Chunked count mismatch for {label}: {chunked} != {expected}")
+    return expected
+
+
+def _chunks_for(text: str) -> list[str] | None:
+    '''임계값 이상이면 청크 목록을, 아니면 None을 반환합니다.'''
+    if SETTINGS.parallel_count_threshold_chars <= 0 or len(text) < SETTINGS.parallel_count_threshold_chars:
+        return None
+    chunks = split_text(text, SETTINGS.parallel_count_chunk_chars)
+    if len(chunks) < 2:
+        return None
+    with _stats_lock:
+        _stats["chunked_counts"] += 1
+        _stats["chunks"] += len(chunks)
+    return chunks
+
+
+def count_backend_chunked(backend: Tokenizer, text: str, add_special_tokens: bool) -> int | None:
+    '''
+    Rust 토크나이저로 청크를 병렬 인코딩해 합을 반환합니다. 청크로 나누지 않으면 None.
+
+    특수 토큰은 청크마다 붙지 않도록 post_processor가 더하는 개수만 한 번 더합니다.
+    '''
+    chunks = _chunks_for(text)
+    if chunks is None:
+        return None
+    count = sum(len(encoding) for encoding in backend.encode_batch(chunks, add_special_tokens=False))
+    if add_special_tokens and backend.post_processor is not None:
+        count += backend.post_processor.num_special_tokens_to_add(False)
+    if SETTINGS.parallel_count_verify:
+        count = _verify(
+            count,
+            lambda: len(backend.encode(text, add_special_tokens=add_special_tokens)),
+            "huggingface tokenizer",
+        )
+    return count
+
+
+def count_tiktoken_chunked(encoder, text: str) -> int | None:
+    '''tiktoken 인코더로 청크를 여러 스레드에서 인코딩해 합을 반환합니다. 청크로 나누지 않으면 None.'''
+    if encoder.name not in TIKTOKEN_CHUNK_SAFE_ENCODINGS:
+        return None
+    chunks = _chunks_for(text)
+    if chunks is None:
+        return None
+    num_threads = min(len(chunks), os.cpu_count() or 1)
+    count = sum(len(tokens) for tokens in encoder.encode_ordinary_batch(chunks, num_threads=num_threads))
+    if SETTINGS.parallel_count_verify:
+        count = _verify(count, lambda: len(encoder.encode_ordinary(text)), encoder.name)
+    return count
+
+
+def get_chunking_stats() -> dict:
+    '''청크 분할 카운트 통계를 반환합니다.'''
+    with _stats_lock:
+        return {
+            "threshold_chars": SETTINGS.parallel_count_threshold_chars,
+            "chunk_chars": SETTINGS.parallel_count_chunk_chars,
+            "verify": SETTINGS.parallel_count_verify,
+            **_stats,
+        }
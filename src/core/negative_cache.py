@@ -0,0 +1,112 @@
+"""
+실패한 토크나이저 로드를 기억하는 네거티브 캐시
+
+오타, 존재하지 않는 모델 ID, 권한이 없는 gated 저장소를 반복 요청해도
+TTL 동안은 Hub에 다시 묻지 않고 바로 실패합니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+class TokenizerLoadError(Exception):
+    """네거티브 캐시에 기록된 로드 실패 (원래 예외의 클래스 이름과 메시지를 담음)"""
+
+    def __init__(self, model_id: str, error_class: str, message: str):
+        super().__init__(message)
+        self.model_id = model_id
+        self.error_class = error_class
+
+
+@dataclass
+class FailedLoad:
+    """실패한 로드 기록"""
+    error_class: str
+    message: str
+    config_key: str     # 실패 당시 토큰/설정의 해시 (바뀌면 무효)
+    failed_at: float
+    expires_at: float
+    hits: int = 0
+
+
+class FailedLoadCache:
+    """
+    모델 ID → 마지막 로드 실패를 TTL 동안 기억하는 LRU 캐시
+
+    봇이 임의의 ID로 메모리를 채우지 못하도록 항목 수를 제한합니다.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, FailedLoad] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._recorded = 0
+
+    def get(self, model_id: str, config_key: str) -> Optional[FailedLoad]:
+        """유효한 실패 기록을 반환합니다. 만료되었거나 설정이 바뀌었으면 지우고 None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None:
+                return None
+            if entry.expires_at <= now or entry.config_key != config_key:
+                del self._entries[model_id]
+                return None
+            entry.hits += 1
+            self._hits += 1
+            return entry
+
+    def record(self, model_id: str, error: Exception, ttl_seconds: float, config_key: str) -> None:
+        """로드 실패를 기록합니다."""
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        now = time.time()
+        entry = FailedLoad(
+            error_class=type(error).__name__,
+            message=str(error),
+            config_key=config_key,
+            failed_at=now,
+            expires_at=now + ttl_seconds,
+        )
+        with self._lock:
+            self._entries.pop(model_id, None)
+            self._entries[model_id] = entry
+            self._recorded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model_id: Optional[str] = None) -> int:
+        """모델 하나 또는 전체 기록을 지우고 지운 개수를 반환합니다."""
+        with self._lock:
+            if model_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            return 1 if self._entries.pop(model_id, None) is not None else 0
+
+    def stats(self, config_key: Optional[str] = None) -> dict:
+        """실패 기록 목록과 통계를 반환합니다."""
+        now = time.time()
+        with self._lock:
+            entries = [
+                {
+                    "model_id": model_id,
+                    "error_class": entry.error_class,
+                    "message": entry.message,
+                    "age_seconds": round(now - entry.failed_at, 1),
+                    "expires_in_seconds": round(entry.expires_at - now, 1),
+                    "hits": entry.hits,
+                    "stale_config": config_key is not None and entry.config_key != config_key,
+                }
+                for model_id, entry in self._entries.items()
+                if entry.expires_at > now
+            ]
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "recorded": self._recorded,
+            }
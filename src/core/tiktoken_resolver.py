@@ -0,0 +1,59 @@
+"""
+모델 이름 → tiktoken 인코딩 해석기
+
+tiktoken.encoding_for_model은 호출마다 모델 표를 순회하고, 모르는 모델에서는
+KeyError를 던집니다. 여기서는 표를 한 번만 정리해 두고 모델별 결과를 메모이즈하며,
+인코더 객체는 프로세스에 상주시킵니다.
+"""
+import threading
+from functools import lru_cache
+
+import tiktoken
+from tiktoken.model import MODEL_PREFIX_TO_ENCODING, MODEL_TO_ENCODING
+
+from core.bundle import activate_tiktoken_bundle
+
+# gpt-5 등 tiktoken이 모르는 새 모델은 gpt-4o와 같은 인코딩 사용
+FALLBACK_MODEL = "gpt-4o"
+FALLBACK_ENCODING = MODEL_TO_ENCODING[FALLBACK_MODEL]
+
+# 긴 접두사가 먼저 매칭되도록 정렬 (예: "gpt-4o-"가 "gpt-4-"보다 먼저)
+_PREFIXES = sorted(MODEL_PREFIX_TO_ENCODING.items(), key=lambda item: len(item[0]), reverse=True)
+
+_encoders: dict[str, tiktoken.Encoding] = {}
+_encoders_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def resolve_encoding_name(model_name: str) -> str:
+    '''모델 이름에 해당하는 tiktoken 인코딩 이름을 반환합니다.'''
+    encoding_name = MODEL_TO_ENCODING.get(model_name)
+    if encoding_name is not None:
+        return encoding_name
+    for prefix, encoding_name in _PREFIXES:
+        if model_name.startswith(prefix):
+            return encoding_name
+    return FALLBACK_ENCODING
+
+
+def get_encoder(encoding_name: str) -> tiktoken.Encoding:
+    '''인코더를 로드하거나 상주 중인 인코더를 반환합니다. 번들이 있으면 BPE 파일을 번들에서 읽습니다.'''
+    encoder = _encoders.get(encoding_name)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.get(encoding_name)
+            if encoder is None:
+                activate_tiktoken_bundle()
+                encoder = tiktoken.get_encoding(encoding_name)
+                _encoders[encoding_name] = encoder
+    return encoder
+
+
+def encoder_for_model(model_name: str) -> tiktoken.Encoding:
+    '''모델 이름에 해당하는 상주 인코더를 반환합니다.'''
+    return get_encoder(resolve_encoding_name(model_name))
+
+
+def loaded_encodings() -> list[str]:
+    '''상주 중인 인코딩 이름 목록을 반환합니다.'''
+    return sorted(_encoders)
@@ -1,8 +1,121 @@
-from transformers import PreTrainedTokenizerBase
+from typing import TYPE_CHECKING, Union
+from tokenizers import Tokenizer
 
-def count_tokens(tokenizer: PreTrainedTokenizerBase, text: str) -> int:
-    """토크나이저와 텍스트를 입력받아 토큰 수를 반환합니다."""
+from core.chunking import count_backend_chunked, count_tiktoken_chunked
+from utils.config import SETTINGS
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase
+
+
+def disable_length_limits(tokenizer: Tokenizer) -> Tokenizer:
+    """
+    tokenizer.json에 저장된 truncation/padding 설정을 끄고 같은 토크나이저를 반환합니다.
+
+    Tokenizer.from_str/from_file은 이 설정을 그대로 살려 두므로, 끄지 않으면
+    encode 길이가 max_length로 잘리거나 채워져 토큰 수가 틀립니다.
+    """
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def count_tokens(
+    tokenizer: Union[Tokenizer, "PreTrainedTokenizerBase"],
+    text: str,
+    add_special_tokens: bool = True,
+    allow_chunking: bool = False,
+) -> int:
+    """
+    토크나이저와 텍스트를 입력받아 토큰 수를 반환합니다.
+
+    fast 토크나이저는 Rust 백엔드의 Encoding 길이만 읽으므로 input_ids/attention_mask
+    파이썬 리스트를 만들지 않습니다.
+
+    Args:
+        tokenizer: tokenizers.Tokenizer 또는 transformers 토크나이저
+        text: 텍스트
+        add_special_tokens: BOS/EOS 등 특수 토큰 포함 여부 (tokenizer(text)와 같은 기본값)
+        allow_chunking: 큰 텍스트를 안전한 경계에서 나눠 병렬로 셀지 여부
+            (TokenizerEntry.chunk_safe인 토크나이저만 True로 호출)
+    """
     if not text:
         return 0
-    encoding = tokenizer(text)
-    return len(encoding['input_ids']) 
\ No newline at end of file
+    if isinstance(tokenizer, Tokenizer):
+        backend = tokenizer
+    else:
+        backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        if allow_chunking:
+            count = count_backend_chunked(backend, text, add_special_tokens)
+            if count is not None:
+                return count
+        return len(backend.encode(text, add_special_tokens=add_special_tokens))
+    # slow 토크나이저는 id 리스트 길이로 계산
+    return len(tokenizer.encode(text, add_special_tokens=add_special_tokens)) 
+
+
+def count_tokens_batch(
+    tokenizer: Union[Tokenizer, "PreTrainedTokenizerBase"],
+    texts: list[str],
+    add_special_tokens: bool = True,
+    allow_chunking: bool = False,
+) -> list[int]:
+    """
+    여러 텍스트의 토큰 수를 한 번에 반환합니다.
+
+    fast 토크나이저는 encode_batch로 Rust 스레드 풀에서 병렬로 인코딩합니다.
+    청크 분할 임계값을 넘는 텍스트는 count_tokens로 따로 셉니다.
+    """
+    if isinstance(tokenizer, Tokenizer):
+        backend = tokenizer
+    else:
+        backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is None:
+        return [count_tokens(tokenizer, text, add_special_tokens) for text in texts]
+
+    threshold = SETTINGS.parallel_count_threshold_chars if allow_chunking else 0
+    counts = [0] * len(texts)
+    batch = []
+    for i, text in enumerate(texts):
+        if threshold and len(text) >= threshold:
+            counts[i] = count_tokens(backend, text, add_special_tokens, allow_chunking=True)
+        elif text:
+            batch.append(i)
+    if batch:
+        encodings = backend.encode_batch([texts[i] for i in batch], add_special_tokens=add_special_tokens)
+        for i, encoding in zip(batch, encodings):
+            counts[i] = len(encoding)
+    return counts
+
+
+def count_tokens_tiktoken(encoder, text: str) -> int:
+    """
+    tiktoken 인코더로 토큰 수를 반환합니다.
+
+    특수 토큰 문자열(<|endoftext|> 등)도 일반 텍스트로 인코딩하므로 사용자가
+    붙여넣어도 ValueError가 나지 않습니다. 임계값보다 큰 텍스트는 안전한 경계에서
+    나눠 여러 스레드로 인코딩합니다.
+    """
+    if not text:
+        return 0
+    count = count_tiktoken_chunked(encoder, text)
+    if count is not None:
+        return count
+    return len(encoder.encode_ordinary(text))
+
+
+def count_tokens_tiktoken_batch(encoder, texts: list[str]) -> list[int]:
+    """여러 텍스트의 tiktoken 토큰 수를 한 번에 반환합니다 (큰 텍스트는 청크로 나눠 셈)."""
+    threshold = SETTINGS.parallel_count_threshold_chars
+    counts = [0] * len(texts)
+    batch = []
+    for i, text in enumerate(texts):
+        if threshold and len(text) >= threshold:
+            counts[i] = count_tokens_tiktoken(encoder, text)
+        elif text:
+            batch.append(i)
+    if batch:
+        for i, tokens in zip(batch, encoder.encode_ordinary_batch([texts[i] for i in batch])):
+            counts[i] = len(tokens)
+    return counts
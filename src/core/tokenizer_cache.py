@@ -0,0 +1,208 @@
+"""
+메모리 예산 기반 LRU 토크나이저 캐시
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+
+@dataclass(frozen=True)
+class TokenizerEntry:
+    """캐시에 저장되는 토크나이저와 메타데이터"""
+    tokenizer: Any
+    fingerprint: str  # 토크나이저 정의의 해시 (같은 어휘면 같은 값)
+    size_bytes: int   # 대략적인 메모리 사용량
+    chunk_safe: bool = False  # 큰 텍스트를 청크로 나눠 세도 결과가 같은지
+
+
+class TokenizerCache:
+    """
+    메모리 예산을 넘으면 가장 오래 사용하지 않은 토크나이저부터 제거하는 캐시
+
+    고정(pinned)된 모델은 제거하지 않습니다. 방금 추가한 항목도 제거하지 않으므로
+    예산보다 큰 토크나이저 하나는 캐시에 남을 수 있습니다.
+
+    여러 모델 ID가 같은 토크나이저 인스턴스를 공유할 수 있습니다(별칭). 메모리는
+    인스턴스마다 한 번만 계산하고, 제거할 때는 별칭 그룹 전체를 함께 제거합니다.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict[str, TokenizerEntry] = OrderedDict()
+        self._pinned: set[str] = set()
+        self._instances: dict[int, list] = {}  # id(토크나이저) → [대표 항목, 이를 쓰는 모델 ID 수]
+        self._by_fingerprint: dict[str, TokenizerEntry] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._evicted_bytes = 0
+
+    def get(self, model_id: str) -> Optional[TokenizerEntry]:
+        """항목을 조회하고 최근 사용으로 표시합니다."""
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(model_id)
+            self._hits += 1
+            return entry
+
+    def peek(self, model_id: str) -> Optional[TokenizerEntry]:
+        """통계나 LRU 순서를 바꾸지 않고 항목을 조회합니다."""
+        with self._lock:
+            return self._entries.get(model_id)
+
+    def find(self, fingerprint: str) -> Optional[TokenizerEntry]:
+        """같은 지문의 토크나이저가 캐시에 있으면 그 항목을 반환합니다."""
+        with self._lock:
+            return self._by_fingerprint.get(fingerprint)
+
+    def find_instance(self, tokenizer: Any) -> Optional[TokenizerEntry]:
+        """이 토크나이저 인스턴스를 쓰는 캐시 항목을 반환합니다."""
+        with self._lock:
+            instance = self._instances.get(id(tokenizer))
+            return instance[0] if instance is not None else None
+
+    def __contains__(self, model_id: str) -> bool:
+        with self._lock:
+            return model_id in self._entries
+
+    def _acquire(self, entry: TokenizerEntry) -> None:
+        instance = self._instances.get(id(entry.tokenizer))
+        if instance is None:
+            self._instances[id(entry.tokenizer)] = [entry, 1]
+            self._bytes += entry.size_bytes
+        else:
+            instance[1] += 1
+        self._by_fingerprint.setdefault(entry.fingerprint, entry)
+
+    def _release(self, entry: TokenizerEntry) -> bool:
+        """참조를 하나 줄이고, 인스턴스를 더 쓰는 모델이 없으면 True를 반환합니다."""
+        instance = self._instances[id(entry.tokenizer)]
+        instance[1] -= 1
+        if instance[1] > 0:
+            return False
+        del self._instances[id(entry.tokenizer)]
+        self._bytes -= entry.size_bytes
+        shared = self._by_fingerprint.get(entry.fingerprint)
+        if shared is not None and shared.tokenizer is entry.tokenizer:
+            del self._by_fingerprint[entry.fingerprint]
+            # 같은 지문의 다른 인스턴스가 남아 있으면 그것을 대표로 사용
+            for other in self._entries.values():
+                if other.fingerprint == entry.fingerprint:
+                    self._by_fingerprint[other.fingerprint] = other
+                    break
+        return True
+
+    def put(self, model_id: str, entry: TokenizerEntry) -> list[str]:
+        """항목을 추가하고 예산 초과분을 제거합니다. 제거된 모델 ID 목록을 반환합니다."""
+        with self._lock:
+            previous = self._entries.pop(model_id, None)
+            if previous is not None:
+                self._release(previous)
+            self._entries[model_id] = entry
+            self._acquire(entry)
+            return self._evict_over_budget(keep=model_id)
+
+    def put_if_fits(self, model_id: str, entry: TokenizerEntry) -> bool:
+        """
+        예산을 넘지 않을 때만 항목을 추가합니다. 다른 항목은 제거하지 않습니다.
+
+        이미 캐시에 있는 인스턴스를 공유하는 항목은 메모리를 더 쓰지 않으므로 항상 들어갑니다.
+        이미 있는 모델 ID는 교체하지 않고 True를 반환합니다.
+        """
+        with self._lock:
+            if model_id in self._entries:
+                return True
+            added = 0 if id(entry.tokenizer) in self._instances else entry.size_bytes
+            if self._bytes + added > self.budget_bytes:
+                return False
+            self._entries[model_id] = entry
+            self._acquire(entry)
+            return True
+
+    def remove(self, model_id: str) -> Optional[TokenizerEntry]:
+        """항목을 제거합니다."""
+        with self._lock:
+            entry = self._entries.pop(model_id, None)
+            if entry is not None:
+                self._release(entry)
+            return entry
+
+    def set_pinned(self, model_ids: Iterable[str]) -> None:
+        """제거하지 않을 모델 목록을 설정합니다."""
+        with self._lock:
+            self._pinned = set(model_ids)
+
+    def has_headroom(self) -> bool:
+        """예산에 여유가 있는지 확인합니다 (새 항목이 들어갈지는 put_if_fits가 판단)."""
+        with self._lock:
+            return self._bytes < self.budget_bytes
+
+    def _evict_over_budget(self, keep: str) -> list[str]:
+        evicted = []
+        if self._bytes <= self.budget_bytes:
+            return evicted
+        for model_id in list(self._entries):
+            if self._bytes <= self.budget_bytes:
+                break
+            entry = self._entries.get(model_id)
+            if entry is None:
+                continue  # 앞서 별칭 그룹과 함께 제거됨
+            group = [m for m, e in self._entries.items() if e.tokenizer is entry.tokenizer]
+            if keep in group or any(m in self._pinned for m in group):
+                continue
+            for alias in group:
+                self._release(self._entries.pop(alias))
+                self._evictions += 1
+                evicted.append(alias)
+            self._evicted_bytes += entry.size_bytes
+        return evicted
+
+    def clear(self) -> None:
+        """모든 항목을 제거합니다 (테스트용)."""
+        with self._lock:
+            self._entries.clear()
+            self._instances.clear()
+            self._by_fingerprint.clear()
+            self._bytes = 0
+
+    def alias_groups(self) -> list[dict]:
+        """토크나이저 인스턴스를 공유하는 모델 그룹과 절약한 메모리를 반환합니다."""
+        with self._lock:
+            groups: dict[int, list[str]] = {}
+            for model_id, entry in self._entries.items():
+                groups.setdefault(id(entry.tokenizer), []).append(model_id)
+            return [
+                {
+                    "fingerprint": self._entries[models[0]].fingerprint,
+                    "models": models,
+                    "size_bytes": self._entries[models[0]].size_bytes,
+                    "saved_bytes": self._entries[models[0]].size_bytes * (len(models) - 1),
+                }
+                for models in groups.values()
+                if len(models) > 1
+            ]
+
+    def stats(self) -> dict:
+        """캐시 크기, 적중률, 제거 통계를 반환합니다."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "instances": len(self._instances),
+                "bytes": self._bytes,
+                "shared_bytes_saved": sum(
+                    entry.size_bytes * (refs - 1) for entry, refs in self._instances.values()
+                ),
+                "budget_bytes": self.budget_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "evicted_bytes": self._evicted_bytes,
+                "pinned": sorted(self._pinned),
+                "models": list(self._entries),
+            }
@@ -0,0 +1,379 @@
+"""
+여러 API 워커가 함께 쓰는 토크나이저 데몬
+
+uvicorn 워커마다 토크나이저를 따로 올리면 메모리와 콜드 로드가 워커 수만큼 늘어납니다.
+데몬 프로세스 하나가 토크나이저를 한 벌만 들고, 워커는 Unix 도메인 소켓으로
+토큰 수 계산과 인코딩을 요청합니다.
+
+프로토콜 (리틀 엔디언, 프레임 = 본문 길이 u32 + 본문):
+    요청 본문: request_id(u32) op(u8) flags(u8) model_len(u16) model(utf-8) text(utf-8)
+    응답 본문: request_id(u32) status(u8) payload
+        COUNT  → 토큰 수(u64) + 토크나이저 지문(utf-8)
+        ENCODE → 토큰 id 배열(u32 * n)
+        LOAD   → 상태 문자열(utf-8)
+        STATS  → JSON
+        오류    → JSON {"error_class", "message"}
+
+한 연결에서 응답을 기다리지 않고 여러 요청을 보낼 수 있고(파이프라이닝), 응답은
+끝나는 순서대로 request_id와 함께 돌아옵니다. 같은 이벤트 루프 차례에 도착한
+같은 모델의 요청은 모아서 encode_batch 한 번으로 셉니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from core.tiktoken_resolver import encoder_for_model
+from core.token_counter import count_tokens_batch, count_tokens_tiktoken_batch
+from core.tokenizer_loader import (
+    get_tokenizer_alias_stats,
+    get_tokenizer_cache_stats,
+    is_tokenizer_loaded,
+    load_tokenizer_entry,
+    preload_tokenizer,
+)
+from utils.config import SETTINGS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+OP_COUNT = 1
+OP_ENCODE = 2
+OP_LOAD = 3
+OP_STATS = 4
+
+FLAG_SPECIAL_TOKENS = 0x01  # BOS/EOS 등 특수 토큰 포함 (HuggingFace)
+FLAG_TIKTOKEN = 0x02        # model을 tiktoken 모델 이름으로 해석
+FLAG_IF_HEADROOM = 0x04     # LOAD: 캐시 예산에 여유가 있을 때만 로드
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# 잘못된 길이 헤더로 메모리를 다 쓰지 않도록 프레임 크기 제한
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+_FRAME = struct.Struct("<I")
+_REQUEST = struct.Struct("<IBBH")
+_RESPONSE = struct.Struct("<IB")
+_COUNT = struct.Struct("<Q")
+
+
+def encode_request(request_id: int, op: int, flags: int, model: str, text: str = "") -> bytes:
+    '''요청 프레임을 만듭니다.'''
+    model_bytes = model.encode("utf-8")
+    body = (
+        _REQUEST.pack(request_id, op, flags, len(model_bytes))
+        + model_bytes
+        + text.encode("utf-8", "surrogatepass")
+    )
+    return _FRAME.pack(len(body)) + body
+
+
+def decode_request(body: bytes) -> tuple[int, int, int, str, str]:
+    '''요청 본문을 (request_id, op, flags, model, text)로 풉니다.'''
+    request_id, op, flags, model_len = _REQUEST.unpack_from(body)
+    start = _REQUEST.size
+    model = body[start:start + model_len].decode("utf-8")
+    text = body[start + model_len:].decode("utf-8", "surrogatepass")
+    return request_id, op, flags, model, text
+
+
+def encode_response(request_id: int, status: int, payload: bytes) -> bytes:
+    '''응답 프레임을 만듭니다.'''
+    body = _RESPONSE.pack(request_id, status) + payload
+    return _FRAME.pack(len(body)) + body
+
+
+def decode_response(body: bytes) -> tuple[int, int, bytes]:
+    '''응답 본문을 (request_id, status, payload)로 풉니다.'''
+    request_id, status = _RESPONSE.unpack_from(body)
+    return request_id, status, body[_RESPONSE.size:]
+
+
+def decode_count(payload: bytes) -> tuple[int, str]:
+    '''COUNT 응답을 (토큰 수, 지문)으로 풉니다.'''
+    (count,) = _COUNT.unpack_from(payload)
+    return count, payload[_COUNT.size:].decode("utf-8")
+
+
+def decode_ids(payload: bytes) -> list[int]:
+    '''ENCODE 응답을 토큰 id 리스트로 풉니다.'''
+    return list(struct.unpack(f"<{len(payload) // 4}I", payload))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    '''프레임 하나를 읽어 본문을 반환합니다. 연결이 프레임 경계에서 닫히면 None.'''
+    try:
+        header = await reader.readexactly(_FRAME.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    (length,) = _FRAME.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame too large: {length} bytes")
+    return await reader.readexactly(length)
+
+
+def _encode_ids(tokenizer, text: str, add_special_tokens: bool) -> list[int]:
+    '''토크나이저 종류와 상관없이 토큰 id 리스트를 반환합니다.'''
+    encoding = tokenizer.encode(text, add_special_tokens=add_special_tokens)
+    return encoding if isinstance(encoding, list) else encoding.ids
+
+
+class TokenizerDaemon:
+    '''
+    Unix 도메인 소켓으로 토큰 수/인코딩 요청을 처리하는 서버
+
+    토크나이저는 이 프로세스의 tokenizer_loader 캐시에 한 벌만 올라가므로
+    메모리 예산, 네거티브 캐시, 백그라운드 리비전 확인이 그대로 적용됩니다.
+    '''
+
+    def __init__(self, socket_path: str, workers: int = 4, max_batch: int = 64):
+        self.socket_path = os.path.expanduser(socket_path)
+        self.max_batch = max(1, max_batch)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tokenizer-daemon")
+        # (op, flags, model) → 아직 보내지 않은 (text, future) 목록
+        self._pending: dict[tuple[int, int, str], list[tuple[str, asyncio.Future]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._started_at = time.time()
+        self._stats = {
+            "connections": 0,
+            "requests": 0,
+            "errors": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "largest_batch": 0,
+        }
+
+    async def start(self) -> None:
+        '''소켓을 열고 연결을 받기 시작합니다 (남아 있는 소켓 파일은 지움).'''
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        # 같은 사용자로 실행되는 API 워커만 접근
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Tokenizer daemon listening on {self.socket_path}")
+
+    async def serve_forever(self) -> None:
+        '''종료될 때까지 요청을 처리합니다.'''
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        '''소켓을 닫고 작업 스레드를 정리합니다.'''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._stats["connections"] += 1
+        write_lock = asyncio.Lock()
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                body = await read_frame(reader)
+                if body is None:
+                    break
+                if len(body) < _REQUEST.size:
+                    raise ValueError("Malformed request frame")
+                # 응답을 기다리지 않고 다음 요청을 읽음 (파이프라이닝)
+                task = asyncio.create_task(self._respond(writer, write_lock, body))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"Dropping tokenizer daemon connection: {e}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock, body: bytes) -> None:
+        self._stats["requests"] += 1
+        request_id = _REQUEST.unpack_from(body)[0]
+        try:
+            _, op, flags, model, text = decode_request(body)
+            frame = encode_response(request_id, STATUS_OK, await self._submit(op, flags, model, text))
+        except Exception as e:
+            self._stats["errors"] += 1
+            error = {"error_class": type(e).__name__, "message": str(e)}
+            frame = encode_response(request_id, STATUS_ERROR, json.dumps(error).encode("utf-8"))
+        if writer.is_closing():
+            return
+        try:
+            async with write_lock:
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            # 클라이언트가 응답을 기다리지 않고 연결을 닫음
+            pass
+
+    async def _submit(self, op: int, flags: int, model: str, text: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        if op == OP_STATS:
+            return json.dumps(self.stats()).encode("utf-8")
+        if op == OP_LOAD:
+            status = await loop.run_in_executor(self._executor, self._load, model, flags)
+            return status.encode("utf-8")
+        if op not in (OP_COUNT, OP_ENCODE):
+            raise ValueError(f"Unknown op: {op}")
+
+        key = (op, flags, model)
+        future = loop.create_future()
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = []
+            # 이번 루프 차례에 도착한 같은 모델 요청을 모은 뒤 한 번에 처리
+            loop.call_soon(self._flush, key)
+        pending.append((text, future))
+        if len(pending) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple[int, int, str]) -> None:
+        items = self._pending.pop(key, None)
+        if not items:
+            return
+        self._stats["batches"] += 1
+        self._stats["batched_requests"] += len(items)
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
+
+        op, flags, model = key
+        texts = [text for text, _ in items]
+        try:
+            batch = asyncio.get_running_loop().run_in_executor(self._executor, self._run_batch, op, flags, model, texts)
+        except RuntimeError as e:
+            # close() 이후에는 작업 스레드가 새 작업을 받지 않음
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        def deliver(batch: asyncio.Future) -> None:
+            # close()가 대기 중인 작업을 취소하면 exception()이 CancelledError를 던지므로 먼저 확인
+            if batch.cancelled():
+                error = RuntimeError("Tokenizer daemon is shutting down")
+            else:
+                error = batch.exception()
+            for i, (_, future) in enumerate(items):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                    continue
+                result = batch.result()[i]
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        batch.add_done_callback(deliver)
+
+    def _run_batch(self, op: int, flags: int, model: str, texts: list[str]) -> list:
+        '''
+        작업 스레드에서 같은 모델의 요청 묶음을 처리합니다.
+
+        묶음 처리가 실패하면 텍스트를 하나씩 다시 처리해 문제가 있는 요청만 실패시킵니다.
+        반환 목록의 각 항목은 응답 본문(bytes)이거나 그 요청의 예외입니다.
+        '''
+        try:
+            return self._process(op, flags, model, texts)
+        except Exception:
+            if len(texts) == 1:
+                raise
+        results = []
+        for text in texts:
+            try:
+                results.append(self._process(op, flags, model, [text])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _process(self, op: int, flags: int, model: str, texts: list[str]) -> list[bytes]:
+        if flags & FLAG_TIKTOKEN:
+            encoder = encoder_for_model(model)
+            if op == OP_ENCODE:
+                return [struct.pack(f"<{len(ids)}I", *ids) for ids in encoder.encode_ordinary_batch(texts)]
+            fingerprint = f"tiktoken:{encoder.name}".encode("utf-8")
+            return [_COUNT.pack(count) + fingerprint for count in count_tokens_tiktoken_batch(encoder, texts)]
+
+        entry = load_tokenizer_entry(model)
+        add_special_tokens = bool(flags & FLAG_SPECIAL_TOKENS)
+        if op == OP_ENCODE:
+            encoded = []
+            for text in texts:
+                ids = _encode_ids(entry.tokenizer, text, add_special_tokens)
+                encoded.append(struct.pack(f"<{len(ids)}I", *ids))
+            return encoded
+        fingerprint = entry.fingerprint.encode("utf-8")
+        counts = count_tokens_batch(entry.tokenizer, texts, add_special_tokens, allow_chunking=entry.chunk_safe)
+        return [_COUNT.pack(count) + fingerprint for count in counts]
+
+    def _load(self, model: str, flags: int) -> str:
+        '''토크나이저를 미리 로드합니다 (API 워커의 prepare_model).'''
+        if flags & FLAG_IF_HEADROOM:
+            # 로드한 토크나이저가 예산을 넘으면 다른 모델을 제거하지 않고 버림
+            return preload_tokenizer(model)
+        if is_tokenizer_loaded(model):
+            return "already_loaded"
+        load_tokenizer_entry(model)
+        return "loaded"
+
+    def preload(self, model_ids: list[str]) -> None:
+        '''시작할 때 토크나이저를 백그라운드로 로드합니다 (실패는 로그만 남김).'''
+        def load(model_id: str) -> None:
+            try:
+                self._load(model_id, 0)
+            except Exception as e:
+                logger.warning(f"Failed to preload {model_id}: {e}")
+
+        for model_id in model_ids:
+            self._executor.submit(load, model_id.lower().strip())
+
+    def stats(self) -> dict:
+        '''요청/배치 통계와 토크나이저 캐시 상태를 반환합니다.'''
+        return {
+            **self._stats,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self._started_at, 1),
+            "tokenizer_cache": get_tokenizer_cache_stats(),
+            "tokenizer_aliases": get_tokenizer_alias_stats(),
+        }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    '''데몬을 실행합니다 (scripts/tokenizer_daemon.py).'''
+    parser = argparse.ArgumentParser(description="Shared tokenizer daemon for API workers")
+    parser.add_argument("--socket", default=SETTINGS.tokenizer_daemon_socket,
+                        help="Unix socket path (default: TOKENIZER_DAEMON_SOCKET)")
+    parser.add_argument("--workers", type=int, default=SETTINGS.tokenizer_daemon_workers,
+                        help="Tokenization threads")
+    parser.add_argument("--max-batch", type=int, default=SETTINGS.tokenizer_daemon_max_batch,
+                        help="Maximum requests per encode_batch call")
+    parser.add_argument("--preload", nargs="*", default=[],
+                        help="HuggingFace model ids to load at startup")
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error("--socket or TOKENIZER_DAEMON_SOCKET is required")
+
+    async def run() -> None:
+        daemon = TokenizerDaemon(args.socket, workers=args.workers, max_batch=args.max_batch)
+        daemon.preload(args.preload)
+        await daemon.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -1,34 +1,506 @@
-from transformers import AutoTokenizer
-from huggingface_hub import hf_hub_download, login
+from huggingface_hub import hf_hub_download, login, try_to_load_from_cache
+from huggingface_hub.utils import tqdm as hf_tqdm
+from huggingface_hub.utils import (
+    EntryNotFoundError,
+    HFValidationError,
+    LocalEntryNotFoundError,
+    RepositoryNotFoundError,
+    RevisionNotFoundError,
+)
+from tokenizers import Tokenizer
 import threading
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable
 from utils.config import SETTINGS
+from utils.logger import get_logger
+from core.bundle import load_from_bundle
+from core.chunking import is_hf_chunk_safe
+from core.token_counter import disable_length_limits
+from core.negative_cache import FailedLoadCache, TokenizerLoadError
+from core.tokenizer_cache import TokenizerCache, TokenizerEntry
 
-_tokenizer_lock = threading.Lock()
-_tokenizer_cache: dict[str, AutoTokenizer] = {}
+logger = get_logger(__name__)
 
-def load_tokenizer(model_id: str) -> AutoTokenizer:
-    '''주어진 모델 ID에 대해 토크나이저를 로드하거나 캐시에서 가져옵니다.'''
+# Rust 토크나이저의 메모리 사용량은 tokenizer.json 크기의 약 2배로 추정
+_FAST_TOKENIZER_MEMORY_FACTOR = 2
+# slow 토크나이저는 어휘 항목당 바이트로 추정
+_SLOW_TOKENIZER_BYTES_PER_TOKEN = 120
+
+# 재시도해도 같은 결과인 오류 (gated 저장소는 RepositoryNotFoundError의 하위 클래스)
+_PERMANENT_LOAD_ERRORS = (RepositoryNotFoundError, RevisionNotFoundError, EntryNotFoundError, HFValidationError)
+
+# 이 시간(초) 이상 로드 락을 기다리면 로그 기록
+_SLOW_LOCK_WAIT_SECONDS = 1.0
+# 다운로드 진행 상황 알림 최소 간격(초)
+_PROGRESS_INTERVAL_SECONDS = 0.25
+
+_tokenizer_cache = TokenizerCache(budget_bytes=SETTINGS.tokenizer_cache_budget_mb * 1024 * 1024)
+_failed_loads = FailedLoadCache(max_entries=SETTINGS.tokenizer_negative_max_entries)
+
+# 모델 ID별 로드 락: 서로 다른 모델은 병렬로 로드하고, 같은 모델은 한 번만 로드
+_load_locks_guard = threading.Lock()
+_load_locks: dict[str, list] = {}  # 모델 ID → [락, 대기/보유 스레드 수]
+_lock_wait_stats = {"waits": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+# 로컬 캐시에서 로드한 모델의 새 리비전 확인: 한 번에 하나씩, 모델별 간격 제한
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tokenizer-refresh")
+_refresh_guard = threading.Lock()
+_last_refresh: dict[str, float] = {}  # 모델 ID → 마지막 확인 예약 시각
+_refresh_stats = {"scheduled": 0, "checked": 0, "updated": 0, "failed": 0}
+
+# tokenizer.json 파일 해시 → 토크나이저 지문. 같은 파일이면 파싱하지 않고 캐시된 인스턴스를 공유
+_dedup_guard = threading.Lock()
+_file_fingerprints: dict[str, str] = {}
+_pending_file_hashes: dict[int, tuple[weakref.ref, str]] = {}  # id(방금 파싱한 토크나이저) → (참조, 파일 해시)
+_dedup_stats = {"shared_by_file_hash": 0, "shared_by_fingerprint": 0}
+
+# 모델 ID → 로드 진행 상황 리스너 (phase, info). 로드 스레드에서 호출됨
+ProgressListener = Callable[[str, dict], None]
+_progress_guard = threading.Lock()
+_progress_listeners: dict[str, list[ProgressListener]] = {}
+
+
+@contextmanager
+def _model_load_lock(model_id: str):
+    '''모델 ID별 락을 잡고, 락을 기다린 시간을 기록합니다.'''
+    with _load_locks_guard:
+        slot = _load_locks.setdefault(model_id, [threading.Lock(), 0])
+        slot[1] += 1
+
+    start = time.perf_counter()
+    slot[0].acquire()
+    waited = time.perf_counter() - start
+    with _load_locks_guard:
+        _lock_wait_stats["waits"] += 1
+        _lock_wait_stats["total_wait_seconds"] += waited
+        _lock_wait_stats["max_wait_seconds"] = max(_lock_wait_stats["max_wait_seconds"], waited)
+    if waited >= _SLOW_LOCK_WAIT_SECONDS:
+        logger.info(f"Waited {waited:.1f}s for in-progress load of {model_id}")
+
+    try:
+        yield
+    finally:
+        slot[0].release()
+        with _load_locks_guard:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del _load_locks[model_id]
+
+
+@contextmanager
+def watch_load_progress(model_id: str, listener: ProgressListener):
+    '''
+    블록 안에서 model_id 로드의 진행 상황을 listener(phase, info)로 받습니다.
+
+    phase는 loading → (downloading → initializing →) ready 순서이며 (괄호는 Hub에서 받을 때만),
+    downloading의 info에는 downloaded_bytes/total_bytes가 들어 있습니다.
+    '''
+    with _progress_guard:
+        _progress_listeners.setdefault(model_id, []).append(listener)
+    try:
+        yield
+    finally:
+        with _progress_guard:
+            listeners = _progress_listeners.get(model_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                _progress_listeners.pop(model_id, None)
+
+
+def _report_progress(model_id: str, phase: str, **info) -> None:
+    '''등록된 리스너에 로드 진행 상황을 알립니다. 리스너 오류는 로드에 영향을 주지 않습니다.'''
+    with _progress_guard:
+        listeners = list(_progress_listeners.get(model_id, ()))
+    for listener in listeners:
+        try:
+            listener(phase, info)
+        except Exception as e:
+            logger.warning(f"Load progress listener failed for {model_id}: {e}")
+
+
+def _download_progress(model_id: str) -> type:
+    '''hf_hub_download에 넘길 tqdm 클래스: 받은 바이트 수를 진행 상황으로 알림'''
+
+    class _DownloadProgress(hf_tqdm):
+        def __init__(self, *args, **kwargs):
+            self._total_bytes = kwargs.get("total")
+            self._downloaded = kwargs.get("initial", 0)
+            self._last_report = 0.0
+            super().__init__(*args, **kwargs)
+
+        def update(self, n=1):
+            # 진행 막대가 꺼져 있어도(disable) 받은 바이트 수는 직접 셈
+            self._downloaded += n or 0
+            now = time.monotonic()
+            done = self._total_bytes is not None and self._downloaded >= self._total_bytes
+            if done or now - self._last_report >= _PROGRESS_INTERVAL_SECONDS:
+                self._last_report = now
+                _report_progress(
+                    model_id, "downloading",
+                    downloaded_bytes=self._downloaded, total_bytes=self._total_bytes,
+                )
+            return super().update(n)
+
+    return _DownloadProgress
+
+
+def describe_tokenizer(tokenizer) -> tuple[str, int, bool]:
+    '''
+    토크나이저 정의(tokenizer.json 내용)의 해시, 대략적인 메모리 사용량(바이트),
+    청크 분할 카운트 가능 여부를 반환합니다.
+    '''
+    if isinstance(tokenizer, Tokenizer):
+        backend = tokenizer
+    else:
+        backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        payload = backend.to_str()
+        size_bytes = len(payload) * _FAST_TOKENIZER_MEMORY_FACTOR
+        chunk_safe = is_hf_chunk_safe(json.loads(payload))
+    else:
+        # slow 토크나이저는 어휘와 클래스 이름으로 식별
+        payload = type(tokenizer).__name__ + json.dumps(tokenizer.get_vocab(), sort_keys=True)
+        size_bytes = len(tokenizer) * _SLOW_TOKENIZER_BYTES_PER_TOKEN
+        chunk_safe = False
+    fingerprint = "hf:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return fingerprint, size_bytes, chunk_safe
+
+
+def _tokenizer_from_file(path: str) -> Tokenizer:
+    '''
+    tokenizer.json을 읽어 토크나이저를 만듭니다.
+
+    파일 해시가 캐시에 있는 토크나이저와 같으면 파싱하지 않고 그 인스턴스를 반환합니다.
+    '''
+    with open(path, "rb") as f:
+        data = f.read()
+    file_hash = hashlib.sha256(data).hexdigest()
+    with _dedup_guard:
+        fingerprint = _file_fingerprints.get(file_hash)
+    if fingerprint is not None:
+        shared = _tokenizer_cache.find(fingerprint)
+        if shared is not None:
+            with _dedup_guard:
+                _dedup_stats["shared_by_file_hash"] += 1
+            return shared.tokenizer
+    tokenizer = disable_length_limits(Tokenizer.from_str(data.decode("utf-8")))
+    with _dedup_guard:
+        _pending_file_hashes[id(tokenizer)] = (weakref.ref(tokenizer), file_hash)
+    return tokenizer
+
+
+def _make_entry(tokenizer) -> TokenizerEntry:
+    '''
+    토크나이저로 캐시 항목을 만듭니다.
+
+    지문이 같은 토크나이저가 이미 캐시에 있으면 새 인스턴스 대신 그 항목을 반환해
+    여러 모델 ID가 한 인스턴스를 공유하게 합니다.
+    '''
+    shared = _tokenizer_cache.find_instance(tokenizer)
+    if shared is not None:
+        return shared
+    entry = TokenizerEntry(tokenizer, *describe_tokenizer(tokenizer))
+    with _dedup_guard:
+        pending = _pending_file_hashes.pop(id(tokenizer), None)
+        # id는 재사용될 수 있으므로 같은 객체인지 확인
+        if pending is not None and pending[0]() is tokenizer:
+            _file_fingerprints[pending[1]] = entry.fingerprint
+    shared = _tokenizer_cache.find(entry.fingerprint)
+    if shared is not None:
+        with _dedup_guard:
+            _dedup_stats["shared_by_fingerprint"] += 1
+        return shared
+    return entry
+
+
+def _hub_token() -> str | None:
+    '''gated 모델 접근을 위한 토큰을 반환합니다.'''
+    return SETTINGS.huggingface_hub_token or os.environ.get("HUGGINGFACE_HUB_TOKEN") or None
+
+
+def _config_key() -> str:
+    '''로드 결과에 영향을 주는 토큰/설정의 해시 (바뀌면 실패 기록이 무효가 됨)'''
+    parts = [
+        _hub_token() or "",
+        SETTINGS.hf_endpoint,
+        SETTINGS.cache_dir,
+        SETTINGS.tokenizer_bundle_dir,
+        str(SETTINGS.fast_tokenizer_loader),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _negative_ttl(error: Exception) -> int:
+    '''오류 종류에 따른 실패 기억 시간(초)'''
+    # LocalEntryNotFoundError는 Hub에 연결하지 못했다는 뜻이라 일시적 오류로 취급
+    if isinstance(error, _PERMANENT_LOAD_ERRORS) and not isinstance(error, LocalEntryNotFoundError):
+        return SETTINGS.tokenizer_negative_ttl_seconds
+    return SETTINGS.tokenizer_negative_transient_ttl_seconds
+
+
+def _raise_if_failed_recently(model_id: str) -> None:
+    '''최근 로드에 실패한 모델이면 Hub에 다시 묻지 않고 TokenizerLoadError를 던집니다.'''
+    failure = _failed_loads.get(model_id, _config_key())
+    if failure is not None:
+        raise TokenizerLoadError(model_id, failure.error_class, failure.message)
+
+
+def _load_fast_tokenizer(model_id: str) -> Tokenizer:
+    '''tokenizer.json만 받아 transformers 없이 tokenizers.Tokenizer를 생성합니다.'''
+    path = hf_hub_download(
+        model_id,
+        "tokenizer.json",
+        cache_dir=os.path.expanduser(SETTINGS.cache_dir),
+        token=_hub_token(),
+        endpoint=SETTINGS.hf_endpoint or None,
+        tqdm_class=_download_progress(model_id),
+    )
+    _report_progress(model_id, "initializing")
+    return _tokenizer_from_file(path)
+
+
+def _load_from_local_cache(model_id: str):
+    '''
+    cache_dir에 이미 받은 파일이 있으면 Hub 요청 없이 로드합니다. 없으면 None.
+
+    캐시된 리비전이 최신인지는 확인하지 않으므로 _schedule_refresh로 따로 확인합니다.
+    '''
+    cache_dir = os.path.expanduser(SETTINGS.cache_dir)
+    if SETTINGS.fast_tokenizer_loader:
+        path = try_to_load_from_cache(model_id, "tokenizer.json", cache_dir=cache_dir)
+        if isinstance(path, str):
+            return _tokenizer_from_file(path)
+    if isinstance(try_to_load_from_cache(model_id, "tokenizer_config.json", cache_dir=cache_dir), str):
+        try:
+            return _load_with_transformers(model_id, local_files_only=True)
+        except OSError:
+            # 일부 파일만 캐시된 경우 Hub에서 다시 로드
+            return None
+    return None
+
+
+def _load_with_transformers(model_id: str, local_files_only: bool = False):
+    '''AutoTokenizer로 토크나이저를 로드합니다 (tokenizer.json이 없는 저장소용).'''
+    # transformers는 import 비용이 커서 필요할 때만 가져옴
+    from transformers import AutoTokenizer
+
+    # 캐시 경로 설정
+    cache_dir = os.path.expanduser(SETTINGS.cache_dir)
+    # gated 모델 접근을 위한 토큰 로드
+    token = _hub_token()
+    # Hugging Face CLI 인증 (로컬 캐시만 읽을 때는 불필요)
+    if token and not local_files_only:
+        try:
+            login(token=token, add_to_git_credential=False)
+        except Exception:
+            pass
+    # transformers.from_pretrained 인자 구성
+    kwargs = {"cache_dir": cache_dir, "use_fast": True, "local_files_only": local_files_only}
+    if token:
+        kwargs["token"] = token
+    return AutoTokenizer.from_pretrained(model_id, **kwargs)
+
+
+def _load_from_hub(model_id: str):
+    '''Hugging Face Hub(또는 로컬 캐시)에서 토크나이저를 로드합니다.'''
+    if SETTINGS.fast_tokenizer_loader:
+        try:
+            return _load_fast_tokenizer(model_id)
+        except EntryNotFoundError:
+            # slow/SentencePiece 전용 저장소는 AutoTokenizer로 대체
+            logger.info(f"{model_id} has no tokenizer.json, falling back to AutoTokenizer")
+    return _load_with_transformers(model_id)
+
+
+def load_tokenizer_entry(model_id: str) -> TokenizerEntry:
+    '''
+    토크나이저와 지문, 메모리 추정치를 로드하거나 캐시에서 가져옵니다.
+
+    Raises:
+        TokenizerLoadError: 최근에 같은 모델 로드가 실패해 네거티브 캐시에 남아 있을 때
+    '''
+    entry = _tokenizer_cache.get(model_id)
+    if entry is not None:
+        return entry
+    _raise_if_failed_recently(model_id)
+    return _load_and_cache(model_id, evict=True)
+
+
+def preload_tokenizer(model_id: str) -> str:
+    '''
+    캐시 예산 안에 들어갈 때만 토크나이저를 로드해 캐시에 넣습니다. 다른 모델은 제거하지 않습니다.
+
+    크기는 로드한 뒤에야 알 수 있으므로, 로드했더라도 예산을 넘으면 캐시에 넣지 않고 버립니다.
+
+    Returns:
+        "already_loaded", "loaded" 또는 "no_headroom" (예산이 이미 찼거나 로드한 토크나이저가 들어가지 않음)
+
+    Raises:
+        TokenizerLoadError: 최근에 같은 모델 로드가 실패해 네거티브 캐시에 남아 있을 때
+    '''
     if model_id in _tokenizer_cache:
-        return _tokenizer_cache[model_id]
-
-    with _tokenizer_lock:
-        if model_id in _tokenizer_cache:
-            return _tokenizer_cache[model_id]
-        # 캐시 경로 설정
-        cache_dir = os.path.expanduser(SETTINGS.cache_dir)
-        # gated 모델 접근을 위한 토큰 로드
-        token = SETTINGS.huggingface_hub_token or os.environ.get("HUGGINGFACE_HUB_TOKEN")
-        # Hugging Face CLI 인증
-        if token:
-            try:
-                login(token=token, add_to_git_credential=False)
-            except Exception:
-                pass
-        # transformers.from_pretrained 인자 구성
-        kwargs = {"cache_dir": cache_dir, "use_fast": True}
-        if token:
-            kwargs["token"] = token
-        tokenizer = AutoTokenizer.from_pretrained(model_id, **kwargs)
-        _tokenizer_cache[model_id] = tokenizer
-        return tokenizer 
\ No newline at end of file
+        return "already_loaded"
+    if not _tokenizer_cache.has_headroom():
+        return "no_headroom"
+    _raise_if_failed_recently(model_id)
+    return "loaded" if _load_and_cache(model_id, evict=False) is not None else "no_headroom"
+
+
+def _load_and_cache(model_id: str, evict: bool) -> TokenizerEntry | None:
+    '''
+    모델 락을 잡고 토크나이저를 로드해 캐시에 넣습니다.
+
+    evict가 False이면 예산을 넘을 때 다른 모델을 제거하는 대신 None을 반환합니다.
+    '''
+    with _model_load_lock(model_id):
+        entry = _tokenizer_cache.peek(model_id)
+        if entry is not None:
+            return entry
+        # 락을 기다리는 동안 앞선 로드가 실패했을 수 있음
+        _raise_if_failed_recently(model_id)
+        _report_progress(model_id, "loading")
+        try:
+            # 오프라인 번들, 로컬 캐시 순으로 확인해 네트워크 요청 없이 로드
+            tokenizer = load_from_bundle(model_id)
+            if tokenizer is None:
+                tokenizer = _load_from_local_cache(model_id)
+                if tokenizer is not None:
+                    _schedule_refresh(model_id)
+            if tokenizer is None:
+                tokenizer = _load_from_hub(model_id)
+        except Exception as e:
+            _failed_loads.record(model_id, e, _negative_ttl(e), _config_key())
+            raise
+        entry = _make_entry(tokenizer)
+        if evict:
+            evicted = _tokenizer_cache.put(model_id, entry)
+            if evicted:
+                logger.info(f"Evicted tokenizers over memory budget: {', '.join(evicted)}")
+        elif not _tokenizer_cache.put_if_fits(model_id, entry):
+            logger.info(f"Dropped preloaded {model_id} ({entry.size_bytes} bytes): over tokenizer cache budget")
+            return None
+        _report_progress(model_id, "ready", size_bytes=entry.size_bytes)
+        return entry
+
+
+def _schedule_refresh(model_id: str) -> bool:
+    '''모델별 간격 제한 안에서 백그라운드 리비전 확인을 예약합니다.'''
+    interval = SETTINGS.tokenizer_refresh_interval_seconds
+    if interval <= 0:
+        return False
+    now = time.monotonic()
+    with _refresh_guard:
+        last = _last_refresh.get(model_id)
+        if last is not None and now - last < interval:
+            return False
+        _last_refresh[model_id] = now
+        _refresh_stats["scheduled"] += 1
+    _refresh_executor.submit(_refresh_tokenizer, model_id)
+    return True
+
+
+def _refresh_tokenizer(model_id: str) -> bool:
+    '''
+    Hub에서 최신 토크나이저를 받아, 내용이 바뀌었으면 캐시 항목을 통째로 교체합니다.
+
+    교체는 캐시에 새 항목을 넣는 한 번의 연산이라 진행 중인 요청은 이전 토크나이저로
+    끝나고 이후 요청부터 새 토크나이저를 씁니다. 그 사이 캐시에서 제거된 모델은
+    다시 넣지 않습니다.
+    '''
+    try:
+        entry = _make_entry(_load_from_hub(model_id))
+    except Exception as e:
+        with _refresh_guard:
+            _refresh_stats["failed"] += 1
+        logger.warning(f"Background refresh of {model_id} failed: {e}")
+        return False
+
+    with _model_load_lock(model_id):
+        current = _tokenizer_cache.peek(model_id)
+        updated = current is not None and current.fingerprint != entry.fingerprint
+        if updated:
+            _tokenizer_cache.put(model_id, entry)
+    with _refresh_guard:
+        _refresh_stats["checked"] += 1
+        if updated:
+            _refresh_stats["updated"] += 1
+    if updated:
+        logger.info(f"Swapped in updated tokenizer for {model_id}")
+    return updated
+
+
+def load_tokenizer(model_id: str):
+    '''주어진 모델 ID에 대해 토크나이저를 로드하거나 캐시에서 가져옵니다.'''
+    return load_tokenizer_entry(model_id).tokenizer
+
+
+def is_tokenizer_loaded(model_id: str) -> bool:
+    '''토크나이저가 캐시에 올라와 있어 바로 셀 수 있는지 확인합니다.'''
+    return model_id in _tokenizer_cache
+
+
+def has_cache_headroom() -> bool:
+    '''토크나이저 캐시 예산에 여유가 있어 새 모델을 올려도 다른 모델이 밀려나지 않는지 확인합니다.'''
+    return _tokenizer_cache.has_headroom()
+
+
+def has_failed_recently(model_id: str) -> bool:
+    '''네거티브 캐시에 유효한 로드 실패 기록이 있는지 확인합니다.'''
+    return _failed_loads.get(model_id, _config_key()) is not None
+
+
+def set_pinned_models(model_ids: list[str]) -> None:
+    '''메모리 예산을 넘어도 캐시에서 제거하지 않을 모델을 설정합니다.'''
+    _tokenizer_cache.set_pinned(model_ids)
+
+
+def clear_failed_loads(model_id: str | None = None) -> int:
+    '''모델 하나 또는 전체의 로드 실패 기록을 지웁니다.'''
+    return _failed_loads.invalidate(model_id)
+
+
+def get_failed_load_stats() -> dict:
+    '''네거티브 캐시에 남아 있는 로드 실패 목록과 통계를 반환합니다.'''
+    return {
+        **_failed_loads.stats(_config_key()),
+        "ttl_seconds": SETTINGS.tokenizer_negative_ttl_seconds,
+        "transient_ttl_seconds": SETTINGS.tokenizer_negative_transient_ttl_seconds,
+    }
+
+
+def get_tokenizer_cache_stats() -> dict:
+    '''토크나이저 캐시 통계를 반환합니다.'''
+    return _tokenizer_cache.stats()
+
+
+def get_tokenizer_alias_stats() -> dict:
+    '''같은 토크나이저 인스턴스를 공유하는 모델 그룹과 절약한 메모리를 반환합니다.'''
+    groups = _tokenizer_cache.alias_groups()
+    with _dedup_guard:
+        stats = dict(_dedup_stats)
+    return {
+        "groups": groups,
+        "saved_bytes": sum(group["saved_bytes"] for group in groups),
+        **stats,
+    }
+
+
+def get_tokenizer_load_stats() -> dict:
+    '''진행 중인 로드, 로드 락 대기 시간, 백그라운드 리비전 확인 통계를 반환합니다.'''
+    with _refresh_guard:
+        refresh = {**_refresh_stats, "interval_seconds": SETTINGS.tokenizer_refresh_interval_seconds}
+    with _load_locks_guard:
+        return {
+            "loading": sorted(_load_locks),
+            "lock_waits": _lock_wait_stats["waits"],
+            "total_lock_wait_seconds": round(_lock_wait_stats["total_wait_seconds"], 3),
+            "max_lock_wait_seconds": round(_lock_wait_stats["max_wait_seconds"], 3),
+            "refresh": refresh,
+        }
@@ -3,13 +3,13 @@ import gradio as gr
 import anthropic
 from google import genai
 from core.tokenizer_loader import load_tokenizer
-from core.token_counter import count_tokens
+from core.token_counter import count_tokens, count_tokens_tiktoken
+from core.tiktoken_resolver import encoder_for_model
 from parsers import parse_pdf, parse_docx, parse_text
 from utils.config import SETTINGS
 from utils.logger import get_logger
 from utils.languages import language_manager, KOREAN, ENGLISH
 from utils.pricing import calculate_cost, get_context_usage, format_context_window
-import tiktoken
 from dotenv import load_dotenv
 from utils.model_store import get_official_models, get_custom_models, add_official_model, add_custom_model
 
@@ -262,12 +262,8 @@ def count_tokens_gpt(model_name: str, data: str) -> int:
     Returns:
         토큰 수
     """
-    try:
-        encoder = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # gpt-5 등 새 모델은 gpt-4o와 같은 토크나이저 사용
-        encoder = tiktoken.encoding_for_model("gpt-4o")
-    return len(encoder.encode(data))
+    # gpt-5 등 새 모델은 gpt-4o와 같은 토크나이저 사용
+    return count_tokens_tiktoken(encoder_for_model(model_name), data)
 
 
 def count_tokens_commercial(model_name: str, data: str, logs: list) -> int:
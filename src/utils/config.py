@@ -9,6 +9,38 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     language: str = KOREAN  # 기본 언어 설정: 한국어
 
+    # 토크나이저 캐시 메모리 예산 (MB)
+    tokenizer_cache_budget_mb: int = 2048
+    # tokenizer.json만 받아 transformers 없이 로드 (없으면 AutoTokenizer 사용)
+    fast_tokenizer_loader: bool = True
+    # 오프라인 토크나이저 번들 디렉터리 (scripts/bundle_tokenizers.py로 생성, 있으면 먼저 사용)
+    tokenizer_bundle_dir: str = "~/.cache/llm_token_counter/bundle"
+    # 로컬 캐시에서 로드한 토크나이저의 새 리비전 확인 간격(초, 모델별, 0이면 확인 안 함)
+    tokenizer_refresh_interval_seconds: int = 6 * 3600
+    # Hugging Face Hub 주소 (비우면 기본값 https://huggingface.co)
+    hf_endpoint: str = ""
+    # 로드 실패 기억 시간(초): 없는 저장소/권한 없음 등 영구 오류, 그 밖의 오류(네트워크 등)
+    tokenizer_negative_ttl_seconds: int = 600
+    tokenizer_negative_transient_ttl_seconds: int = 30
+    tokenizer_negative_max_entries: int = 1000
+
+    # 이 길이(문자) 이상의 텍스트는 청크로 나눠 병렬로 셈 (0이면 사용 안 함)
+    parallel_count_threshold_chars: int = 1_000_000
+    # 청크 하나의 목표 길이(문자)
+    parallel_count_chunk_chars: int = 200_000
+    # 청크 합을 단일 패스 결과와 비교해 검증 (느림, 디버깅용)
+    parallel_count_verify: bool = False
+
+    # 토크나이저 데몬 Unix 소켓 경로 (scripts/tokenizer_daemon.py, 비우면 워커가 직접 로드)
+    tokenizer_daemon_socket: str = ""
+    # 데몬의 토큰화 스레드 수와 encode_batch 한 번에 묶는 최대 요청 수
+    tokenizer_daemon_workers: int = 4
+    tokenizer_daemon_max_batch: int = 64
+
+    # 가격 데이터 파일 (비우면 utils/pricing.json)과 변경 확인 간격(초, 음수면 다시 읽지 않음)
+    pricing_catalog_path: str = ""
+    pricing_reload_interval_seconds: float = 5.0
+
     # API 키 설정
     anthropic_api_key: str = ""
     openai_api_key: str = ""
@@ -3,64 +3,239 @@
 
 가격은 1M 입력 토큰당 USD 기준
 컨텍스트 윈도우는 토큰 단위
+
+가격 정보는 데이터 파일(기본값 utils/pricing.json)에서 읽어 검증한 뒤 읽기 전용
+스냅샷으로 만듭니다. 파일의 mtime이 바뀌면 새 스냅샷을 만들어 한 번에 교체하므로
+가격을 바꿔도 재시작할 필요가 없고, 진행 중인 요청은 이전 스냅샷을 끝까지 사용합니다.
+
+카탈로그 버전은 파일의 "version" 값, 없으면 모델 정보의 해시로 정하므로
+같은 파일을 읽은 워커와 재시작한 프로세스는 모두 같은 버전을 보고합니다.
 """
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
+
+from utils.config import SETTINGS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'pricing.json')
+
+
+# 제공자 접두사 뒤에서도 매칭을 시작하는 구분자 (openai/gpt-4o, us.anthropic.claude-..., ft:gpt-4o-mini:...)
+_MATCH_SEPARATORS = frozenset("/.:")
+
+
+class PrefixIndex:
+    """
+    모델 이름 접두사 트라이
+
+    이름의 한 위치에서 시작해 트라이를 따라가며 마지막으로 끝난 키, 즉 가장 긴
+    (가장 구체적인) 키를 찾습니다. gpt-4o-mini는 gpt-4o가 아니라 gpt-4o-mini로 매칭됩니다.
+    """
+
+    _END = None  # 키가 끝나는 노드에 저장하는 표시
+
+    def __init__(self, keys):
+        self._root: dict = {}
+        for key in keys:
+            node = self._root
+            for char in key:
+                node = node.setdefault(char, {})
+            node[self._END] = key
 
-MODEL_INFO = {
-    # OpenAI models
-    "gpt-5": {"input_price": 2.50, "context_window": 128000},  # Uses gpt-4o tokenizer
-    "gpt-5.1": {"input_price": 2.50, "context_window": 128000},  # Uses gpt-4o tokenizer
-    "gpt-5.2": {"input_price": 2.50, "context_window": 128000},  # Uses gpt-4o tokenizer
-    "gpt-4o": {"input_price": 2.50, "context_window": 128000},
-    "gpt-4o-mini": {"input_price": 0.15, "context_window": 128000},
-    "gpt-4-turbo": {"input_price": 10.00, "context_window": 128000},
-    "gpt-4": {"input_price": 30.00, "context_window": 8192},
-    "gpt-3.5-turbo": {"input_price": 0.50, "context_window": 16385},
-    "o1": {"input_price": 15.00, "context_window": 200000},
-    "o1-mini": {"input_price": 3.00, "context_window": 128000},
-    "o1-pro": {"input_price": 150.00, "context_window": 200000},
-    "o3": {"input_price": 10.00, "context_window": 200000},
-    "o3-mini": {"input_price": 1.10, "context_window": 200000},
-
-    # Anthropic models
-    "claude-3-5-sonnet": {"input_price": 3.00, "context_window": 200000},
-    "claude-3-5-haiku": {"input_price": 0.80, "context_window": 200000},
-    "claude-3-7-sonnet": {"input_price": 3.00, "context_window": 200000},
-    "claude-3-opus": {"input_price": 15.00, "context_window": 200000},
-    "claude-3-sonnet": {"input_price": 3.00, "context_window": 200000},
-    "claude-3-haiku": {"input_price": 0.25, "context_window": 200000},
-    "claude-opus-4": {"input_price": 15.00, "context_window": 200000},
-    "claude-sonnet-4": {"input_price": 3.00, "context_window": 200000},
-
-    # Google models
-    "gemini-2.0-flash": {"input_price": 0.10, "context_window": 1000000},
-    "gemini-2.0-flash-lite": {"input_price": 0.075, "context_window": 1000000},
-    "gemini-1.5-pro": {"input_price": 1.25, "context_window": 2000000},
-    "gemini-1.5-flash": {"input_price": 0.075, "context_window": 1000000},
-    "gemini-2.5-pro": {"input_price": 1.25, "context_window": 1000000},
-    "gemini-2.5-flash": {"input_price": 0.15, "context_window": 1000000},
-}
-
-
-def get_model_info(model_name: str) -> dict | None:
-    """
-    모델 정보 조회 (부분 매칭 지원)
+    def longest_prefix(self, name: str, start: int = 0) -> str | None:
+        """name[start:]의 접두사 중 가장 긴 키를 반환합니다."""
+        node = self._root
+        match = None
+        for i in range(start, len(name)):
+            node = node.get(name[i])
+            if node is None:
+                break
+            if self._END in node:
+                match = node[self._END]
+        return match
+
+    def lookup(self, name: str) -> str | None:
+        """이름의 시작과 구분자 뒤에서 찾은 키 중 가장 긴 키를 반환합니다."""
+        best = self.longest_prefix(name)
+        for i, char in enumerate(name):
+            if char in _MATCH_SEPARATORS:
+                match = self.longest_prefix(name, i + 1)
+                if match is not None and (best is None or len(match) > len(best)):
+                    best = match
+        return best
+
+
+class PricingCatalogError(ValueError):
+    """가격 데이터 파일 형식 오류"""
+
+
+def _validate(data) -> dict[str, dict]:
+    """가격 데이터를 검증하고 {모델 키: 정보} 형태로 반환합니다."""
+    if not isinstance(data, dict) or not isinstance(data.get("models"), dict):
+        raise PricingCatalogError('Pricing catalog must be an object with a "models" object')
+    models = {}
+    for key, info in data["models"].items():
+        name = key.lower().strip()
+        if not name:
+            raise PricingCatalogError("Empty model key")
+        if name in models:
+            raise PricingCatalogError(f"Duplicate model key: {name}")
+        if not isinstance(info, dict):
+            raise PricingCatalogError(f"{key}: entry must be an object")
+        price = info.get("input_price")
+        window = info.get("context_window")
+        if isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0:
+            raise PricingCatalogError(f"{key}: input_price must be a non-negative number")
+        if isinstance(window, bool) or not isinstance(window, int) or window <= 0:
+            raise PricingCatalogError(f"{key}: context_window must be a positive integer")
+        models[name] = {"input_price": float(price), "context_window": window}
+        if "note" in info:
+            if not isinstance(info["note"], str):
+                raise PricingCatalogError(f"{key}: note must be a string")
+            models[name]["note"] = info["note"]
+    return models
+
+
+def _declared_version(data: dict) -> str | None:
+    """데이터 파일에 적힌 카탈로그 버전을 반환합니다 (없으면 None)."""
+    version = data.get("version")
+    if version is None:
+        return None
+    if isinstance(version, bool) or not isinstance(version, (str, int)) or not str(version).strip():
+        raise PricingCatalogError("version must be a non-empty string or an integer")
+    return str(version).strip()
+
+
+class PricingSnapshot:
+    """
+    한 시점의 가격 정보 (읽기 전용)
+
+    모델 정보, 접두사 인덱스, 이름별 조회 결과 캐시를 함께 들고 있어
+    스냅샷을 바꾸면 인덱스와 캐시도 함께 바뀝니다.
+    """
+
+    def __init__(self, models: dict[str, dict], version: str | None, source: str, mtime_ns: int):
+        """
+        Args:
+            models: 검증된 {모델 키: 정보}
+            version: 데이터 파일에 적힌 버전 (None이면 모델 정보 해시 앞 16자리)
+            source: 데이터 파일 경로
+            mtime_ns: 읽을 때의 파일 mtime
+        """
+        self.models: Mapping[str, Mapping] = MappingProxyType(
+            {key: MappingProxyType(info) for key, info in models.items()}
+        )
+        self.source = source
+        self.mtime_ns = mtime_ns
+        self.loaded_at = time.time()
+        canonical = json.dumps(models, sort_keys=True, separators=(",", ":"))
+        self.digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        self.version = version or self.digest[:16]
+        self.etag = f'"pricing-{self.digest[:16]}"'
+        self._index = PrefixIndex(self.models)
+        self.resolve = lru_cache(maxsize=4096)(self._index.lookup)
+
+    def get(self, model_name: str) -> Mapping | None:
+        """모델 이름에 가장 구체적으로 맞는 정보를 반환합니다."""
+        key = self.resolve(model_name)
+        return self.models[key] if key is not None else None
+
+
+_reload_lock = threading.Lock()
+_snapshot: PricingSnapshot | None = None
+_last_check = 0.0
+_last_error: str | None = None
+
+
+def catalog_path() -> str:
+    """가격 데이터 파일 경로"""
+    return os.path.expanduser(SETTINGS.pricing_catalog_path) if SETTINGS.pricing_catalog_path else DEFAULT_CATALOG_PATH
+
+
+def _compile(path: str, mtime_ns: int) -> PricingSnapshot:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    models = _validate(data)
+    return PricingSnapshot(models, _declared_version(data), path, mtime_ns)
+
+
+def reload_pricing(force: bool = False) -> PricingSnapshot:
+    """
+    데이터 파일이 바뀌었으면 새 스냅샷으로 교체합니다.
+
+    파일이 잘못되었으면 오류를 기록하고 이전 스냅샷을 계속 사용합니다
+    (처음 로드라면 예외를 그대로 던짐).
+    """
+    global _snapshot, _last_check, _last_error
+    with _reload_lock:
+        _last_check = time.monotonic()
+        path = catalog_path()
+        current = _snapshot
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if not force and current is not None and current.source == path and current.mtime_ns == mtime_ns:
+                return current
+            snapshot = _compile(path, mtime_ns)
+        except (OSError, ValueError) as e:
+            _last_error = f"{type(e).__name__}: {e}"
+            if current is None:
+                raise
+            logger.warning(f"Keeping pricing catalog {current.version}, reload failed: {e}")
+            return current
+        _last_error = None
+        if current is not None and snapshot.version != current.version:
+            logger.info(f"Loaded pricing catalog {snapshot.version} ({len(snapshot.models)} models)")
+        _snapshot = snapshot
+        return snapshot
+
+
+def get_pricing_snapshot() -> PricingSnapshot:
+    """
+    현재 가격 스냅샷을 반환합니다.
+
+    pricing_reload_interval_seconds마다 한 번만 파일 mtime을 확인합니다.
+    """
+    snapshot = _snapshot
+    interval = SETTINGS.pricing_reload_interval_seconds
+    if snapshot is None or (interval >= 0 and time.monotonic() - _last_check >= interval):
+        snapshot = reload_pricing()
+    return snapshot
+
+
+def get_pricing_stats() -> dict:
+    """현재 가격 스냅샷 버전과 마지막 리로드 오류를 반환합니다."""
+    snapshot = get_pricing_snapshot()
+    return {
+        "version": snapshot.version,
+        "etag": snapshot.etag,
+        "source": snapshot.source,
+        "models": len(snapshot.models),
+        "loaded_at": snapshot.loaded_at,
+        "last_error": _last_error,
+    }
+
+
+def get_model_info(model_name: str) -> Mapping | None:
+    """
+    모델 정보 조회 (가장 구체적인 접두사 매칭)
+
+    예: claude-3-5-sonnet-20241022 → claude-3-5-sonnet, gpt-4o-mini-2024-07-18 → gpt-4o-mini
 
     Args:
         model_name: 모델 이름 (정규화된 lowercase)
 
     Returns:
-        {"input_price": float, "context_window": int} 또는 None
+        {"input_price": float, "context_window": int} (읽기 전용) 또는 None
     """
-    # 정확한 매칭
-    if model_name in MODEL_INFO:
-        return MODEL_INFO[model_name]
-
-    # 부분 매칭 (예: claude-3-5-sonnet-20241022 → claude-3-5-sonnet)
-    for key in MODEL_INFO:
-        if key in model_name or model_name.startswith(key):
-            return MODEL_INFO[key]
-
-    return None
+    return get_pricing_snapshot().get(model_name)
 
 
 def calculate_cost(model_name: str, token_count: int) -> float | None:
@@ -1,17 +1,86 @@
 import pytest
 from fastapi.testclient import TestClient
+import shutil
 import sys
 import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
+from api.config import SETTINGS
 from api.main import app
+from api.services import model_store
 
 
 @pytest.fixture
-def client():
-    """Create test client"""
+def isolated_model_store(tmp_path, monkeypatch):
+    """Point the model store at a copy of models.json so tests never change the tracked file"""
+    path = tmp_path / "models.json"
+    shutil.copy(model_store.MODEL_STORE_PATH, path)
+    monkeypatch.setattr(model_store, "MODEL_STORE_PATH", str(path))
+    monkeypatch.setattr(SETTINGS, "model_store_db_path", "")
+    monkeypatch.setattr(model_store, "_db", None)
+    model_store.invalidate_cache()
+    yield path
+    model_store.invalidate_cache()
+
+
+@pytest.fixture
+def live_client(monkeypatch, isolated_model_store):
+    """
+    Client that keeps one event loop alive so background loads can finish
+
+    HuggingFace tokenizers come from a stand-in Hub that waits for
+    client.hub_gate (open by default), reports download progress and records
+    the requested ids in client.hub_calls. Startup warm-up is off and the
+    tokenizer cache and model preparer start empty.
+    """
+    import threading
+    import time
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    from api.routes import stats, websocket
+    from api.services.prepare import ModelPreparer
+    from core import tokenizer_loader
+    from core.tokenizer_cache import TokenizerCache
+
+    gate = threading.Event()
+    gate.set()
+    hub_calls = []
+
+    def fake_hub(model_id):
+        # Stand-in for a slow download that reports progress
+        hub_calls.append(model_id)
+        gate.wait(5)
+        for done in (512, 1024):
+            time.sleep(0.05)
+            tokenizer_loader._report_progress(
+                model_id, "downloading", downloaded_bytes=done, total_bytes=1024
+            )
+        backend = Tokenizer(models.WordLevel(vocab={"[UNK]": 0, "hello": 1}, unk_token="[UNK]"))
+        backend.pre_tokenizer = pre_tokenizers.Whitespace()
+        return backend
+
+    monkeypatch.setattr(SETTINGS, "warmup_top_n", 0)
+    monkeypatch.setattr(SETTINGS, "warmup_tiktoken", False)
+    preparer = ModelPreparer()
+    monkeypatch.setattr(websocket, "model_preparer", preparer)
+    monkeypatch.setattr(stats, "model_preparer", preparer)
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+    monkeypatch.setattr(tokenizer_loader, "_load_from_local_cache", lambda model_id: None)
+    monkeypatch.setattr(tokenizer_loader, "load_from_bundle", lambda model_id: None)
+    monkeypatch.setattr(tokenizer_loader, "_load_from_hub", fake_hub)
+
+    with TestClient(app) as client:
+        client.hub_gate = gate
+        client.hub_calls = hub_calls
+        yield client
+    gate.set()
+
+
+@pytest.fixture
+def client(isolated_model_store):
+    """Create test client (counted models go to a temporary model store)"""
     return TestClient(app)
 
 
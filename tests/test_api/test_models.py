@@ -113,6 +113,60 @@ class TestPricing:
         # Should match claude-3-5-sonnet
         assert data["input_price"] is not None
 
+    def test_get_pricing_etag(self, client):
+        """Test that the catalog ETag is sent and If-None-Match returns 304"""
+        response = client.get("/api/pricing/gpt-4o")
+        etag = response.headers["etag"]
+
+        assert response.json()["pricing_version"] is not None
+
+        cached = client.get("/api/pricing/gpt-4o-mini", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+        stale = client.get("/api/pricing/gpt-4o", headers={"If-None-Match": '"pricing-stale"'})
+        assert stale.status_code == 200
+
+
+class TestPricingCatalog:
+    """Tests for GET /api/pricing"""
+
+    def test_get_catalog(self, client):
+        """Test that the catalog lists every model with formatted windows"""
+        response = client.get("/api/pricing")
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        data = response.json()
+
+        assert isinstance(data["version"], str)
+        assert data["models"]["gpt-4o-mini"] == {
+            "input_price": 0.15,
+            "context_window": 128000,
+            "context_window_formatted": "128K",
+        }
+
+    def test_get_catalog_uncompressed(self, client):
+        """Test that clients without gzip get plain JSON with a different ETag"""
+        plain = client.get("/api/pricing", headers={"Accept-Encoding": "identity"})
+        compressed = client.get("/api/pricing")
+
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == compressed.json()
+        assert plain.headers["etag"] != compressed.headers["etag"]
+        assert "Accept-Encoding" in plain.headers["vary"]
+
+    def test_get_catalog_not_modified(self, client):
+        """Test that If-None-Match with the current ETag returns 304"""
+        etag = client.get("/api/pricing").headers["etag"]
+
+        cached = client.get("/api/pricing", headers={"If-None-Match": etag})
+
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
 
 class TestModelUsageTracking:
     """모델 사용 추적 API 테스트"""
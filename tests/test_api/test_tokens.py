@@ -128,6 +128,85 @@ class TestCountTokensText:
         assert response.status_code == 400
 
 
+class TestCountTokensBatch:
+    """Tests for POST /api/count-tokens/batch"""
+
+    @pytest.fixture
+    def fake_gpt_counter(self, monkeypatch):
+        """Replace tiktoken counting with a deterministic word count"""
+        from api.services import token_counter
+        monkeypatch.setattr(
+            token_counter, "count_tokens_gpt",
+            lambda model_name, text: len(text.split())
+        )
+
+    def test_batch_counts_each_model(self, client, sample_text, fake_gpt_counter):
+        """Test that every model gets its own result in request order"""
+        response = client.post(
+            "/api/count-tokens/batch",
+            json={
+                "text": sample_text,
+                "models": ["gpt-4o", "o1-mini"],
+                "model_type": "commercial"
+            }
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+
+        assert [item["model"] for item in results] == ["gpt-4o", "o1-mini"]
+        for item in results:
+            assert item["status_code"] == 200
+            assert item["error"] is None
+            assert item["result"]["token_count"] == len(sample_text.split())
+
+    def test_batch_reports_per_model_errors(self, client, sample_text, fake_gpt_counter):
+        """Test that one failing model does not fail the whole batch"""
+        response = client.post(
+            "/api/count-tokens/batch",
+            json={
+                "text": sample_text,
+                "models": ["gpt-4o", "unsupported-model"],
+                "model_type": "commercial"
+            }
+        )
+
+        assert response.status_code == 200
+        ok, failed = response.json()["results"]
+
+        assert ok["result"]["token_count"] > 0
+        assert failed["result"] is None
+        assert failed["status_code"] == 400
+        assert failed["error"]
+
+    def test_batch_deduplicates_models(self, client, sample_text, fake_gpt_counter):
+        """Test that duplicate model names are counted once"""
+        response = client.post(
+            "/api/count-tokens/batch",
+            json={
+                "text": sample_text,
+                "models": ["gpt-4o", "GPT-4o ", "gpt-4o"],
+                "model_type": "commercial"
+            }
+        )
+
+        assert response.status_code == 200
+        assert [item["model"] for item in response.json()["results"]] == ["gpt-4o"]
+
+    def test_batch_empty_model_list(self, client, sample_text):
+        """Test with no models"""
+        response = client.post(
+            "/api/count-tokens/batch",
+            json={
+                "text": sample_text,
+                "models": [],
+                "model_type": "commercial"
+            }
+        )
+
+        assert response.status_code == 422
+
+
 class TestCountTokensFile:
     """Tests for POST /api/count-tokens/file"""
 
@@ -211,6 +290,122 @@ class TestCountTokensFile:
         assert response.status_code == 400
 
 
+class TestCountJobs:
+    """Tests for 202 + job handling of cold HuggingFace tokenizers"""
+
+    def wait_for_job(self, client, job_id):
+        import time
+        for _ in range(100):
+            job = client.get(f"/api/count-jobs/{job_id}").json()
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.05)
+        raise AssertionError("job did not finish")
+
+    def test_cold_tokenizer_returns_job(self, live_client):
+        """Test that a cold tokenizer returns 202 and the count arrives via polling"""
+        request = {"text": "hello hello world", "model": "org/cold-model", "model_type": "huggingface"}
+        response = live_client.post("/api/count-tokens", json=request)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["job_id"]
+        assert job["model"] == "org/cold-model"
+
+        job = self.wait_for_job(live_client, job["job_id"])
+        assert job["status"] == "done"
+        assert job["result"]["token_count"] == 3
+
+        # Warm now: answered directly
+        response = live_client.post("/api/count-tokens", json=request)
+        assert response.status_code == 200
+        assert response.json()["token_count"] == 3
+
+    def test_cold_tokenizer_with_process_executor(self, live_client, monkeypatch):
+        """Test that with a process pool the job loads the tokenizer in a worker, not in the API process"""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        from api.services import executor
+        from core.tokenizer_loader import is_tokenizer_loaded
+
+        pool = executor.TokenizationExecutor(kind="process", max_workers=1)
+        # fork keeps the stand-in Hub patched in the worker
+        pool._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork"))
+        monkeypatch.setattr(executor, "_executor", pool)
+
+        request = {"text": "hello hello world", "model": "org/pool-model", "model_type": "huggingface"}
+        response = live_client.post("/api/count-tokens", json=request)
+
+        assert response.status_code == 202
+        job = self.wait_for_job(live_client, response.json()["job_id"])
+        assert job["status"] == "done"
+        assert job["result"]["token_count"] == 3
+        assert not is_tokenizer_loaded("org/pool-model")
+        assert live_client.hub_calls == []
+
+        # The pool worker holds it now: answered directly
+        response = live_client.post("/api/count-tokens", json=request)
+        assert response.status_code == 200
+        assert response.json()["token_count"] == 3
+
+    def test_batch_rejects_cold_tokenizer(self, live_client):
+        """Test that the batch endpoint reports 409 for a cold tokenizer instead of loading it inline"""
+        batch = {"text": "hello hello world", "models": ["org/batch-model"], "model_type": "huggingface"}
+        response = live_client.post("/api/count-tokens/batch", json=batch)
+
+        assert response.status_code == 200
+        item = response.json()["results"][0]
+        assert item["status_code"] == 409
+        assert item["result"] is None
+        assert "/api/count-tokens" in item["error"]
+        assert live_client.hub_calls == []
+
+        request = {"text": "hello", "model": "org/batch-model", "model_type": "huggingface"}
+        response = live_client.post("/api/count-tokens", json=request)
+        assert response.status_code == 202
+        assert self.wait_for_job(live_client, response.json()["job_id"])["status"] == "done"
+
+        # Warm now: counted in the batch
+        item = live_client.post("/api/count-tokens/batch", json=batch).json()["results"][0]
+        assert item["status_code"] == 200
+        assert item["result"]["token_count"] == 3
+
+    def test_progress_pushed_over_websocket(self, live_client):
+        """Test that watch_job streams progress and the final count"""
+        request = {"text": "hello", "model": "org/ws-cold-model", "model_type": "huggingface"}
+
+        live_client.hub_gate.clear()
+
+        with live_client.websocket_connect("/api/ws") as websocket:
+            assert websocket.receive_json()["type"] == "init"
+            job_id = live_client.post("/api/count-tokens", json=request).json()["job_id"]
+            websocket.send_json({"type": "watch_job", "job_id": job_id})
+            live_client.hub_gate.set()
+
+            updates = []
+            while True:
+                message = websocket.receive_json()
+                if message["type"] != "count_job":
+                    continue
+                updates.append(message["data"])
+                if message["data"]["status"] in ("done", "failed"):
+                    break
+
+        assert updates[-1]["status"] == "done"
+        assert updates[-1]["result"]["token_count"] == 1
+        phases = [u["progress"].get("phase") for u in updates]
+        assert "downloading" in phases
+        assert {"downloaded_bytes": 1024, "total_bytes": 1024, "phase": "downloading"} in [
+            u["progress"] for u in updates
+        ]
+
+    def test_unknown_job(self, client):
+        """Test that unknown job ids return 404"""
+        response = client.get("/api/count-jobs/does-not-exist")
+        assert response.status_code == 404
+
+
 class TestHealthCheck:
     """Tests for /api/health endpoint"""
 
@@ -223,3 +418,42 @@ class TestHealthCheck:
 
         assert data["status"] == "healthy"
         assert "version" in data
+        assert "warmup" in data
+
+    def test_readiness_check_while_warming(self, client, monkeypatch):
+        """Test that readiness reports 503 until warm-up finishes"""
+        from api.services import warmup
+
+        monkeypatch.setattr(warmup.warmup_state, "status", "running")
+        response = client.get("/api/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming"
+
+        monkeypatch.setattr(warmup.warmup_state, "status", "done")
+        response = client.get("/api/health/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+
+class TestStats:
+    """Tests for /api/stats endpoint"""
+
+    def test_stats_reports_executor(self, client):
+        """Test that executor pool size and queue depth are exposed"""
+        response = client.get("/api/stats")
+
+        assert response.status_code == 200
+        executor = response.json()["executor"]
+
+        assert executor["workers"] > 0
+        assert executor["queued"] >= 0
+        assert "utilization" in executor
+
+    def test_tokenizer_aliases(self, client):
+        """Test that tokenizer alias groups and saved memory are exposed"""
+        response = client.get("/api/stats/tokenizer-aliases")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data["groups"], list)
+        assert data["saved_bytes"] >= 0
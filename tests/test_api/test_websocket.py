@@ -97,3 +97,96 @@ class TestWebSocket:
                 response2 = ws2.receive_json()
                 assert response2["type"] == "model_added"
                 assert model_name in response2["data"]["custom"]
+
+
+class TestPrepareModel:
+    """Tests for the prepare_model WebSocket message"""
+
+    def prepare(self, websocket, name):
+        websocket.send_json({"type": "prepare_model", "name": name})
+        response = websocket.receive_json()
+        assert response["type"] == "model_prepare"
+        return response["status"]
+
+    def wait_for_prepares(self, client) -> dict:
+        """Poll /api/stats until no prepare is running and return the prepare stats"""
+        import time
+        for _ in range(100):
+            stats = client.get("/api/stats").json()["prepares"]
+            if not stats["inflight"]:
+                return stats
+            time.sleep(0.05)
+        raise AssertionError("prepare did not finish")
+
+    def test_prepare_loads_once(self, live_client):
+        """Test that duplicate prepares share one background load"""
+        from core.tokenizer_loader import is_tokenizer_loaded
+
+        live_client.hub_gate.clear()
+
+        with live_client.websocket_connect("/api/ws") as websocket:
+            websocket.receive_json()
+            assert self.prepare(websocket, "Org/Prepared") == "started"
+            assert self.prepare(websocket, "org/prepared") == "in_progress"
+
+            live_client.hub_gate.set()
+            self.wait_for_prepares(live_client)
+
+            assert is_tokenizer_loaded("org/prepared")
+            assert self.prepare(websocket, "org/prepared") == "already_loaded"
+
+        assert live_client.hub_calls == ["org/prepared"]
+        stats = live_client.get("/api/stats").json()["prepares"]
+        assert stats["loaded"] == 1
+        assert stats["inflight"] == []
+
+    def test_prepare_counts_tokenizer_loaded_meanwhile(self, live_client, monkeypatch):
+        """Test that a started prepare finding the tokenizer loaded is not counted as a load"""
+        from api.services import prepare
+
+        monkeypatch.setattr(prepare, "preload_tokenizer", lambda model: "already_loaded")
+
+        with live_client.websocket_connect("/api/ws") as websocket:
+            websocket.receive_json()
+            assert self.prepare(websocket, "org/raced") == "started"
+
+        stats = self.wait_for_prepares(live_client)
+        assert stats["found_loaded"] == 1
+        assert stats["loaded"] == 0
+
+    def test_prepare_respects_cache_budget(self, live_client, monkeypatch):
+        """Test that prepares are skipped when the tokenizer cache is full"""
+        from core import tokenizer_loader
+        from core.tokenizer_cache import TokenizerCache
+
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=0))
+
+        with live_client.websocket_connect("/api/ws") as websocket:
+            websocket.receive_json()
+            assert self.prepare(websocket, "org/too-big") == "no_headroom"
+
+        assert live_client.hub_calls == []
+
+    def test_prepare_drops_tokenizer_that_does_not_fit(self, live_client, monkeypatch):
+        """Test that a prepared tokenizer over the remaining budget is dropped, not cached"""
+        from core import tokenizer_loader
+        from core.tokenizer_cache import TokenizerCache, TokenizerEntry
+
+        cache = TokenizerCache(budget_bytes=100)
+        cache.put("org/resident", TokenizerEntry(object(), "fp-resident", 99))
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", cache)
+
+        with live_client.websocket_connect("/api/ws") as websocket:
+            websocket.receive_json()
+            assert self.prepare(websocket, "org/too-big") == "started"
+
+        stats = self.wait_for_prepares(live_client)
+        assert stats["no_headroom"] == 1
+        assert "org/resident" in cache and "org/too-big" not in cache
+
+    def test_prepare_invalid_name(self, client):
+        """Test prepare_model with an empty name"""
+        with client.websocket_connect("/api/ws") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "prepare_model", "name": ""})
+            assert websocket.receive_json()["type"] == "error"
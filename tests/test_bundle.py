@@ -0,0 +1,140 @@
+"""
+bundle.py 테스트 - 오프라인 번들 생성과 번들 우선 로드 검증
+"""
+import base64
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pytest
+import tiktoken
+import tiktoken.registry
+from tiktoken.load import load_tiktoken_bpe
+
+from core import bundle, tiktoken_resolver, tokenizer_loader
+from core.token_counter import count_tokens
+from core.tokenizer_cache import TokenizerCache
+from tests.test_chunking import CL100K_PATTERN
+from tests.test_token_counter import make_tokenizer
+from tests.test_tokenizer_loader import save_length_limited_tokenizer
+from utils.config import SETTINGS
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, monkeypatch):
+    """빈 번들 디렉터리를 설정하고 Hub 접근을 막음"""
+    monkeypatch.setattr(SETTINGS, "tokenizer_bundle_dir", str(tmp_path))
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+
+    def no_network(model_id):
+        raise AssertionError(f"Hub accessed for {model_id}")
+
+    monkeypatch.setattr(tokenizer_loader, "_load_from_hub", no_network)
+    return tmp_path
+
+
+def write_tokenizer_json(path, vocab_words):
+    path.mkdir(parents=True)
+    make_tokenizer(vocab_words).backend_tokenizer.save(str(path / "tokenizer.json"))
+
+
+class TestLoadFromBundle:
+    """번들 우선 로드 테스트"""
+
+    def test_loads_without_hub(self, bundle_dir):
+        """번들에 있는 모델은 Hub 없이 로드 (모델 ID 대소문자 무시)"""
+        write_tokenizer_json(bundle_dir / "huggingface" / "org--model", ["hello", "world"])
+        tokenizer = tokenizer_loader.load_tokenizer("Org/Model")
+        assert tokenizer.encode("hello world").tokens == ["hello", "world"]
+
+    def test_ignores_saved_truncation_and_padding(self, bundle_dir):
+        """번들의 tokenizer.json에 저장된 truncation/padding은 토큰 수에 영향을 주지 않음"""
+        (bundle_dir / "huggingface" / "org--padded").mkdir(parents=True)
+        save_length_limited_tokenizer(bundle_dir / "huggingface" / "org--padded" / "tokenizer.json")
+        tokenizer = tokenizer_loader.load_tokenizer("org/padded")
+
+        assert count_tokens(tokenizer, " ".join(["hello"] * 100)) == 100
+        assert count_tokens(tokenizer, "hello") == 1
+
+    def test_missing_model_falls_back_to_hub(self, bundle_dir, monkeypatch):
+        """번들에 없으면 Hub에서 로드"""
+        fallback = make_tokenizer(["hub"])
+        monkeypatch.setattr(tokenizer_loader, "_load_from_hub", lambda model_id: fallback)
+        assert tokenizer_loader.load_tokenizer("org/other") is fallback
+
+    def test_no_bundle_dir(self, tmp_path, monkeypatch):
+        """번들 디렉터리가 없으면 사용하지 않음"""
+        monkeypatch.setattr(SETTINGS, "tokenizer_bundle_dir", str(tmp_path / "missing"))
+        assert bundle.bundle_root() is None
+        assert bundle.load_from_bundle("org/model") is None
+
+
+class TestCreateBundle:
+    """번들 생성 테스트"""
+
+    def test_snapshots_tokenizer_files(self, tmp_path, monkeypatch):
+        """토크나이저 파일만 받고 매니페스트에 기록, 실패한 모델도 기록"""
+        calls = []
+
+        def fake_snapshot_download(model_id, allow_patterns, local_dir, token):
+            calls.append((model_id, allow_patterns))
+            if model_id == "org/gated":
+                raise PermissionError("gated")
+            write_tokenizer_json(Path(local_dir), ["hello"])
+
+        monkeypatch.setattr(bundle, "snapshot_download", fake_snapshot_download)
+        root = tmp_path / "bundle"
+        manifest = bundle.create_bundle(root, ["Org/Model", "org/gated"], encodings=[])
+
+        assert (root / "huggingface" / "org--model" / "tokenizer.json").is_file()
+        assert not (root / "huggingface" / "org--gated").exists()
+        assert manifest["huggingface"] == ["org/model"]
+        assert "org/gated" in manifest["failed"]
+        assert json.loads((root / "manifest.json").read_text())["huggingface"] == ["org/model"]
+        assert all("*.safetensors" not in patterns for _, patterns in calls)
+
+
+class TestTiktokenBundle:
+    """tiktoken BPE 파일을 번들에서 읽는지 테스트"""
+
+    def test_encoder_reads_bpe_from_bundle(self, bundle_dir, monkeypatch):
+        """번들 디렉터리의 캐시 파일로 네트워크 없이 인코더 생성"""
+        url = "https://example.invalid/encodings/bundle_test.tiktoken"
+        ranks = {bytes([i]): i for i in range(256)}
+        (bundle_dir / "tiktoken").mkdir()
+        (bundle_dir / "tiktoken" / hashlib.sha1(url.encode()).hexdigest()).write_bytes(b"".join(
+            base64.b64encode(token) + b" " + str(rank).encode() + b"\n" for token, rank in ranks.items()
+        ))
+
+        tiktoken.list_encoding_names()  # 생성자 목록 초기화
+        monkeypatch.setitem(tiktoken.registry.ENCODING_CONSTRUCTORS, "bundle_test", lambda: {
+            "name": "bundle_test",
+            "pat_str": CL100K_PATTERN,
+            "mergeable_ranks": load_tiktoken_bpe(url),
+            "special_tokens": {},
+        })
+        monkeypatch.setattr(tiktoken.registry, "ENCODINGS", {})
+        monkeypatch.setattr(tiktoken_resolver, "_encoders", {})
+        monkeypatch.delenv("TIKTOKEN_CACHE_DIR", raising=False)
+
+        encoder = tiktoken_resolver.get_encoder("bundle_test")
+        assert encoder.encode_ordinary("abc") == [97, 98, 99]
+
+    def test_keeps_operator_cache_dir(self, bundle_dir, monkeypatch):
+        """운영자가 지정한 TIKTOKEN_CACHE_DIR는 번들로 덮어쓰지 않음"""
+        (bundle_dir / "tiktoken").mkdir()
+        monkeypatch.setenv("TIKTOKEN_CACHE_DIR", "/srv/tiktoken-cache")
+
+        assert bundle.activate_tiktoken_bundle() is False
+        assert os.environ["TIKTOKEN_CACHE_DIR"] == "/srv/tiktoken-cache"
+
+    def test_bundles_encoding_without_constructor_registry(self, tmp_path, monkeypatch):
+        """tiktoken 내부 생성자 목록이 없어도 공개 API로 인코딩을 번들링"""
+        loaded = []
+        monkeypatch.setattr(tiktoken.registry, "ENCODING_CONSTRUCTORS", None)
+        monkeypatch.setattr(tiktoken, "list_encoding_names", lambda: [])
+        monkeypatch.setattr(tiktoken, "get_encoding", lambda name: loaded.append(name))
+
+        assert bundle._bundle_tiktoken(tmp_path, ["cl100k_base"]) == ["cl100k_base"]
+        assert loaded == ["cl100k_base"]
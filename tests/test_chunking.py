@@ -0,0 +1,195 @@
+"""
+chunking.py 테스트 - 청크 분할 카운트가 단일 패스와 같은지 검증
+"""
+import random
+
+import pytest
+import tiktoken
+from tokenizers import Regex, Tokenizer, decoders, models, normalizers, pre_tokenizers, processors, trainers
+
+from core import chunking
+from core.chunking import is_hf_chunk_safe, split_text
+from core.token_counter import count_tokens, count_tokens_tiktoken
+from core.tokenizer_loader import describe_tokenizer
+from utils.config import SETTINGS
+
+# tiktoken_ext.openai_public의 정규식 (BPE 파일은 네트워크가 필요해 로컬 어휘 사용)
+R50K_PATTERN = r"""'(?:[sdmt]|ll|ve|re)| ?\p{L}++| ?\p{N}++| ?[^\s\p{L}\p{N}]++|\s++$|\s+(?!\S)|\s"""
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+
+WORDS = ["the", "token", "counter", "한국어", "문장", "naïve", "it's", "42", "3.14", "(x)", "--", "end."]
+SEPARATORS = [" ", " ", " ", "  ", "\n", "\n\n", " \n", "\t", ""]
+
+
+def make_text(seed: int, length: int = 20_000) -> str:
+    """단어, 여러 종류의 공백, 숫자, 문장 부호가 섞인 텍스트"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < length:
+        part = rng.choice(WORDS) + rng.choice(SEPARATORS)
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def make_byte_level_tokenizer() -> Tokenizer:
+    """GPT-2 방식 ByteLevel BPE를 작은 말뭉치로 학습 (네트워크 불필요)"""
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", 0), ("</s>", 1)]
+    )
+    trainer = trainers.BpeTrainer(
+        vocab_size=400,
+        special_tokens=["<s>", "</s>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tokenizer.train_from_iterator([make_text(seed, 2_000) for seed in range(20)], trainer)
+    return tokenizer
+
+
+def make_split_tokenizer(pattern: str) -> Tokenizer:
+    """Split(pattern) + 정규식 없는 ByteLevel 프리토크나이저의 BPE (Llama 3 방식)"""
+    tokenizer = make_byte_level_tokenizer()
+    tokenizer.pre_tokenizer = pre_tokenizers.Sequence([
+        pre_tokenizers.Split(Regex(pattern), behavior="isolated"),
+        pre_tokenizers.ByteLevel(add_prefix_space=False, use_regex=False),
+    ])
+    return tokenizer
+
+
+def make_tiktoken_encoding(name: str, pattern: str) -> tiktoken.Encoding:
+    """바이트 + 자주 쓰는 조각으로 만든 로컬 tiktoken 인코딩"""
+    ranks = {bytes([i]): i for i in range(256)}
+    for piece in [b"  ", b"\n\n", b" t", b"th", b"he", b" the", b"the", b"en", b"ken", b" token", b" \n"]:
+        ranks.setdefault(piece, len(ranks))
+    return tiktoken.Encoding(name=name, pat_str=pattern, mergeable_ranks=ranks, special_tokens={})
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """작은 텍스트도 여러 청크로 나뉘도록 임계값을 낮춤"""
+    monkeypatch.setattr(SETTINGS, "parallel_count_threshold_chars", 1_000)
+    monkeypatch.setattr(SETTINGS, "parallel_count_chunk_chars", 500)
+    monkeypatch.setattr(SETTINGS, "parallel_count_verify", False)
+
+
+class TestSplitText:
+    """경계 선택 테스트"""
+
+    def test_chunks_concatenate_to_text(self):
+        """청크를 이으면 원문과 같음"""
+        text = make_text(0)
+        chunks = split_text(text, 500)
+        assert len(chunks) > 10
+        assert "".join(chunks) == text
+
+    def test_cuts_only_before_space_and_letter(self):
+        """모든 청크는 '공백 + 글자'로 시작하고 공백이 아닌 문자로 끝남"""
+        chunks = split_text(make_text(1), 500)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk[0] == " " and chunk[1].isalpha()
+            assert not previous[-1].isspace()
+
+    def test_no_safe_boundary_keeps_text_whole(self):
+        """안전한 경계가 없으면 나누지 않음"""
+        text = "\n\n".join(["123"] * 1_000)
+        assert split_text(text, 100) == [text]
+
+
+class TestChunkedCountMatchesSinglePass:
+    """청크 합 == 단일 패스 검증"""
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_byte_level_bpe(self, small_chunks, seed):
+        """ByteLevel BPE (특수 토큰 포함/제외)"""
+        tokenizer = make_byte_level_tokenizer()
+        text = make_text(seed)
+        for add_special_tokens in (True, False):
+            expected = len(tokenizer.encode(text, add_special_tokens=add_special_tokens))
+            assert count_tokens(
+                tokenizer, text, add_special_tokens=add_special_tokens, allow_chunking=True
+            ) == expected
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_split_regex(self, small_chunks, seed):
+        """Split(cl100k 정규식) + ByteLevel"""
+        tokenizer = make_split_tokenizer(CL100K_PATTERN)
+        text = make_text(seed)
+        assert count_tokens(tokenizer, text, allow_chunking=True) == len(tokenizer.encode(text))
+
+    @pytest.mark.parametrize("name,pattern", [("r50k_base", R50K_PATTERN), ("cl100k_base", CL100K_PATTERN)])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_tiktoken(self, small_chunks, name, pattern, seed):
+        """GPT-2/cl100k 정규식"""
+        encoder = make_tiktoken_encoding(name, pattern)
+        text = make_text(seed)
+        before = chunking.get_chunking_stats()["chunked_counts"]
+        assert count_tokens_tiktoken(encoder, text) == len(encoder.encode(text))
+        assert chunking.get_chunking_stats()["chunked_counts"] == before + 1
+
+    def test_unknown_tiktoken_encoding_is_not_chunked(self, small_chunks):
+        """경계 규칙을 모르는 인코딩은 단일 패스"""
+        encoder = make_tiktoken_encoding("custom", CL100K_PATTERN)
+        before = chunking.get_chunking_stats()["chunked_counts"]
+        count_tokens_tiktoken(encoder, make_text(0))
+        assert chunking.get_chunking_stats()["chunked_counts"] == before
+
+
+class TestVerifyMode:
+    """검증 모드 테스트"""
+
+    def test_mismatch_returns_single_pass_count(self, small_chunks, monkeypatch):
+        """청크 합이 다르면 단일 패스 값을 반환하고 불일치를 기록"""
+        monkeypatch.setattr(SETTINGS, "parallel_count_verify", True)
+        # 공백을 합쳐버리는 노멀라이저는 안전하지 않지만 강제로 청크 분할
+        tokenizer = make_byte_level_tokenizer()
+        tokenizer.normalizer = normalizers.Replace(" ", "")
+        text = make_text(0)
+        before = chunking.get_chunking_stats()
+        count = count_tokens(tokenizer, text, add_special_tokens=False, allow_chunking=True)
+        after = chunking.get_chunking_stats()
+        assert count == len(tokenizer.encode(text, add_special_tokens=False))
+        assert after["verified"] == before["verified"] + 1
+        assert after["mismatches"] == before["mismatches"] + 1
+
+
+class TestChunkSafety:
+    """tokenizer.json 기반 안전성 판단 테스트"""
+
+    def test_byte_level_is_safe(self):
+        """ByteLevel BPE는 청크 분할 가능"""
+        assert describe_tokenizer(make_byte_level_tokenizer())[2] is True
+
+    def test_prepend_normalizer_is_unsafe(self):
+        """청크마다 ▁를 붙이는 노멀라이저(Llama 2 방식)는 불가"""
+        spec = {
+            "normalizer": {"type": "Sequence", "normalizers": [
+                {"type": "Prepend", "prepend": "▁"},
+                {"type": "Replace", "pattern": {"String": " "}, "content": "▁"},
+            ]},
+            "pre_tokenizer": None,
+        }
+        assert is_hf_chunk_safe(spec) is False
+
+    def test_known_split_regex_is_safe(self):
+        """GPT 계열 정규식 Split은 청크 분할 가능 (소유 수량자 표기 포함)"""
+        assert describe_tokenizer(make_split_tokenizer(CL100K_PATTERN))[2] is True
+
+    def test_arbitrary_split_is_unsafe(self):
+        """공백에서 끊지 않는 Split(숫자만 분리)은 불가"""
+        assert describe_tokenizer(make_split_tokenizer(r"\d"))[2] is False
+
+    def test_whole_text_byte_level_is_unsafe(self):
+        """정규식 없이 전체를 한 조각으로 보는 ByteLevel은 불가"""
+        assert is_hf_chunk_safe({"pre_tokenizer": {"type": "ByteLevel", "use_regex": False}}) is False
+
+    def test_added_token_with_space_is_unsafe(self):
+        """공백이 들어간 추가 토큰은 경계를 가로지를 수 있어 불가"""
+        spec = {
+            "pre_tokenizer": {"type": "Whitespace"},
+            "added_tokens": [{"content": "<start of turn>"}],
+        }
+        assert is_hf_chunk_safe(spec) is False
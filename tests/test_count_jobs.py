@@ -0,0 +1,135 @@
+"""
+count_jobs.py 테스트 - 워커 사이에 공유되는 카운트 작업 상태 검증
+"""
+import asyncio
+import threading
+
+import pytest
+
+from api.services import count_jobs
+from api.services.count_jobs import CountJobStore, CountJobsFullError
+from api.services.count_jobs_sqlite import SqliteCountJobTable
+
+
+@pytest.fixture
+def slow_count(monkeypatch):
+    """게이트가 열릴 때까지 로드가 끝나지 않는 가짜 토크나이저 로드와 카운트"""
+    gate = threading.Event()
+
+    async def load(model_id):
+        await asyncio.to_thread(gate.wait, 5)
+
+    async def count(model_name, text, is_commercial):
+        return {"model": model_name, "token_count": len(text.split())}
+
+    monkeypatch.setattr(count_jobs, "load_tokenizer_for_counting", load)
+    monkeypatch.setattr(count_jobs, "count_tokens_for_model_async", count)
+    return gate
+
+
+def make_workers(tmp_path):
+    """같은 작업 테이블을 쓰는 두 워커의 작업 저장소"""
+    path = str(tmp_path / "jobs.sqlite3")
+    return (
+        CountJobStore(ttl_seconds=60, max_jobs=10, shared=SqliteCountJobTable(path), poll_seconds=0.01),
+        CountJobStore(ttl_seconds=60, max_jobs=10, shared=SqliteCountJobTable(path), poll_seconds=0.01),
+    )
+
+
+async def noop(model):
+    pass
+
+
+class TestSharedJobs:
+    """다른 워커에서 시작한 작업 조회 테스트"""
+
+    def test_other_worker_sees_job_and_relays_updates(self, tmp_path, slow_count):
+        """작업을 시작하지 않은 워커도 조회하고, 진행 상황을 구독자에게 전달"""
+        worker_a, worker_b = make_workers(tmp_path)
+        relayed = []
+
+        async def collect(payload):
+            relayed.append(payload)
+
+        worker_b.subscribe(collect)
+
+        async def scenario():
+            job = await worker_a.start("org/model", "hello world", noop, lambda e: 500)
+            # 202 응답 직후 다른 워커로 간 조회도 작업을 찾음
+            seen = await worker_b.lookup(job.job_id)
+            assert seen is not None and seen["status"] in ("pending", "loading")
+
+            worker_b.follow(job.job_id)
+            slow_count.set()
+            for _ in range(200):
+                if relayed and relayed[-1]["status"] == "done":
+                    break
+                await asyncio.sleep(0.01)
+            return job.job_id, await worker_b.lookup(job.job_id)
+
+        job_id, final = asyncio.run(scenario())
+
+        assert final["status"] == "done"
+        assert final["result"]["token_count"] == 2
+        assert relayed[-1] == final
+        assert [p["job_id"] for p in relayed] == [job_id] * len(relayed)
+
+    def test_older_state_does_not_overwrite_newer(self, tmp_path):
+        """늦게 도착한 이전 상태는 저장된 최신 상태를 덮어쓰지 않음"""
+        table = SqliteCountJobTable(str(tmp_path / "jobs.sqlite3"))
+        table.put({"job_id": "j", "status": "done"}, seq=3, finished=True, updated_at=1.0)
+        table.put({"job_id": "j", "status": "loading"}, seq=2, finished=False, updated_at=2.0)
+
+        assert table.get("j") == (3, {"job_id": "j", "status": "done"})
+
+    def test_unknown_job(self, tmp_path):
+        """어느 워커에도 없는 작업은 None"""
+        worker_a, _ = make_workers(tmp_path)
+        assert asyncio.run(worker_a.lookup("missing")) is None
+
+
+class TestJobCapacity:
+    """작업 수 상한과 만료 테스트"""
+
+    def test_running_jobs_are_never_evicted(self):
+        """상한에 도달해도 실행 중인 작업은 남기고 새 작업을 거절"""
+        store = CountJobStore(ttl_seconds=60, max_jobs=2)
+        running = [store.create("org/a"), store.create("org/b")]
+
+        with pytest.raises(CountJobsFullError):
+            store.create("org/c")
+        assert [store.get(job.job_id) for job in running] == running
+
+    def test_oldest_finished_job_makes_room(self):
+        """완료된 작업 중 가장 오래된 것부터 제거해 자리를 만듦"""
+        store = CountJobStore(ttl_seconds=60, max_jobs=2)
+        finished = store.create("org/a")
+        running = store.create("org/b")
+        asyncio.run(store.update(finished, status="done"))
+
+        new = store.create("org/c")
+
+        assert store.get(finished.job_id) is None
+        assert store.get(running.job_id) is running
+        assert store.get(new.job_id) is new
+
+    def test_stalled_job_times_out(self, slow_count):
+        """TTL 동안 진행이 없는 작업은 504로 실패 처리되고 이후 만료"""
+        store = CountJobStore(ttl_seconds=60, max_jobs=2)
+
+        async def scenario():
+            job = await store.start("org/stuck", "hello", noop, lambda e: 500)
+            await asyncio.sleep(0.05)
+            job.updated_at -= 61
+            store.get(job.job_id)
+            for _ in range(100):
+                if job.finished:
+                    break
+                await asyncio.sleep(0.01)
+            slow_count.set()
+            return job
+
+        job = asyncio.run(scenario())
+
+        assert job.status == "failed"
+        assert job.status_code == 504
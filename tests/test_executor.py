@@ -0,0 +1,99 @@
+"""
+executor.py 테스트 - 토큰화 실행기 큐 제한 및 통계 검증
+"""
+import asyncio
+import threading
+
+import pytest
+
+from api.services.executor import TokenizationExecutor, ExecutorBusyError
+
+
+class TestTokenizationExecutor:
+    """토큰화 실행기 테스트"""
+
+    def test_run_returns_result(self):
+        """작업 결과가 이벤트 루프로 반환되는지 검증"""
+        executor = TokenizationExecutor(kind="thread", max_workers=2, max_queue=2)
+        try:
+            result = asyncio.run(executor.run(len, "hello"))
+            assert result == 5
+            assert executor.stats()["completed"] == 1
+        finally:
+            executor.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        """워커와 큐가 모두 찼을 때 요청을 거절하는지 검증"""
+        executor = TokenizationExecutor(kind="thread", max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def scenario():
+            blocked = [
+                asyncio.ensure_future(executor.run(release.wait)),
+                asyncio.ensure_future(executor.run(release.wait)),
+            ]
+            await asyncio.sleep(0.05)
+
+            stats = executor.stats()
+            assert stats["active"] == 1
+            assert stats["queued"] == 1
+            assert stats["utilization"] == 1.0
+
+            with pytest.raises(ExecutorBusyError):
+                await executor.run(len, "x")
+
+            release.set()
+            await asyncio.gather(*blocked)
+
+        try:
+            asyncio.run(scenario())
+            stats = executor.stats()
+            assert stats["rejected"] == 1
+            assert stats["completed"] == 2
+            assert stats["queued"] == 0
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_event_loop_stays_responsive(self):
+        """긴 작업 중에도 이벤트 루프가 다른 작업을 처리하는지 검증"""
+        executor = TokenizationExecutor(kind="thread", max_workers=2, max_queue=0)
+        release = threading.Event()
+
+        async def scenario():
+            slow = asyncio.ensure_future(executor.run(release.wait))
+            # 느린 작업이 끝나기 전에 작은 작업이 먼저 완료되어야 함
+            assert await executor.run(len, "abc") == 3
+            assert not slow.done()
+            release.set()
+            await slow
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_process_pool_remembers_loaded_models(self, monkeypatch):
+        """프로세스 풀은 워커가 로드한 모델을 기록하고 오래된 것부터 잊음"""
+        from api.services import executor as executor_module
+
+        monkeypatch.setattr(executor_module, "LOADED_MODELS_LIMIT", 2)
+        pool = TokenizationExecutor(kind="process", max_workers=1)
+        threads = TokenizationExecutor(kind="thread", max_workers=1)
+        try:
+            for model in ("org/a", "org/b", "org/c"):
+                pool.mark_loaded(model)
+                threads.mark_loaded(model)
+
+            assert [pool.has_loaded(m) for m in ("org/a", "org/b", "org/c")] == [False, True, True]
+            # 스레드 워커는 이 프로세스의 토크나이저 캐시를 쓰므로 기록하지 않음
+            assert not threads.has_loaded("org/c")
+        finally:
+            pool.shutdown()
+            threads.shutdown()
+
+    def test_unknown_kind(self):
+        """알 수 없는 실행기 종류는 거부"""
+        with pytest.raises(ValueError):
+            TokenizationExecutor(kind="fiber")
@@ -1,13 +1,17 @@
 """
 model_store.py 테스트 - HuggingFace 모델 저장 검증
 """
+import asyncio
 import os
 import json
 import tempfile
+import threading
 import pytest
 from unittest.mock import patch
 
+from api.config import SETTINGS
 from api.services import model_store as api_model_store
+from api.services.model_store_sqlite import SqliteModelStore
 
 
 class TestModelStorePersistence:
@@ -392,3 +396,293 @@ class TestModelStoreUsageCount:
                 if m['name'] == new_model
             )
             assert new_entry['usage_count'] == 1
+
+
+class TestUsageWriteBehind:
+    """사용 횟수 지연 쓰기 테스트"""
+
+    @pytest.fixture
+    def temp_model_store(self, tmp_path):
+        """테스트용 임시 모델 저장소 생성 (신 형식)"""
+        path = tmp_path / "models.json"
+        path.write_text(json.dumps({
+            "official": [{"name": "gpt-4o", "usage_count": 5}],
+            "custom": [
+                {"name": "microsoft/phi-4", "usage_count": 10},
+                {"name": "qwen/qwen3-8b", "usage_count": 9},
+            ],
+        }), encoding="utf-8")
+        with patch('api.services.model_store.MODEL_STORE_PATH', str(path)):
+            api_model_store.invalidate_cache()
+            yield path
+        api_model_store.invalidate_cache()
+
+    @staticmethod
+    def usage(path, category, name):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return next(m['usage_count'] for m in data[category] if m['name'] == name)
+
+    def test_increments_are_batched_until_stop(self, temp_model_store):
+        """기존 모델 사용은 파일에 바로 쓰지 않고 모았다가 종료 시 한 번에 기록"""
+        updates = []
+
+        async def on_update(store, version):
+            updates.append(store)
+
+        async def scenario():
+            api_model_store.subscribe_async(on_update)
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=1000)
+            try:
+                for _ in range(3):
+                    assert await api_model_store.add_custom_model_async("qwen/qwen3-8b") is False
+                await api_model_store.add_official_model_async("GPT-4o")
+
+                # 아직 파일에는 반영되지 않고 브로드캐스트도 없음
+                assert self.usage(temp_model_store, "custom", "qwen/qwen3-8b") == 9
+                assert api_model_store.get_usage_flush_stats()["pending_increments"] == 4
+                assert updates == []
+            finally:
+                await api_model_store.stop_usage_flusher()
+                api_model_store.unsubscribe(on_update)
+
+        asyncio.run(scenario())
+
+        assert self.usage(temp_model_store, "custom", "qwen/qwen3-8b") == 12
+        assert self.usage(temp_model_store, "official", "gpt-4o") == 6
+        assert api_model_store.get_usage_flush_stats()["pending_increments"] == 0
+
+    def test_new_model_is_written_and_broadcast_immediately(self, temp_model_store):
+        """새 모델은 지연 없이 파일에 쓰고 바로 알림"""
+        updates = []
+
+        async def on_update(store, version):
+            updates.append(store)
+
+        async def scenario():
+            api_model_store.subscribe_async(on_update)
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=1000)
+            try:
+                assert await api_model_store.add_custom_model_async("deepseek-ai/deepseek-v3") is True
+                assert self.usage(temp_model_store, "custom", "deepseek-ai/deepseek-v3") == 1
+                assert "deepseek-ai/deepseek-v3" in updates[-1]["custom"]
+            finally:
+                await api_model_store.stop_usage_flusher()
+                api_model_store.unsubscribe(on_update)
+
+        asyncio.run(scenario())
+
+    def test_threshold_triggers_flush_and_reorder_broadcast(self, temp_model_store):
+        """대기 중인 증가분이 임계값에 닿으면 주기를 기다리지 않고 기록하고, 순서가 바뀌면 알림"""
+        updates = []
+
+        async def on_update(store, version):
+            updates.append(store)
+
+        async def scenario():
+            api_model_store.subscribe_async(on_update)
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=2)
+            try:
+                await api_model_store.add_custom_model_async("qwen/qwen3-8b")
+                await api_model_store.add_custom_model_async("qwen/qwen3-8b")
+                for _ in range(100):
+                    if updates:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await api_model_store.stop_usage_flusher()
+                api_model_store.unsubscribe(on_update)
+
+        asyncio.run(scenario())
+
+        assert self.usage(temp_model_store, "custom", "qwen/qwen3-8b") == 11
+        assert updates[-1]["custom"][:2] == ["qwen/qwen3-8b", "microsoft/phi-4"]
+
+    def test_flush_keeps_external_changes(self, temp_model_store):
+        """기록할 때 파일을 다시 읽으므로 다른 프로세스가 쓴 변경을 덮어쓰지 않음"""
+        async def scenario():
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=1000)
+            try:
+                await api_model_store.add_custom_model_async("microsoft/phi-4")
+                data = json.loads(temp_model_store.read_text(encoding="utf-8"))
+                data["custom"].append({"name": "external/model", "usage_count": 1})
+                data["custom"][0]["usage_count"] = 20
+                temp_model_store.write_text(json.dumps(data), encoding="utf-8")
+                # mtime 해상도와 상관없이 변경이 감지되도록 지정
+                os.utime(temp_model_store, ns=(1, 1))
+            finally:
+                await api_model_store.stop_usage_flusher()
+
+        asyncio.run(scenario())
+
+        assert self.usage(temp_model_store, "custom", "microsoft/phi-4") == 21
+        assert self.usage(temp_model_store, "custom", "external/model") == 1
+
+    def test_counting_does_not_wait_for_running_flush(self, temp_model_store):
+        """기록 중인 flush가 파일을 쓰는 동안에도 기존 모델 사용은 기다리지 않고 대기열에 쌓임"""
+        writing = threading.Event()
+        release = threading.Event()
+        save_store = api_model_store._save_store
+
+        def slow_save(store):
+            writing.set()
+            release.wait(5)
+            save_store(store)
+
+        async def scenario():
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=1000)
+            try:
+                await api_model_store.add_custom_model_async("qwen/qwen3-8b")
+                with patch('api.services.model_store._save_store', slow_save):
+                    flush = asyncio.create_task(asyncio.to_thread(api_model_store.flush_usage))
+                    assert await asyncio.to_thread(writing.wait, 5)
+                    # flush가 _lock을 잡고 있는 동안 호출해도 바로 반환
+                    await asyncio.wait_for(api_model_store.add_custom_model_async("qwen/qwen3-8b"), 1)
+                    assert api_model_store.get_usage_flush_stats()["pending_increments"] == 1
+                    release.set()
+                    await flush
+            finally:
+                release.set()
+                await api_model_store.stop_usage_flusher()
+
+        asyncio.run(scenario())
+
+        assert self.usage(temp_model_store, "custom", "qwen/qwen3-8b") == 11
+
+    def test_without_flusher_writes_each_use(self, temp_model_store):
+        """지연 쓰기가 꺼져 있으면 이전처럼 매번 기록"""
+        asyncio.run(api_model_store.add_custom_model_async("qwen/qwen3-8b"))
+        assert self.usage(temp_model_store, "custom", "qwen/qwen3-8b") == 10
+
+
+SEED = {
+    "official": [{"name": "gpt-4o", "usage_count": 5}],
+    "custom": [
+        {"name": "microsoft/phi-4", "usage_count": 10},
+        {"name": "qwen/qwen3-8b", "usage_count": 9},
+    ],
+}
+
+
+class TestSqliteModelStore:
+    """SQLite 모델 저장소 테스트 (여러 워커 공유)"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return str(tmp_path / "models.sqlite3")
+
+    def test_seeded_once_and_shared(self, db_path):
+        """처음 연 워커만 초기 데이터를 넣고, 다른 워커는 같은 목록과 버전을 봄"""
+        seeds = []
+
+        def seed():
+            seeds.append(1)
+            return SEED
+
+        first = SqliteModelStore(db_path, seed=seed)
+        second = SqliteModelStore(db_path, seed=seed)
+
+        assert len(seeds) == 1
+        assert first.read() == second.read()
+        assert first.read()["custom"] == ["microsoft/phi-4", "qwen/qwen3-8b"]
+        assert first.read()["official"] == ["gpt-4o"]
+
+    def test_version_is_global_and_monotonic(self, db_path):
+        """어느 워커가 쓰든 하나의 버전이 증가"""
+        first = SqliteModelStore(db_path, seed=lambda: SEED)
+        second = SqliteModelStore(db_path, seed=lambda: SEED)
+        version = first.read()["version"]
+
+        assert first.record_use("custom", "qwen/qwen3-8b") is False
+        assert second.record_use("custom", "org/new-model") is True
+        second.add_usage({("custom", "qwen/qwen3-8b"): 2, ("official", "gpt-4o"): 1})
+
+        assert first.read()["version"] == second.read()["version"] == version + 3
+        # 9 + 1 + 2 = 12 로 phi-4(10)보다 앞섬
+        assert first.read()["custom"] == ["qwen/qwen3-8b", "microsoft/phi-4", "org/new-model"]
+
+    def test_read_cache_revalidated_by_data_version(self, db_path):
+        """다른 연결이 커밋하지 않으면 캐시를 쓰고, 커밋하면 다시 읽음"""
+        reader = SqliteModelStore(db_path, seed=lambda: SEED)
+        writer = SqliteModelStore(db_path, seed=lambda: SEED)
+
+        cached = reader.read()
+        assert reader.read() is cached
+        assert reader.stats()["cache_hits"] == 1
+
+        writer.record_use("official", "gpt-4o-mini")
+
+        assert "gpt-4o-mini" in reader.read()["official"]
+
+    def test_concurrent_increments_are_not_lost(self, db_path):
+        """여러 연결이 동시에 증가시켜도 합이 정확함"""
+        stores = [SqliteModelStore(db_path, seed=lambda: SEED) for _ in range(4)]
+
+        def hammer(store):
+            for _ in range(50):
+                store.record_use("custom", "microsoft/phi-4")
+
+        threads = [threading.Thread(target=hammer, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        conn = stores[0]._conn
+        count = conn.execute(
+            "SELECT usage_count FROM models WHERE category = 'custom' AND name = 'microsoft/phi-4'"
+        ).fetchone()[0]
+        assert count == 10 + 4 * 50
+        assert stores[0].read()["version"] == 1 + 4 * 50
+
+
+class TestModelStoreSqliteBackend:
+    """MODEL_STORE_DB_PATH 설정 시 model_store가 SQLite를 쓰는지 테스트"""
+
+    @pytest.fixture
+    def sqlite_backend(self, tmp_path, monkeypatch):
+        """models.json에서 가져온 SQLite 저장소 사용"""
+        json_path = tmp_path / "models.json"
+        json_path.write_text(json.dumps(SEED), encoding="utf-8")
+        monkeypatch.setattr(api_model_store, "MODEL_STORE_PATH", str(json_path))
+        monkeypatch.setattr(SETTINGS, "model_store_db_path", str(tmp_path / "models.sqlite3"))
+        monkeypatch.setattr(api_model_store, "_db", None)
+        yield json_path
+        if api_model_store._db is not None:
+            api_model_store._db.close()
+
+    def test_imports_models_json(self, sqlite_backend):
+        """처음 열 때 models.json 내용을 가져옴"""
+        models = api_model_store.get_all_models()
+
+        assert models["official"] == ["gpt-4o"]
+        assert models["custom"] == ["microsoft/phi-4", "qwen/qwen3-8b"]
+        assert models["version"] == api_model_store.get_version()
+
+    def test_sync_add_updates_database(self, sqlite_backend):
+        """동기 추가도 SQLite에 기록하고 models.json은 건드리지 않음"""
+        before = sqlite_backend.read_text(encoding="utf-8")
+        version = api_model_store.get_version()
+
+        assert api_model_store.add_custom_model("Org/New-Model") is True
+        assert api_model_store.add_custom_model("org/new-model") is False
+
+        assert "org/new-model" in api_model_store.get_custom_models()
+        assert api_model_store.get_version() == version + 2
+        assert sqlite_backend.read_text(encoding="utf-8") == before
+
+    def test_write_behind_flushes_into_database(self, sqlite_backend):
+        """지연 쓰기된 사용 횟수가 한 트랜잭션으로 SQLite에 더해짐"""
+        async def scenario():
+            api_model_store.start_usage_flusher(interval_seconds=3600, threshold=1000)
+            try:
+                for _ in range(2):
+                    await api_model_store.add_custom_model_async("qwen/qwen3-8b")
+                assert api_model_store.get_custom_models()[0] == "microsoft/phi-4"
+            finally:
+                await api_model_store.stop_usage_flusher()
+
+        version = api_model_store.get_version()
+        asyncio.run(scenario())
+
+        assert api_model_store.get_custom_models()[0] == "qwen/qwen3-8b"
+        assert api_model_store.get_version() == version + 1
@@ -0,0 +1,189 @@
+"""
+pricing.py 테스트 - 가장 구체적인 접두사로 가격 정보를 찾는지, 데이터 파일이 바뀌면 스냅샷이 교체되는지 검증
+"""
+import json
+import os
+
+import pytest
+
+from utils import pricing
+from utils.config import SETTINGS
+from utils.pricing import calculate_cost, get_context_usage, get_model_info
+
+
+def model_info(key):
+    """현재 스냅샷의 모델 정보"""
+    return pricing.get_pricing_snapshot().models[key]
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """임시 가격 파일을 쓰고 바로 다시 읽도록 설정 (테스트 후 기본 스냅샷으로 복원)"""
+    path = tmp_path / "pricing.json"
+    monkeypatch.setattr(SETTINGS, "pricing_catalog_path", str(path))
+    monkeypatch.setattr(SETTINGS, "pricing_reload_interval_seconds", 0)
+    monkeypatch.setattr(pricing, "_snapshot", None)
+    monkeypatch.setattr(pricing, "_last_error", None)
+    mtime = [1_000_000_000_000_000_000]
+
+    def write(models, raw=None):
+        path.write_text(raw if raw is not None else json.dumps({"models": models}), encoding="utf-8")
+        # 파일 시스템 mtime 해상도와 상관없이 쓸 때마다 mtime이 바뀌도록 지정
+        mtime[0] += 1_000_000_000
+        os.utime(path, ns=(mtime[0], mtime[0]))
+
+    write({"gpt-4o": {"input_price": 2.5, "context_window": 128000}})
+    return write
+
+
+class TestGetModelInfo:
+    """모델 이름 → 가격 정보 조회 테스트"""
+
+    @pytest.mark.parametrize("model_name, key", [
+        ("gpt-4o", "gpt-4o"),
+        ("gpt-4o-mini", "gpt-4o-mini"),
+        ("gpt-4o-mini-2024-07-18", "gpt-4o-mini"),
+        ("gpt-4-turbo-preview", "gpt-4-turbo"),
+        ("gpt-4-0613", "gpt-4"),
+        ("o1-mini", "o1-mini"),
+        ("o1-preview", "o1"),
+        ("claude-3-5-sonnet-20241022", "claude-3-5-sonnet"),
+        ("gemini-2.0-flash-lite-001", "gemini-2.0-flash-lite"),
+    ])
+    def test_most_specific_prefix_wins(self, model_name, key):
+        """여러 키가 접두사로 맞으면 가장 긴 키 사용 (gpt-4o-mini는 gpt-4o 가격이 아님)"""
+        assert get_model_info(model_name) is model_info(key)
+
+    @pytest.mark.parametrize("model_name, key", [
+        ("openai/gpt-4o-mini", "gpt-4o-mini"),
+        ("us.anthropic.claude-3-5-haiku-20241022-v1:0", "claude-3-5-haiku"),
+        ("ft:gpt-4o-mini:my-org:custom:abc123", "gpt-4o-mini"),
+    ])
+    def test_provider_prefixes(self, model_name, key):
+        """제공자 접두사(/ . :) 뒤의 모델 이름도 매칭"""
+        assert get_model_info(model_name) is model_info(key)
+
+    @pytest.mark.parametrize("model_name", ["gpt2", "facebook/opt-1.3b", "qwen/qwen3-8b", ""])
+    def test_unknown_models(self, model_name):
+        """가격 정보가 없는 모델은 None"""
+        assert get_model_info(model_name) is None
+
+    def test_resolve_cache_is_per_snapshot(self, catalog):
+        """새 스냅샷은 새 인덱스와 조회 캐시를 쓰므로 이전 매칭 결과가 남지 않음"""
+        assert get_model_info("gpt-4o-audio-preview")["input_price"] == 2.5
+
+        catalog({
+            "gpt-4o": {"input_price": 2.5, "context_window": 128000},
+            "gpt-4o-audio": {"input_price": 40.0, "context_window": 128000},
+        })
+
+        assert get_model_info("gpt-4o-audio-preview")["input_price"] == 40.0
+
+
+class TestPricingCatalog:
+    """데이터 파일 로드/검증/교체 테스트"""
+
+    def test_default_catalog_has_known_models(self):
+        """기본 데이터 파일이 검증을 통과하고 알려진 모델을 포함"""
+        snapshot = pricing.get_pricing_snapshot()
+        assert snapshot.source == pricing.DEFAULT_CATALOG_PATH
+        assert snapshot.models["gpt-4o-mini"]["input_price"] == 0.15
+
+    def test_snapshot_is_read_only(self, catalog):
+        """스냅샷과 모델 정보는 요청 사이에서 수정할 수 없음"""
+        snapshot = pricing.get_pricing_snapshot()
+        with pytest.raises(TypeError):
+            snapshot.models["gpt-4o"]["input_price"] = 0
+        with pytest.raises(TypeError):
+            snapshot.models["new-model"] = {}
+
+    def test_mtime_change_swaps_snapshot(self, catalog):
+        """파일이 바뀌면 새 스냅샷으로 교체되고 버전과 ETag가 바뀜"""
+        before = pricing.get_pricing_snapshot()
+        assert pricing.get_pricing_snapshot() is before
+
+        catalog({"gpt-4o": {"input_price": 5.0, "context_window": 128000}})
+        after = pricing.get_pricing_snapshot()
+
+        assert after is not before
+        assert after.version != before.version
+        assert after.etag != before.etag
+        assert calculate_cost("gpt-4o", 1_000_000) == pytest.approx(5.0)
+        # 이전 스냅샷을 들고 있던 요청은 이전 값을 그대로 봄
+        assert before.get("gpt-4o")["input_price"] == 2.5
+
+    def test_touch_without_changes_keeps_version(self, catalog):
+        """내용이 같으면 mtime만 바뀌어도 버전과 ETag 유지"""
+        before = pricing.get_pricing_snapshot()
+        catalog({"gpt-4o": {"input_price": 2.5, "context_window": 128000}})
+        after = pricing.get_pricing_snapshot()
+
+        assert after.version == before.version
+        assert after.etag == before.etag
+
+    def test_version_is_same_in_every_process(self, catalog):
+        """버전은 내용에서 나오므로 다시 로드한 프로세스(다른 워커, 재시작)도 같은 버전"""
+        before = pricing.get_pricing_snapshot()
+        pricing._snapshot = None
+
+        assert pricing.get_pricing_snapshot().version == before.version == before.digest[:16]
+
+    def test_declared_version(self, catalog):
+        """데이터 파일에 version이 있으면 그 값을 버전으로 사용"""
+        catalog(None, raw=json.dumps({
+            "version": "2025-06-01",
+            "models": {"gpt-4o": {"input_price": 2.5, "context_window": 128000}},
+        }))
+
+        assert pricing.get_pricing_snapshot().version == "2025-06-01"
+        assert pricing.get_pricing_stats()["version"] == "2025-06-01"
+
+    @pytest.mark.parametrize("raw", [
+        "{not json",
+        '{"gpt-4o": {"input_price": 1.0, "context_window": 1000}}',
+        '{"models": {"gpt-4o": {"input_price": -1, "context_window": 1000}}}',
+        '{"models": {"gpt-4o": {"input_price": 1.0, "context_window": 0}}}',
+        '{"models": {"gpt-4o": {"input_price": 1.0, "context_window": "128K"}}}',
+        '{"models": {"gpt-4o": {"input_price": 1.0, "context_window": 1000, "note": 1}}}',
+        '{"version": "", "models": {"gpt-4o": {"input_price": 1.0, "context_window": 1000}}}',
+    ])
+    def test_invalid_catalog_keeps_previous_snapshot(self, catalog, raw):
+        """잘못된 파일은 적용하지 않고 이전 스냅샷과 오류를 유지"""
+        before = pricing.get_pricing_snapshot()
+
+        catalog(None, raw=raw)
+
+        assert pricing.get_pricing_snapshot() is before
+        assert pricing.get_pricing_stats()["last_error"] is not None
+
+    def test_invalid_initial_catalog_raises(self, catalog):
+        """처음 로드할 파일이 잘못되었으면 예외"""
+        catalog(None, raw='{"models": []}')
+        pricing._snapshot = None
+        with pytest.raises(pricing.PricingCatalogError):
+            pricing.get_pricing_snapshot()
+
+    def test_reload_interval_limits_stat_calls(self, catalog, monkeypatch):
+        """확인 간격 안에서는 파일이 바뀌어도 기존 스냅샷 사용"""
+        before = pricing.get_pricing_snapshot()
+        monkeypatch.setattr(SETTINGS, "pricing_reload_interval_seconds", 3600)
+
+        catalog({"gpt-4o": {"input_price": 5.0, "context_window": 128000}})
+
+        assert pricing.get_pricing_snapshot() is before
+        assert pricing.reload_pricing().version != before.version
+
+
+class TestCostAndContext:
+    """비용과 컨텍스트 사용률 계산 테스트"""
+
+    def test_calculate_cost_uses_specific_price(self):
+        """gpt-4o-mini는 1M 토큰당 0.15 USD"""
+        assert calculate_cost("gpt-4o-mini", 1_000_000) == pytest.approx(0.15)
+        assert calculate_cost("unknown-model", 100) is None
+
+    def test_context_usage(self):
+        """컨텍스트 윈도우 대비 사용률"""
+        usage, window = get_context_usage("gpt-4", 4096)
+        assert window == 8192
+        assert usage == pytest.approx(50.0)
@@ -0,0 +1,90 @@
+"""
+singleflight.py 테스트 - 동일 요청 병합 검증
+"""
+import asyncio
+
+import pytest
+
+from api.services.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """요청 병합 테스트"""
+
+    def test_concurrent_identical_calls_share_one_execution(self):
+        """동시에 들어온 같은 키의 요청은 한 번만 실행"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return 42
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == [42] * 5
+        assert calls == 1
+
+        stats = flight.stats()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+
+    def test_different_keys_run_separately(self):
+        """키가 다르면 각각 실행"""
+        flight = SingleFlight()
+
+        async def scenario():
+            return await asyncio.gather(
+                flight.do("a", lambda: asyncio.sleep(0.01, result="a")),
+                flight.do("b", lambda: asyncio.sleep(0.01, result="b")),
+            )
+
+        assert asyncio.run(scenario()) == ["a", "b"]
+        assert flight.stats()["executions"] == 2
+
+    def test_errors_are_shared(self):
+        """실패한 계산의 예외를 모든 대기자가 받음"""
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def scenario():
+            return await asyncio.gather(
+                *(flight.do("key", failing) for _ in range(3)),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """한 호출자가 취소되어도 공유 계산은 계속 진행"""
+        flight = SingleFlight()
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("key", lambda: asyncio.sleep(0.03, result=7)))
+            second = asyncio.ensure_future(flight.do("key", lambda: asyncio.sleep(0.03, result=7)))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(scenario()) == 7
+
+    def test_completed_calls_are_not_reused(self):
+        """완료된 계산은 이후 요청에 재사용하지 않음 (결과 캐시 역할 아님)"""
+        flight = SingleFlight()
+
+        async def scenario():
+            await flight.do("key", lambda: asyncio.sleep(0, result=1))
+            await flight.do("key", lambda: asyncio.sleep(0, result=2))
+
+        asyncio.run(scenario())
+        assert flight.stats()["executions"] == 2
@@ -0,0 +1,86 @@
+"""
+tiktoken_resolver.py 테스트 - 모델 → 인코딩 해석과 상주 인코더 검증
+"""
+import pytest
+import tiktoken
+from tiktoken.model import encoding_name_for_model
+
+from core import tiktoken_resolver
+from core.tiktoken_resolver import resolve_encoding_name
+from core.token_counter import count_tokens_tiktoken
+from tests.test_chunking import CL100K_PATTERN, make_text, make_tiktoken_encoding
+from utils.config import SETTINGS
+
+
+class TestResolveEncodingName:
+    """모델 이름 해석 테스트"""
+
+    @pytest.mark.parametrize("model_name,expected", [
+        ("gpt-4o", "o200k_base"),
+        ("gpt-4o-mini", "o200k_base"),
+        ("gpt-4o-2024-08-06", "o200k_base"),
+        ("gpt-4", "cl100k_base"),
+        ("gpt-4-0613", "cl100k_base"),
+        ("gpt-3.5-turbo-16k", "cl100k_base"),
+        ("o1-mini", "o200k_base"),
+    ])
+    def test_known_models(self, model_name, expected):
+        """tiktoken의 모델 표와 같은 결과"""
+        assert resolve_encoding_name(model_name) == expected
+
+    @pytest.mark.parametrize("model_name", ["gpt-5.1", "gpt-6", "some-new-model"])
+    def test_unknown_models_fall_back_to_gpt_4o(self, model_name):
+        """모르는 모델은 예외 없이 gpt-4o 인코딩"""
+        assert resolve_encoding_name(model_name) == encoding_name_for_model("gpt-4o")
+
+
+class TestResidentEncoders:
+    """인코더 상주 테스트"""
+
+    def test_encoder_loaded_once(self, monkeypatch):
+        """같은 인코딩의 모델들이 인코더 하나를 공유"""
+        loads = []
+
+        def fake_get_encoding(name):
+            loads.append(name)
+            return make_tiktoken_encoding(name, CL100K_PATTERN)
+
+        monkeypatch.setattr(tiktoken_resolver, "_encoders", {})
+        monkeypatch.setattr(tiktoken_resolver.tiktoken, "get_encoding", fake_get_encoding)
+
+        first = tiktoken_resolver.encoder_for_model("gpt-4o")
+        second = tiktoken_resolver.encoder_for_model("gpt-4o-mini")
+        tiktoken_resolver.encoder_for_model("gpt-4")
+
+        assert first is second
+        assert loads == ["o200k_base", "cl100k_base"]
+        assert tiktoken_resolver.loaded_encodings() == ["cl100k_base", "o200k_base"]
+
+
+class TestSpecialTokenText:
+    """특수 토큰 문자열이 들어간 텍스트"""
+
+    def make_encoding(self) -> tiktoken.Encoding:
+        ranks = {bytes([i]): i for i in range(256)}
+        return tiktoken.Encoding(
+            name="cl100k_base",
+            pat_str=CL100K_PATTERN,
+            mergeable_ranks=ranks,
+            special_tokens={"<|endoftext|>": 256},
+        )
+
+    def test_counts_as_ordinary_text(self):
+        """<|endoftext|>를 붙여넣어도 ValueError 없이 일반 텍스트로 셈"""
+        encoder = self.make_encoding()
+        text = "hello <|endoftext|> world"
+        with pytest.raises(ValueError):
+            encoder.encode(text)
+        assert count_tokens_tiktoken(encoder, text) == len(encoder.encode_ordinary(text))
+
+    def test_chunked_path_counts_as_ordinary_text(self, monkeypatch):
+        """청크 분할 경로도 같은 방식"""
+        monkeypatch.setattr(SETTINGS, "parallel_count_threshold_chars", 1_000)
+        monkeypatch.setattr(SETTINGS, "parallel_count_chunk_chars", 500)
+        encoder = self.make_encoding()
+        text = make_text(0, 5_000) + " <|endoftext|> " + make_text(1, 5_000)
+        assert count_tokens_tiktoken(encoder, text) == len(encoder.encode_ordinary(text))
@@ -0,0 +1,151 @@
+"""
+token_counter.py 테스트 - 토큰 수 계산 경로와 결과 캐시 검증
+"""
+import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import PreTrainedTokenizerFast
+
+from api.services import token_counter
+from api.services.token_counter import TokenCountCache
+from core import tokenizer_loader
+from core.token_counter import count_tokens
+from core.tokenizer_cache import TokenizerCache, TokenizerEntry
+
+
+def make_tokenizer(vocab_words: list[str]) -> PreTrainedTokenizerFast:
+    """공백 단위 WordLevel 토크나이저 생성 (네트워크 불필요)"""
+    vocab = {"[UNK]": 0}
+    for word in vocab_words:
+        vocab.setdefault(word, len(vocab))
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=backend, unk_token="[UNK]")
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """같은 어휘를 공유하는 두 모델과 다른 어휘의 모델 한 개 등록"""
+    shared_vocab = ["hello", "world", "token"]
+    cache = TokenizerCache(budget_bytes=1024 * 1024 * 1024)
+    for model_id, vocab in [
+        ("org/model-8b", shared_vocab),
+        ("org/model-32b", shared_vocab),
+        ("other/model", ["different", "vocab"]),
+    ]:
+        tokenizer = make_tokenizer(vocab)
+        cache.put(model_id, TokenizerEntry(tokenizer, *tokenizer_loader.describe_tokenizer(tokenizer)))
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", cache)
+    monkeypatch.setattr(token_counter, "result_cache", TokenCountCache(max_bytes=1024 * 1024))
+    return token_counter.result_cache
+
+
+def make_tokenizer_with_special_tokens() -> PreTrainedTokenizerFast:
+    """[BOS] ... [EOS]를 붙이는 후처리기가 있는 토크나이저"""
+    vocab = {"[UNK]": 0, "[BOS]": 1, "[EOS]": 2, "hello": 3, "world": 4}
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.post_processor = processors.TemplateProcessing(
+        single="[BOS] $A [EOS]",
+        special_tokens=[("[BOS]", 1), ("[EOS]", 2)],
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=backend, unk_token="[UNK]", bos_token="[BOS]", eos_token="[EOS]"
+    )
+
+
+class TestCountOnlyPath:
+    """BatchEncoding 없이 길이만 읽는 경로 테스트"""
+
+    def test_matches_batch_encoding_length(self):
+        """tokenizer(text) 결과와 같은 토큰 수"""
+        tokenizer = make_tokenizer_with_special_tokens()
+        text = "hello world hello"
+
+        assert count_tokens(tokenizer, text) == len(tokenizer(text)["input_ids"]) == 5
+
+    def test_special_tokens_are_explicit(self):
+        """특수 토큰 포함 여부를 명시적으로 선택"""
+        tokenizer = make_tokenizer_with_special_tokens()
+
+        assert count_tokens(tokenizer, "hello world", add_special_tokens=True) == 4
+        assert count_tokens(tokenizer, "hello world", add_special_tokens=False) == 2
+
+    def test_raw_tokenizer(self):
+        """tokenizers.Tokenizer도 같은 결과"""
+        tokenizer = make_tokenizer_with_special_tokens()
+
+        assert count_tokens(tokenizer.backend_tokenizer, "hello world") == 4
+
+    def test_empty_text(self):
+        assert count_tokens(make_tokenizer_with_special_tokens(), "") == 0
+
+
+class TestTokenCountCache:
+    """결과 캐시 동작 테스트"""
+
+    def test_hit_after_miss(self):
+        """같은 지문과 텍스트는 두 번째 조회에서 적중"""
+        cache = TokenCountCache(max_bytes=1024 * 1024)
+        digest = TokenCountCache.text_digest("hello")
+
+        assert cache.get("fp", digest) is None
+        cache.put("fp", digest, 3)
+        assert cache.get("fp", digest) == 3
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_evicts_least_recently_used_over_budget(self):
+        """바이트 예산 초과 시 가장 오래 사용하지 않은 항목부터 제거"""
+        probe = TokenCountCache(max_bytes=1024 * 1024)
+        probe.put("fp", TokenCountCache.text_digest("probe"), 1)
+        entry_size = probe.stats()["bytes"]
+
+        cache = TokenCountCache(max_bytes=entry_size * 2)
+        first, second, third = (TokenCountCache.text_digest(t) for t in ("a", "b", "c"))
+        cache.put("fp", first, 1)
+        cache.put("fp", second, 2)
+        cache.get("fp", first)  # first를 최근 사용으로 갱신
+        cache.put("fp", third, 3)
+
+        assert cache.get("fp", second) is None
+        assert cache.get("fp", first) == 1
+        assert cache.get("fp", third) == 3
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= entry_size * 2
+
+    def test_disabled_when_budget_is_zero(self):
+        """예산이 0이면 저장하지 않음"""
+        cache = TokenCountCache(max_bytes=0)
+        digest = TokenCountCache.text_digest("hello")
+        cache.put("fp", digest, 3)
+        assert cache.get("fp", digest) is None
+
+
+class TestHuggingFaceResultCache:
+    """HuggingFace 경로의 결과 캐시 공유 테스트"""
+
+    def test_models_with_same_vocab_share_entries(self, fake_models):
+        """어휘가 같은 모델끼리는 캐시 항목을 공유"""
+        text = "hello world token"
+
+        assert token_counter.count_tokens_huggingface("org/model-8b", text) == 3
+        assert token_counter.count_tokens_huggingface("org/model-32b", text) == 3
+
+        stats = fake_models.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        assert stats["entries"] == 1
+
+    def test_different_vocab_does_not_share(self, fake_models):
+        """어휘가 다른 모델은 별도 항목 사용"""
+        text = "hello world"
+
+        token_counter.count_tokens_huggingface("org/model-8b", text)
+        token_counter.count_tokens_huggingface("other/model", text)
+
+        stats = fake_models.stats()
+        assert stats["misses"] == 2
+        assert stats["entries"] == 2
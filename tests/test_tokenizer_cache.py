@@ -0,0 +1,138 @@
+"""
+tokenizer_cache.py 테스트 - 메모리 예산 LRU 토크나이저 캐시 검증
+"""
+from core.tokenizer_cache import TokenizerCache, TokenizerEntry
+
+
+def entry(size: int) -> TokenizerEntry:
+    return TokenizerEntry(tokenizer=object(), fingerprint=f"fp-{size}", size_bytes=size)
+
+
+class TestTokenizerCache:
+    """토크나이저 캐시 테스트"""
+
+    def test_evicts_least_recently_used_over_budget(self):
+        """예산을 넘으면 가장 오래 사용하지 않은 항목 제거"""
+        cache = TokenizerCache(budget_bytes=300)
+        cache.put("a", entry(100))
+        cache.put("b", entry(100))
+        cache.put("c", entry(100))
+        cache.get("a")  # a를 최근 사용으로 갱신
+
+        evicted = cache.put("d", entry(100))
+
+        assert evicted == ["b"]
+        assert "a" in cache and "b" not in cache
+        stats = cache.stats()
+        assert stats["bytes"] == 300
+        assert stats["evictions"] == 1
+        assert stats["evicted_bytes"] == 100
+
+    def test_pinned_models_are_not_evicted(self):
+        """고정된 모델은 예산을 넘어도 유지"""
+        cache = TokenizerCache(budget_bytes=200)
+        cache.set_pinned(["popular/model"])
+        cache.put("popular/model", entry(100))
+        cache.put("b", entry(100))
+
+        evicted = cache.put("c", entry(100))
+
+        assert evicted == ["b"]
+        assert "popular/model" in cache
+
+    def test_oversized_entry_is_kept(self):
+        """예산보다 큰 새 항목도 캐시에 남음 (다른 항목만 제거)"""
+        cache = TokenizerCache(budget_bytes=100)
+        cache.put("a", entry(50))
+
+        evicted = cache.put("huge", entry(500))
+
+        assert evicted == ["a"]
+        assert "huge" in cache
+        assert not cache.has_headroom()
+
+    def test_put_if_fits_never_evicts(self):
+        """예산 안에 들어갈 때만 추가하고, 넘으면 다른 항목을 제거하지 않고 거절"""
+        cache = TokenizerCache(budget_bytes=200)
+        cache.put("a", entry(100))
+
+        assert cache.has_headroom()
+        assert cache.put_if_fits("big", entry(150)) is False
+        assert "big" not in cache and "a" in cache
+        assert cache.put_if_fits("small", entry(100)) is True
+        assert cache.stats()["bytes"] == 200
+        assert cache.stats()["evictions"] == 0
+
+    def test_put_if_fits_accepts_shared_instance(self):
+        """이미 있는 인스턴스를 공유하는 항목은 메모리를 더 쓰지 않아 항상 추가"""
+        cache = TokenizerCache(budget_bytes=100)
+        shared = entry(100)
+        cache.put("a", shared)
+
+        assert cache.put_if_fits("alias", shared) is True
+        assert cache.stats()["bytes"] == 100
+
+    def test_hit_and_miss_stats(self):
+        """조회 통계 기록"""
+        cache = TokenizerCache(budget_bytes=1000)
+        cache.put("a", entry(10))
+
+        assert cache.get("a") is not None
+        assert cache.get("missing") is None
+        assert cache.peek("a") is not None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+
+class TestSharedInstances:
+    """같은 토크나이저 인스턴스를 공유하는 별칭 테스트"""
+
+    def test_shared_instance_is_counted_once(self):
+        """별칭은 메모리를 한 번만 차지하고 절약한 크기가 통계에 나옴"""
+        cache = TokenizerCache(budget_bytes=1000)
+        shared = entry(100)
+        cache.put("org/model-8b", shared)
+        cache.put("org/model-32b", shared)
+
+        stats = cache.stats()
+        assert stats["bytes"] == 100
+        assert stats["instances"] == 1
+        assert stats["shared_bytes_saved"] == 100
+        assert cache.find(shared.fingerprint) is shared
+        assert cache.alias_groups() == [{
+            "fingerprint": shared.fingerprint,
+            "models": ["org/model-8b", "org/model-32b"],
+            "size_bytes": 100,
+            "saved_bytes": 100,
+        }]
+
+    def test_alias_group_is_evicted_together(self):
+        """공유 인스턴스는 별칭을 모두 제거해야 메모리가 풀리므로 그룹 단위로 제거"""
+        cache = TokenizerCache(budget_bytes=200)
+        shared = entry(100)
+        cache.put("a-8b", shared)
+        cache.put("a-32b", shared)
+        cache.put("b", entry(99))
+
+        evicted = cache.put("c", entry(98))
+
+        assert evicted == ["a-8b", "a-32b"]
+        assert cache.stats()["bytes"] == 197
+        assert cache.find(shared.fingerprint) is None
+
+    def test_removing_one_alias_keeps_instance(self):
+        """별칭 하나를 지워도 남은 모델이 쓰는 동안은 메모리를 유지"""
+        cache = TokenizerCache(budget_bytes=1000)
+        shared = entry(100)
+        cache.put("a", shared)
+        cache.put("b", shared)
+
+        cache.remove("a")
+
+        assert cache.stats()["bytes"] == 100
+        assert cache.find_instance(shared.tokenizer) is shared
+        cache.remove("b")
+        assert cache.stats()["bytes"] == 0
+        assert cache.find_instance(shared.tokenizer) is None
@@ -0,0 +1,225 @@
+"""
+tokenizer_daemon.py 테스트 - Unix 소켓 프로토콜, 파이프라이닝/배치, API 워커 연동 검증
+"""
+import asyncio
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from api.services import token_counter
+from api.services.token_counter import TokenCountCache
+from api.services.tokenizer_client import TokenizerDaemonClient, TokenizerDaemonError
+from core import tiktoken_resolver, tokenizer_daemon, tokenizer_loader
+from core.tokenizer_cache import TokenizerCache
+from core.tokenizer_daemon import OP_COUNT, TokenizerDaemon, decode_request, encode_request
+from tests.test_chunking import CL100K_PATTERN, make_tiktoken_encoding
+from tests.test_token_counter import make_tokenizer
+
+MODELS = {
+    "org/model": ["hello", "world", "token"],
+    "org/other": ["different", "vocab"],
+}
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    """가짜 Hub로 토크나이저를 로드하는 데몬을 별도 이벤트 루프 스레드에서 실행"""
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+    monkeypatch.setattr(tokenizer_loader, "_load_from_local_cache", lambda model_id: None)
+    monkeypatch.setattr(tokenizer_loader, "load_from_bundle", lambda model_id: None)
+    hub_loads = []
+
+    def fake_hub(model_id):
+        hub_loads.append(model_id)
+        if model_id not in MODELS:
+            raise OSError(f"{model_id} is not a valid model identifier")
+        return make_tokenizer(MODELS[model_id])
+
+    monkeypatch.setattr(tokenizer_loader, "_load_from_hub", fake_hub)
+
+    # Unix 소켓 경로 길이 제한 때문에 짧은 임시 디렉터리 사용
+    directory = tempfile.mkdtemp(prefix="tkd", dir="/tmp")
+    server = TokenizerDaemon(str(Path(directory) / "daemon.sock"), workers=2, max_batch=64)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    server.hub_loads = hub_loads
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def client(daemon):
+    """데몬 소켓에 연결하는 워커 쪽 클라이언트"""
+    return TokenizerDaemonClient(daemon.socket_path, timeout_seconds=10)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestProtocol:
+    """프레임 인코딩 테스트"""
+
+    def test_request_roundtrip(self):
+        """요청 프레임을 풀면 원래 값이 나옴 (서로게이트 문자 포함)"""
+        frame = encode_request(7, 1, 3, "org/model", "안녕 \ud800 hello")
+        assert decode_request(frame[4:]) == (7, 1, 3, "org/model", "안녕 \ud800 hello")
+
+
+class TestTokenizerDaemon:
+    """데몬 카운트/인코딩 테스트"""
+
+    def test_count_matches_local(self, client):
+        """데몬의 토큰 수와 지문이 로컬 계산과 같음"""
+        tokenizer = make_tokenizer(MODELS["org/model"])
+        text = "hello world token unknown words"
+
+        count, fingerprint = run(client.count("org/model", text))
+
+        assert count == len(tokenizer(text)["input_ids"])
+        assert fingerprint == tokenizer_loader.describe_tokenizer(tokenizer)[0]
+        assert client.fingerprint("org/model") == fingerprint
+
+    def test_pipelined_requests_are_batched(self, client, daemon):
+        """한 연결로 보낸 동시 요청이 묶여서 처리되고 각자 맞는 응답을 받음"""
+        texts = [" ".join(["hello"] * n) for n in range(1, 41)]
+
+        async def count_all():
+            return await asyncio.gather(*(client.count("org/model", text) for text in texts))
+
+        results = run(count_all())
+
+        assert [count for count, _ in results] == list(range(1, 41))
+        assert client.stats()["connects"] == 1
+        assert daemon.stats()["largest_batch"] > 1
+        assert daemon.hub_loads == ["org/model"]
+
+    def test_encode(self, client):
+        """토큰 id를 그대로 돌려줌"""
+        tokenizer = make_tokenizer(MODELS["org/model"])
+        ids = run(client.encode("org/model", "hello token world"))
+        assert ids == tokenizer.encode("hello token world")
+
+    def test_error_does_not_break_connection(self, client):
+        """로드 실패는 해당 요청에만 오류로 돌아가고 같은 연결의 다른 요청은 성공"""
+        async def mixed():
+            return await asyncio.gather(
+                client.count("org/missing", "hello"),
+                client.count("org/other", "different vocab"),
+                return_exceptions=True,
+            )
+
+        missing, other = run(mixed())
+
+        assert isinstance(missing, TokenizerDaemonError)
+        assert missing.error_class == "OSError"
+        assert other[0] == 2
+
+    def test_bad_text_does_not_fail_batch(self, client, monkeypatch):
+        """묶음 안의 한 텍스트가 실패해도 같은 묶음의 다른 요청은 성공"""
+        count_tokens_batch = tokenizer_daemon.count_tokens_batch
+
+        def failing_batch(tokenizer, texts, *args, **kwargs):
+            if "bad" in texts:
+                raise ValueError("cannot tokenize")
+            return count_tokens_batch(tokenizer, texts, *args, **kwargs)
+
+        monkeypatch.setattr(tokenizer_daemon, "count_tokens_batch", failing_batch)
+
+        async def mixed():
+            return await asyncio.gather(
+                client.count("org/model", "hello"),
+                client.count("org/model", "bad"),
+                client.count("org/model", "hello world"),
+                return_exceptions=True,
+            )
+
+        first, bad, last = run(mixed())
+
+        assert first[0] == 1
+        assert isinstance(bad, TokenizerDaemonError)
+        assert bad.error_class == "ValueError"
+        assert last[0] == 2
+
+    def test_close_fails_queued_requests(self, daemon):
+        """종료하면서 취소된 묶음이나 종료 뒤 요청은 멈추지 않고 오류로 끝남"""
+        server = TokenizerDaemon(str(Path(daemon.socket_path).with_name("closing.sock")), workers=1)
+        release = threading.Event()
+
+        async def scenario():
+            server._executor.submit(release.wait, 5)
+            queued = asyncio.create_task(server._submit(OP_COUNT, 0, "org/model", "hello"))
+            await asyncio.sleep(0.05)
+            await server.close()
+            release.set()
+            with pytest.raises(RuntimeError, match="shutting down"):
+                await asyncio.wait_for(queued, 5)
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(server._submit(OP_COUNT, 0, "org/model", "hello"), 5)
+
+        run(scenario())
+
+    def test_tiktoken_count(self, client, monkeypatch):
+        """GPT 모델은 데몬의 tiktoken 인코더로 셈"""
+        encoding = make_tiktoken_encoding("o200k_base", CL100K_PATTERN)
+        monkeypatch.setattr(tiktoken_resolver, "_encoders", {"o200k_base": encoding})
+
+        count, fingerprint = run(client.count("gpt-4o", "the token then", tiktoken=True))
+
+        assert count == len(encoding.encode_ordinary("the token then"))
+        assert fingerprint == "tiktoken:o200k_base"
+
+    def test_load_respects_headroom(self, client, monkeypatch):
+        """예산이 가득 차면 미리 로드하지 않음"""
+        assert run(client.load("org/model", if_headroom=True)) == "loaded"
+        assert run(client.load("org/model", if_headroom=True)) == "already_loaded"
+
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=0))
+        assert run(client.load("org/other", if_headroom=True)) == "no_headroom"
+
+    def test_load_does_not_evict_when_loaded_tokenizer_is_too_big(self, client, monkeypatch):
+        """여유가 조금 있어도 로드한 토크나이저가 예산을 넘으면 다른 모델을 제거하지 않고 버림"""
+        cache = TokenizerCache(budget_bytes=1 << 30)
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", cache)
+        assert run(client.load("org/model", if_headroom=True)) == "loaded"
+        cache.budget_bytes = cache.stats()["bytes"] + 1
+
+        assert run(client.load("org/other", if_headroom=True)) == "no_headroom"
+        assert "org/model" in cache and "org/other" not in cache
+
+
+class TestWorkerIntegration:
+    """API 워커가 데몬으로 세는 경로 테스트"""
+
+    def test_count_via_daemon_uses_result_cache(self, client, daemon, monkeypatch):
+        """데몬 결과도 워커의 결과 캐시에 저장되어 같은 텍스트는 다시 묻지 않음"""
+        monkeypatch.setattr(token_counter, "tokenizer_daemon", client)
+        monkeypatch.setattr(token_counter, "result_cache", TokenCountCache(max_bytes=1024 * 1024))
+
+        async def count_twice():
+            first = await token_counter.count_tokens_for_model_async("Org/Model", "hello world", False)
+            second = await token_counter.count_tokens_for_model_async("org/model", "hello world", False)
+            return first, second
+
+        first, second = run(count_twice())
+
+        assert first["token_count"] == second["token_count"] == 2
+        assert client.stats()["requests"] == 1
+        assert tokenizer_loader.is_tokenizer_loaded("org/model")
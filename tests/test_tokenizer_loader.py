@@ -0,0 +1,441 @@
+"""
+tokenizer_loader.py 테스트 - 모델별 로드 락, tokenizer.json 로더, 로컬 우선 로드, 네거티브 캐시 검증
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from huggingface_hub.utils import EntryNotFoundError, RepositoryNotFoundError
+from tokenizers import Tokenizer
+
+from core import negative_cache, tokenizer_loader
+from core.negative_cache import FailedLoadCache, TokenizerLoadError
+from core.tokenizer_cache import TokenizerCache
+from core.token_counter import count_tokens, count_tokens_batch
+from tests.test_token_counter import make_tokenizer
+from utils.config import SETTINGS
+
+
+def save_length_limited_tokenizer(path) -> None:
+    """길이 8로 자르고 채우도록 저장된 tokenizer.json 생성"""
+    backend = make_tokenizer(["hello", "world"]).backend_tokenizer
+    backend.enable_truncation(8)
+    backend.enable_padding(length=8)
+    backend.save(str(path))
+
+
+class SlowHub:
+    """로드마다 지연되는 가짜 Hub 로더"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.loads: list[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model_id: str):
+        with self._lock:
+            self.loads.append(model_id)
+        time.sleep(self.delay)
+        return make_tokenizer(model_id.split("/"))
+
+
+@pytest.fixture
+def slow_hub(monkeypatch):
+    hub = SlowHub(delay=0.2)
+    monkeypatch.setattr(tokenizer_loader, "_load_from_hub", hub)
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+    return hub
+
+
+def load_concurrently(model_ids: list[str]) -> list:
+    results = [None] * len(model_ids)
+
+    def worker(i, model_id):
+        results[i] = tokenizer_loader.load_tokenizer(model_id)
+
+    threads = [threading.Thread(target=worker, args=(i, m)) for i, m in enumerate(model_ids)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestPerModelLoadLocks:
+    """모델별 로드 락 테스트"""
+
+    def test_different_models_load_in_parallel(self, slow_hub):
+        """서로 다른 모델의 로드가 서로를 막지 않음"""
+        start = time.perf_counter()
+        load_concurrently(["org/a", "org/b", "org/c"])
+        elapsed = time.perf_counter() - start
+
+        assert sorted(slow_hub.loads) == ["org/a", "org/b", "org/c"]
+        assert elapsed < 0.2 * 2
+
+    def test_same_model_loads_once(self, slow_hub):
+        """같은 모델의 동시 요청은 한 번의 로드를 공유"""
+        results = load_concurrently(["org/a"] * 4)
+
+        assert slow_hub.loads == ["org/a"]
+        assert all(r is results[0] for r in results)
+
+    def test_lock_wait_is_reported(self, slow_hub):
+        """로드 락 대기 시간이 통계에 기록됨"""
+        before = tokenizer_loader.get_tokenizer_load_stats()
+        load_concurrently(["org/a"] * 2)
+        after = tokenizer_loader.get_tokenizer_load_stats()
+
+        assert after["lock_waits"] - before["lock_waits"] == 2
+        assert after["max_lock_wait_seconds"] >= 0.1
+        assert after["loading"] == []
+
+
+class TestFastLoader:
+    """tokenizer.json 전용 로더 테스트"""
+
+    @pytest.fixture
+    def empty_cache(self, monkeypatch):
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+
+    def test_loads_raw_tokenizer_from_tokenizer_json(self, empty_cache, monkeypatch, tmp_path):
+        """tokenizer.json이 있으면 transformers 없이 tokenizers.Tokenizer로 로드"""
+        path = tmp_path / "tokenizer.json"
+        make_tokenizer(["hello", "world"]).backend_tokenizer.save(str(path))
+        requested = []
+
+        def fake_download(repo_id, filename, **kwargs):
+            requested.append(filename)
+            return str(path)
+
+        def no_transformers(model_id):
+            raise AssertionError("AutoTokenizer should not be used")
+
+        monkeypatch.setattr(tokenizer_loader, "hf_hub_download", fake_download)
+        monkeypatch.setattr(tokenizer_loader, "_load_with_transformers", no_transformers)
+
+        tokenizer = tokenizer_loader.load_tokenizer("org/fast-model")
+
+        assert isinstance(tokenizer, Tokenizer)
+        assert requested == ["tokenizer.json"]
+        assert count_tokens(tokenizer, "hello world") == 2
+
+    def test_ignores_saved_truncation_and_padding(self, empty_cache, monkeypatch, tmp_path):
+        """tokenizer.json에 저장된 truncation/padding은 토큰 수에 영향을 주지 않음"""
+        path = tmp_path / "tokenizer.json"
+        save_length_limited_tokenizer(path)
+        monkeypatch.setattr(tokenizer_loader, "hf_hub_download", lambda repo_id, filename, **kwargs: str(path))
+
+        tokenizer = tokenizer_loader.load_tokenizer("org/padded-model")
+
+        assert count_tokens(tokenizer, " ".join(["hello"] * 100)) == 100
+        assert count_tokens(tokenizer, "hello") == 1
+        assert count_tokens_batch(tokenizer, ["hello", "hello " * 20]) == [1, 20]
+
+    def test_falls_back_when_tokenizer_json_missing(self, empty_cache, monkeypatch):
+        """tokenizer.json이 없는 저장소는 AutoTokenizer로 대체"""
+        fallback = make_tokenizer(["slow"])
+
+        def missing(repo_id, filename, **kwargs):
+            raise EntryNotFoundError(f"{filename} not found")
+
+        monkeypatch.setattr(tokenizer_loader, "hf_hub_download", missing)
+        monkeypatch.setattr(tokenizer_loader, "_load_with_transformers", lambda model_id: fallback)
+
+        assert tokenizer_loader.load_tokenizer("org/sentencepiece-only") is fallback
+
+
+class StandInHubHandler(BaseHTTPRequestHandler):
+    """Hub의 resolve 엔드포인트를 흉내 내는 핸들러 (tokenizer.json 하나만 제공)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body: bool):
+        hub = self.server.hub
+        hub.release.wait(5)
+        hub.requests.append(self.command)
+        if not self.path.endswith("/resolve/main/tokenizer.json"):
+            self.send_error(404)
+            return
+        data = hub.payload
+        self.send_response(200)
+        self.send_header("X-Repo-Commit", hashlib.sha1(data).hexdigest())
+        self.send_header("ETag", f'"{hashlib.sha256(data).hexdigest()}"')
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInHub:
+    """로컬 대체 Hub 서버 상태"""
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self.release = threading.Event()
+        self.release.set()
+        self.publish(["hello", "world"])
+
+    def publish(self, vocab_words: list[str]):
+        """새 리비전의 tokenizer.json 게시"""
+        self.payload = make_tokenizer(vocab_words).backend_tokenizer.to_str().encode()
+
+
+@pytest.fixture
+def stand_in_hub(monkeypatch, tmp_path):
+    """로컬 대체 Hub를 띄우고 로더가 빈 캐시 디렉터리와 이 서버를 쓰게 함"""
+    hub = StandInHub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHubHandler)
+    server.hub = hub
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(SETTINGS, "hf_endpoint", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(SETTINGS, "cache_dir", str(tmp_path / "hf"))
+    monkeypatch.setattr(SETTINGS, "tokenizer_bundle_dir", "")
+    monkeypatch.setattr(SETTINGS, "tokenizer_refresh_interval_seconds", 3600)
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+    monkeypatch.setattr(tokenizer_loader, "_last_refresh", {})
+
+    yield hub
+
+    hub.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for_refreshes():
+    """예약된 백그라운드 확인이 모두 끝날 때까지 대기 (작업자 1개라 순서대로 실행)"""
+    tokenizer_loader._refresh_executor.submit(lambda: None).result(timeout=10)
+
+
+class TestLocalFirstLoad:
+    """로컬 캐시 우선 로드와 백그라운드 리비전 확인 테스트"""
+
+    def test_cached_files_load_without_hub_and_refresh_in_background(self, stand_in_hub, monkeypatch):
+        """캐시된 파일은 Hub를 기다리지 않고 로드하고, 새 리비전은 백그라운드에서 교체"""
+        first = tokenizer_loader.load_tokenizer("org/model")
+        assert first.encode("hello world").tokens == ["hello", "world"]
+        assert "GET" in stand_in_hub.requests
+
+        # 프로세스 캐시를 비우고 Hub가 응답하지 않는 상태에서 다시 로드
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+        stand_in_hub.requests.clear()
+        stand_in_hub.release.clear()
+        stand_in_hub.publish(["hello", "there"])
+
+        start = time.perf_counter()
+        cached = tokenizer_loader.load_tokenizer("org/model")
+        assert time.perf_counter() - start < 1.0
+        assert cached.encode("hello world").tokens == ["hello", "world"]
+
+        stand_in_hub.release.set()
+        wait_for_refreshes()
+
+        refreshed = tokenizer_loader.load_tokenizer("org/model")
+        assert refreshed.encode("hello there").tokens == ["hello", "there"]
+        assert tokenizer_loader.get_tokenizer_load_stats()["refresh"]["updated"] >= 1
+
+    def test_refresh_is_rate_limited(self, stand_in_hub, monkeypatch):
+        """간격 안에서는 같은 모델의 확인을 다시 예약하지 않음"""
+        tokenizer_loader.load_tokenizer("org/model")
+        before = tokenizer_loader.get_tokenizer_load_stats()["refresh"]["scheduled"]
+        for _ in range(3):
+            monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+            tokenizer_loader.load_tokenizer("org/model")
+        wait_for_refreshes()
+
+        assert tokenizer_loader.get_tokenizer_load_stats()["refresh"]["scheduled"] == before + 1
+
+    def test_download_progress_is_reported(self, stand_in_hub):
+        """Hub에서 받는 동안 받은 바이트 수와 단계를 알림"""
+        events = []
+        with tokenizer_loader.watch_load_progress("org/model", lambda phase, info: events.append((phase, info))):
+            tokenizer_loader.load_tokenizer("org/model")
+
+        phases = [phase for phase, _ in events]
+        assert phases[0] == "loading" and phases[-1] == "ready"
+        assert "initializing" in phases
+        downloads = [info for phase, info in events if phase == "downloading"]
+        assert downloads[-1]["downloaded_bytes"] == downloads[-1]["total_bytes"] == len(stand_in_hub.payload)
+
+    def test_unchanged_revision_keeps_entry(self, stand_in_hub, monkeypatch):
+        """내용이 같으면 캐시 항목을 교체하지 않음"""
+        tokenizer_loader.load_tokenizer("org/model")
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+        cached = tokenizer_loader.load_tokenizer("org/model")
+        wait_for_refreshes()
+
+        assert tokenizer_loader.load_tokenizer("org/model") is cached
+
+
+class FailingHub:
+    """항상 지정한 오류를 던지는 가짜 Hub 로더"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, model_id: str):
+        self.calls += 1
+        raise self.error
+
+
+def repository_not_found() -> RepositoryNotFoundError:
+    response = httpx.Response(404, request=httpx.Request("HEAD", "http://hub/org/typo"))
+    return RepositoryNotFoundError("Repository Not Found for url", response=response)
+
+
+@pytest.fixture
+def failing_hub(monkeypatch):
+    hub = FailingHub(repository_not_found())
+    monkeypatch.setattr(tokenizer_loader, "_load_from_hub", hub)
+    monkeypatch.setattr(tokenizer_loader, "_load_from_local_cache", lambda model_id: None)
+    monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+    monkeypatch.setattr(tokenizer_loader, "_failed_loads", FailedLoadCache(max_entries=10))
+    monkeypatch.setattr(SETTINGS, "tokenizer_negative_ttl_seconds", 600)
+    monkeypatch.setattr(SETTINGS, "tokenizer_negative_transient_ttl_seconds", 30)
+    return hub
+
+
+class TestNegativeCache:
+    """실패한 로드의 네거티브 캐시 테스트"""
+
+    def test_repeat_failures_skip_hub(self, failing_hub):
+        """첫 실패는 원래 예외, 이후에는 Hub 호출 없이 오류 클래스와 메시지를 담아 실패"""
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/typo")
+        for _ in range(3):
+            with pytest.raises(TokenizerLoadError) as exc_info:
+                tokenizer_loader.load_tokenizer("org/typo")
+
+        assert failing_hub.calls == 1
+        assert exc_info.value.error_class == "RepositoryNotFoundError"
+        assert str(exc_info.value) == "Repository Not Found for url"
+
+    def test_concurrent_requests_for_bad_id_load_once(self, failing_hub):
+        """락을 기다리던 요청도 앞선 실패를 재사용"""
+        errors = []
+
+        def worker():
+            try:
+                tokenizer_loader.load_tokenizer("org/typo")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert failing_hub.calls == 1
+        assert len(errors) == 4
+
+    def test_token_change_invalidates(self, failing_hub, monkeypatch):
+        """토큰이 바뀌면 (예: gated 저장소 권한 획득) 다시 시도"""
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/gated")
+        monkeypatch.setattr(SETTINGS, "huggingface_hub_token", "hf_new_token")
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/gated")
+
+        assert failing_hub.calls == 2
+
+    def test_expired_entry_retries(self, failing_hub, monkeypatch):
+        """TTL이 지나면 다시 시도"""
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/typo")
+        later = time.time() + 601
+        monkeypatch.setattr(negative_cache, "time", SimpleNamespace(time=lambda: later))
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/typo")
+
+        assert failing_hub.calls == 2
+
+    def test_transient_errors_use_short_ttl(self, failing_hub):
+        """네트워크 오류 등은 짧은 TTL로 기록"""
+        failing_hub.error = ConnectionError("Hub unreachable")
+        with pytest.raises(ConnectionError):
+            tokenizer_loader.load_tokenizer("org/model")
+
+        [entry] = tokenizer_loader.get_failed_load_stats()["entries"]
+        assert entry["error_class"] == "ConnectionError"
+        assert 0 < entry["expires_in_seconds"] <= 30
+
+    def test_inspect_and_clear(self, failing_hub):
+        """실패 목록 조회와 수동 삭제"""
+        with pytest.raises(RepositoryNotFoundError):
+            tokenizer_loader.load_tokenizer("org/typo")
+        with pytest.raises(TokenizerLoadError):
+            tokenizer_loader.load_tokenizer("org/typo")
+
+        stats = tokenizer_loader.get_failed_load_stats()
+        assert [e["model_id"] for e in stats["entries"]] == ["org/typo"]
+        assert stats["entries"][0]["hits"] == 1
+
+        assert tokenizer_loader.clear_failed_loads("org/typo") == 1
+        assert tokenizer_loader.get_failed_load_stats()["entries"] == []
+
+
+class TestTokenizerDedup:
+    """같은 내용의 토크나이저를 모델 ID 사이에서 공유하는지 테스트"""
+
+    @pytest.fixture
+    def hub_files(self, monkeypatch, tmp_path):
+        """모델 ID별 tokenizer.json 경로를 돌려주는 가짜 Hub"""
+        monkeypatch.setattr(tokenizer_loader, "_tokenizer_cache", TokenizerCache(budget_bytes=1 << 30))
+        monkeypatch.setattr(tokenizer_loader, "_load_from_local_cache", lambda model_id: None)
+        monkeypatch.setattr(tokenizer_loader, "load_from_bundle", lambda model_id: None)
+        monkeypatch.setattr(tokenizer_loader, "_file_fingerprints", {})
+        monkeypatch.setattr(tokenizer_loader, "_dedup_stats", {"shared_by_file_hash": 0, "shared_by_fingerprint": 0})
+        files = {}
+
+        def add(model_id, vocab_words):
+            path = tmp_path / model_id.replace("/", "--") / "tokenizer.json"
+            path.parent.mkdir()
+            make_tokenizer(vocab_words).backend_tokenizer.save(str(path))
+            files[model_id] = str(path)
+
+        monkeypatch.setattr(tokenizer_loader, "hf_hub_download", lambda model_id, filename, **kwargs: files[model_id])
+        return add
+
+    def test_identical_files_share_one_instance(self, hub_files):
+        """파일 내용이 같으면 두 번째 모델은 파싱 없이 같은 인스턴스를 사용"""
+        hub_files("org/model-8b", ["hello", "world"])
+        hub_files("org/model-32b", ["hello", "world"])
+        hub_files("other/model", ["different"])
+
+        first = tokenizer_loader.load_tokenizer("org/model-8b")
+        second = tokenizer_loader.load_tokenizer("org/model-32b")
+        other = tokenizer_loader.load_tokenizer("other/model")
+
+        assert second is first
+        assert other is not first
+        stats = tokenizer_loader.get_tokenizer_alias_stats()
+        assert stats["shared_by_file_hash"] == 1
+        assert [group["models"] for group in stats["groups"]] == [["org/model-8b", "org/model-32b"]]
+        assert stats["saved_bytes"] == stats["groups"][0]["size_bytes"]
+        assert tokenizer_loader.get_tokenizer_cache_stats()["instances"] == 2
+
+    def test_same_content_from_different_loaders_is_shared(self, hub_files, monkeypatch):
+        """파일이 없는 로드(AutoTokenizer 등)도 지문이 같으면 인스턴스를 공유"""
+        hub_files("org/base", ["hello", "world"])
+        base = tokenizer_loader.load_tokenizer("org/base")
+        monkeypatch.setattr(tokenizer_loader, "_load_from_hub", lambda model_id: make_tokenizer(["hello", "world"]))
+
+        assert tokenizer_loader.load_tokenizer("org/fine-tune") is base
+        assert tokenizer_loader.get_tokenizer_alias_stats()["shared_by_fingerprint"] == 1
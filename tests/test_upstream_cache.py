@@ -0,0 +1,91 @@
+"""
+upstream_cache.py 테스트 - 유료 API 토큰 수 영속 캐시 검증
+"""
+import asyncio
+import time
+
+import pytest
+
+from api.services.upstream_cache import UpstreamCountCache
+
+
+class CountingUpstream:
+    """호출 횟수를 기록하는 가짜 업스트림 API"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self, model: str, text: str) -> int:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return len(text)
+
+
+def count(cache: UpstreamCountCache, model: str, text: str, upstream: CountingUpstream) -> int:
+    return asyncio.run(cache.get_or_count(model, text, upstream))
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "upstream.sqlite3")
+
+
+class TestUpstreamCountCache:
+    """업스트림 캐시 테스트"""
+
+    def test_second_call_served_from_cache(self, cache_path):
+        """같은 (모델, 텍스트)는 업스트림을 다시 호출하지 않음"""
+        cache = UpstreamCountCache(cache_path, ttl_seconds=60, max_entries=100)
+        upstream = CountingUpstream(delay=0.01)
+
+        assert count(cache, "claude-sonnet-4", "hello", upstream) == 5
+        assert count(cache, "claude-sonnet-4", "hello", upstream) == 5
+        assert upstream.calls == 1
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["saved_latency_ms"] >= 10
+
+    def test_model_is_part_of_key(self, cache_path):
+        """모델이 다르면 별도 항목"""
+        cache = UpstreamCountCache(cache_path, ttl_seconds=60, max_entries=100)
+        upstream = CountingUpstream()
+
+        count(cache, "claude-sonnet-4", "hello", upstream)
+        count(cache, "gemini-2.5-pro", "hello", upstream)
+        assert upstream.calls == 2
+
+    def test_shared_between_instances(self, cache_path):
+        """같은 파일을 여는 다른 인스턴스(워커)와 항목 공유"""
+        upstream = CountingUpstream()
+        worker_a = UpstreamCountCache(cache_path, ttl_seconds=60, max_entries=100)
+        worker_b = UpstreamCountCache(cache_path, ttl_seconds=60, max_entries=100)
+
+        count(worker_a, "gemini-2.5-pro", "shared text", upstream)
+        count(worker_b, "gemini-2.5-pro", "shared text", upstream)
+        assert upstream.calls == 1
+
+    def test_expired_entries_are_refreshed(self, cache_path):
+        """TTL이 지난 항목은 다시 업스트림 호출"""
+        cache = UpstreamCountCache(cache_path, ttl_seconds=0, max_entries=100)
+        upstream = CountingUpstream()
+
+        count(cache, "claude-sonnet-4", "hello", upstream)
+        count(cache, "claude-sonnet-4", "hello", upstream)
+        assert upstream.calls == 2
+
+    def test_prune_enforces_size_cap(self, cache_path):
+        """크기 제한을 넘으면 가장 오래 사용하지 않은 항목 제거"""
+        cache = UpstreamCountCache(cache_path, ttl_seconds=60, max_entries=2)
+        upstream = CountingUpstream()
+
+        for text in ("a", "bb", "ccc"):
+            count(cache, "claude-sonnet-4", text, upstream)
+            time.sleep(0.01)
+        cache.prune()
+
+        assert cache.stats()["entries"] == 2
+        assert cache.get("claude-sonnet-4", cache.text_hash("a")) is None
+        assert cache.get("claude-sonnet-4", cache.text_hash("ccc")) == 3
@@ -0,0 +1,156 @@
+"""
+upstream_clients.py 테스트 - 로컬 대체 HTTP 서버로 풀링된 비동기 클라이언트 검증
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.config import SETTINGS
+from api.services import token_counter, upstream_cache
+from api.services.upstream_clients import (
+    anthropic_pool,
+    google_pool,
+    reset_upstream_clients,
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Anthropic/Gemini count_tokens API를 흉내 내는 핸들러 (공백 단위로 토큰 계산)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.client_ports.append(self.client_address[1])
+
+        if self.path.endswith("/messages/count_tokens"):
+            words = len(body["messages"][0]["content"].split())
+            payload = {"input_tokens": words + 7}
+        elif ":countTokens" in self.path:
+            text = body["contents"][0]["parts"][0]["text"]
+            payload = {"totalTokens": len(text.split())}
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    """로컬 대체 서버를 띄우고 업스트림 설정을 서버로 향하게 함"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(SETTINGS, "anthropic_api_key", "test-key")
+    monkeypatch.setattr(SETTINGS, "google_api_key", "test-key")
+    monkeypatch.setattr(SETTINGS, "anthropic_base_url", base_url)
+    monkeypatch.setattr(SETTINGS, "google_base_url", base_url)
+    monkeypatch.setattr(SETTINGS, "upstream_cache_path", "")
+    monkeypatch.setattr(upstream_cache, "_cache", None)
+    reset_upstream_clients()
+
+    yield server
+
+    reset_upstream_clients()
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledUpstreamClients:
+    """풀링된 업스트림 클라이언트 테스트"""
+
+    def test_claude_count_reuses_connection(self, stand_in_server):
+        """여러 번 호출해도 keep-alive 연결 하나를 재사용"""
+        async def scenario():
+            counts = [
+                await token_counter.count_tokens_claude("claude-sonnet-4", "one two three")
+                for _ in range(3)
+            ]
+            await anthropic_pool.aclose()
+            return counts
+
+        assert asyncio.run(scenario()) == [3, 3, 3]
+        assert len(stand_in_server.client_ports) == 3
+        assert len(set(stand_in_server.client_ports)) == 1
+
+    def test_gemini_count(self, stand_in_server):
+        """Gemini 비동기 count_tokens 호출"""
+        async def scenario():
+            count = await token_counter.count_tokens_gemini("gemini-2.5-flash", "a b c d")
+            await google_pool.aclose()
+            return count
+
+        assert asyncio.run(scenario()) == 4
+
+    def test_concurrency_is_limited(self, stand_in_server, monkeypatch):
+        """동시 요청 수가 공급자별 제한을 넘지 않음"""
+        monkeypatch.setattr(SETTINGS, "upstream_max_concurrency", 2)
+        reset_upstream_clients()
+        requests_before = anthropic_pool.stats()["requests"]
+        peak = 0
+
+        async def fake_call(client):
+            nonlocal peak
+            peak = max(peak, anthropic_pool.stats()["in_flight"])
+            await asyncio.sleep(0.02)
+
+        async def scenario():
+            await asyncio.gather(*(anthropic_pool.call(fake_call) for _ in range(6)))
+
+        asyncio.run(scenario())
+        assert peak == 2
+        assert anthropic_pool.stats()["requests"] - requests_before == 6
+
+    def test_count_for_model_awaits_upstream(self, stand_in_server):
+        """count_tokens_for_model_async가 Claude를 실행기 없이 직접 대기"""
+        result = asyncio.run(
+            token_counter.count_tokens_for_model_async("Claude-Sonnet-4", "hello there", True)
+        )
+
+        assert result["token_count"] == 2
+        assert result["model"] == "claude-sonnet-4"
+        assert result["context_window"] is not None
+
+    def test_sync_count_for_model_calls_provider(self, stand_in_server):
+        """동기 count_tokens_for_model도 Claude/Gemini를 설정된 공급자 API로 셈"""
+        claude = token_counter.count_tokens_for_model("Claude-Sonnet-4", "one two three", True)
+        gemini = token_counter.count_tokens_for_model("gemini-2.5-flash", "a b c d", True)
+
+        assert claude["token_count"] == 3
+        assert gemini["token_count"] == 4
+        assert len(stand_in_server.client_ports) == 2
+
+    def test_sync_count_requires_api_key(self, stand_in_server, monkeypatch):
+        """API 키가 없으면 동기 경로도 호출 전에 APIKeyMissingError"""
+        monkeypatch.setattr(SETTINGS, "anthropic_api_key", "")
+
+        with pytest.raises(token_counter.APIKeyMissingError):
+            token_counter.count_tokens_for_model("claude-sonnet-4", "hello", True)
+        assert stand_in_server.client_ports == []
+
+    def test_identical_concurrent_counts_make_one_upstream_call(self, stand_in_server):
+        """동시에 들어온 같은 (모델, 텍스트) 요청은 업스트림을 한 번만 호출"""
+        async def scenario():
+            return await asyncio.gather(*(
+                token_counter.count_tokens_for_model_async("claude-sonnet-4", "same text here", True)
+                for _ in range(4)
+            ))
+
+        results = asyncio.run(scenario())
+        assert [r["token_count"] for r in results] == [3] * 4
+        assert len(stand_in_server.client_ports) == 1
@@ -0,0 +1,59 @@
+"""
+warmup.py 테스트 - 시작 시 토크나이저 예열 진행 상태 검증
+"""
+import asyncio
+import threading
+
+from api.services import warmup
+from api.services.warmup import WarmupState, run_warmup
+
+
+class TestWarmup:
+    """예열 테스트"""
+
+    def test_warms_models_and_encodings(self, monkeypatch):
+        """모델과 tiktoken 인코딩을 모두 로드하고 진행 상태 기록"""
+        loaded = []
+        monkeypatch.setattr(warmup, "load_tokenizer", loaded.append)
+        monkeypatch.setattr(warmup, "get_encoder", loaded.append)
+        state = WarmupState()
+
+        asyncio.run(run_warmup(["org/a", "org/b"], encodings=("o200k_base",), state=state))
+
+        assert sorted(loaded) == ["o200k_base", "org/a", "org/b"]
+        assert state.status == "done"
+        assert state.ready
+        assert state.to_dict()["completed"] == 3
+        assert state.failed == {}
+
+    def test_failures_are_recorded_and_do_not_stop_others(self, monkeypatch):
+        """실패한 항목은 기록하고 나머지는 계속 진행"""
+        def load(model_id):
+            if model_id == "bad/model":
+                raise OSError("not found")
+
+        monkeypatch.setattr(warmup, "load_tokenizer", load)
+        state = WarmupState()
+
+        asyncio.run(run_warmup(["bad/model", "good/model"], encodings=(), state=state))
+
+        assert state.completed == 2
+        assert list(state.failed) == ["bad/model"]
+        assert "OSError" in state.failed["bad/model"]
+
+    def test_not_ready_while_running(self, monkeypatch):
+        """예열 중에는 준비되지 않은 상태로 보고"""
+        release = threading.Event()
+        monkeypatch.setattr(warmup, "load_tokenizer", lambda model_id: release.wait(5))
+        state = WarmupState()
+
+        async def scenario():
+            task = asyncio.ensure_future(run_warmup(["org/slow"], encodings=(), state=state))
+            await asyncio.sleep(0.05)
+            assert state.status == "running"
+            assert not state.ready
+            release.set()
+            await task
+
+        asyncio.run(scenario())
+        assert state.ready